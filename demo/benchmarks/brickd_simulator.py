@@ -0,0 +1,577 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tabletop Weather Station Demo
+Copyright (C) 2026 Tinkerforge GmbH
+
+brickd_simulator.py: Stand-in for brickd with simulated Bricklets
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public
+License along with this program; if not, write to the
+Free Software Foundation, Inc., 59 Temple Place - Suite 330,
+Boston, MA 02111-1307, USA.
+"""
+
+# Speaks the TFP protocol of brickd on a TCP port and simulates an LCD 128x64,
+# an Air Quality and an Outdoor Weather Bricklet:
+#
+# - enumerate is answered for all three Bricklets
+# - Air Quality all values callbacks, once enabled by the client
+# - Outdoor Weather station and sensor callbacks for N stations and M
+#   sensors, once enabled by the client
+# - LCD drawing functions (write_pixels, clear_display, write_line,
+#   draw_line, draw_box, draw_text, draw_buffered_frame) draw into a
+#   framebuffer that can be written as PNG. The GUI functions (tabs, graphs,
+#   sliders, buttons) are accepted, but not drawn
+#
+# Every other function of the three Bricklets is answered with default values
+# (zeros), unknown functions with "function not supported". As with brickd
+# the callbacks are sent to all connected clients.
+#
+# Usage: brickd_simulator.py [--port P] [--stations N] [--sensors M]
+#                            [--station-rate HZ] [--sensor-rate HZ]
+#                            [--air-quality-rate HZ] [--png FILE]
+#
+# The rates are callbacks per second per station/sensor. Without
+# --air-quality-rate the period configured by the client is used. With --png
+# the LCD content is written to the given file on exit (Ctrl+C).
+
+import sys
+if (sys.hexversion & 0xFF000000) != 0x03000000:
+    print('Python 3.x required')
+    sys.exit(1)
+
+import os
+import re
+import math
+import time
+import zlib
+import socket
+import struct
+import inspect
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from tabletop_weather_station_demo.framebuffer import FrameBuffer
+from tabletop_weather_station_demo.tinkerforge.ip_connection import IPConnection, PayloadCodec, get_payload_codec, base58decode
+from tabletop_weather_station_demo.tinkerforge.bricklet_lcd_128x64 import BrickletLCD128x64
+from tabletop_weather_station_demo.tinkerforge.bricklet_air_quality import BrickletAirQuality
+from tabletop_weather_station_demo.tinkerforge.bricklet_outdoor_weather import BrickletOutdoorWeather
+
+PACKET_HEADER = struct.Struct('<IBBBB')
+
+ERROR_CODE_NOT_SUPPORTED = 2
+
+FUNCTION_GET_IDENTITY = 255
+
+ENUMERATE_FORM = '8s 8s c 3B 3B H B'
+IDENTITY_FORM  = '8s 8s c 3B 3B H'
+
+def load_function_forms(device_class):
+    # The generated bindings pass the request and response form of every
+    # function as literals to send_request, collect them from the source
+    # instead of repeating them here: function_id -> (form, form_ret)
+    forms = {}
+
+    for name, form, form_ret in re.findall(r"\.FUNCTION_(\w+), \([^()]*\),? '([^']*)', '([^']*)'", inspect.getsource(device_class)):
+        forms[getattr(device_class, 'FUNCTION_' + name)] = (form, form_ret)
+
+    return forms
+
+def default_values(form):
+    values = []
+
+    for kind, count in get_payload_codec(form).fields:
+        if kind in [PayloadCodec.FIELD_VALUE, PayloadCodec.FIELD_BOOL]:
+            values.append(False if kind == PayloadCodec.FIELD_BOOL else 0)
+        elif kind == PayloadCodec.FIELD_ARRAY:
+            values.append([0] * count)
+        elif kind == PayloadCodec.FIELD_BOOL_ARRAY:
+            values.append([False] * count)
+        elif kind == PayloadCodec.FIELD_CHAR:
+            values.append('\0')
+        elif kind == PayloadCodec.FIELD_CHAR_ARRAY:
+            values.append(['\0'] * count)
+        else: # FIELD_STRING
+            values.append('')
+
+    return values
+
+def create_packet(uid, function_id, options, payload=b'', error_code=0):
+    return PACKET_HEADER.pack(uid, 8 + len(payload), function_id, options, error_code << 6) + payload
+
+def write_png(path, framebuffer, scale=4):
+    # 8 bit grayscale, set pixels are dark as on the LCD
+    rows = []
+
+    for y in range(FrameBuffer.HEIGHT):
+        row = bytearray()
+
+        for x in range(FrameBuffer.WIDTH):
+            row += (b'\x00' if framebuffer.get_pixel(x, y) else b'\xFF') * scale
+
+        rows += [b'\x00' + bytes(row)] * scale # filter type 0 per row
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    header = struct.pack('>IIBBBBB', FrameBuffer.WIDTH * scale, FrameBuffer.HEIGHT * scale, 8, 0, 0, 0, 0)
+
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) +
+                chunk(b'IDAT', zlib.compress(b''.join(rows))) + chunk(b'IEND', b''))
+
+class SimulatedDevice(object):
+    DEVICE_CLASS = None
+    FORMS = None
+
+    def __init__(self, uid):
+        self.uid_string = uid
+        self.uid = base58decode(uid)
+
+    def get_enumerate_values(self, enumeration_type):
+        return [self.uid_string, '0', 'a', [1, 0, 0], [2, 0, 0], self.DEVICE_CLASS.DEVICE_IDENTIFIER, enumeration_type]
+
+    def get_timers(self):
+        # keys for get_interval and create_callback
+        return []
+
+    def get_interval(self, key):
+        return None
+
+    def handle(self, function_id, values):
+        # returns the response values, None for default values
+        return None
+
+class SimulatedLCD(SimulatedDevice):
+    DEVICE_CLASS = BrickletLCD128x64
+    FORMS = load_function_forms(BrickletLCD128x64)
+
+    def __init__(self, uid):
+        SimulatedDevice.__init__(self, uid)
+
+        self.buffer = FrameBuffer() # drawing target
+        self.display = FrameBuffer() # visible content
+        self.display_configuration = [14, 100, False, True]
+        self.write_pixels_count = 0
+        self.draw_count = 0
+
+    def draw_done(self):
+        self.draw_count += 1
+
+        if self.display_configuration[3]: # automatic draw
+            self.display.data[:] = self.buffer.data
+
+    def handle(self, function_id, values):
+        if function_id == BrickletLCD128x64.FUNCTION_WRITE_PIXELS_LOW_LEVEL:
+            x_start, y_start, x_end, y_end, pixels_length, chunk_offset, chunk_data = values
+            width = x_end - x_start + 1
+
+            for i, pixel in enumerate(chunk_data[:max(0, pixels_length - chunk_offset)]):
+                x = x_start + (chunk_offset + i) % width
+                y = y_start + (chunk_offset + i) // width
+
+                if y <= y_end:
+                    self.buffer.set_pixel(x, y, pixel)
+
+            self.write_pixels_count += 1
+            self.draw_done()
+        elif function_id == BrickletLCD128x64.FUNCTION_CLEAR_DISPLAY:
+            self.buffer.clear()
+            self.draw_done()
+        elif function_id == BrickletLCD128x64.FUNCTION_WRITE_LINE:
+            line, position, text = values
+            self.buffer.draw_text(position * 6, line * 8, 0, True, text)
+            self.draw_done()
+        elif function_id == BrickletLCD128x64.FUNCTION_DRAW_LINE:
+            self.buffer.draw_line(*values)
+            self.draw_done()
+        elif function_id == BrickletLCD128x64.FUNCTION_DRAW_BOX:
+            self.buffer.draw_box(*values)
+            self.draw_done()
+        elif function_id == BrickletLCD128x64.FUNCTION_DRAW_TEXT:
+            self.buffer.draw_text(*values)
+            self.draw_done()
+        elif function_id == BrickletLCD128x64.FUNCTION_DRAW_BUFFERED_FRAME:
+            self.display.data[:] = self.buffer.data
+        elif function_id == BrickletLCD128x64.FUNCTION_SET_DISPLAY_CONFIGURATION:
+            self.display_configuration = list(values)
+        elif function_id == BrickletLCD128x64.FUNCTION_GET_DISPLAY_CONFIGURATION:
+            return self.display_configuration
+
+        return None
+
+class SimulatedAirQuality(SimulatedDevice):
+    DEVICE_CLASS = BrickletAirQuality
+    FORMS = load_function_forms(BrickletAirQuality)
+
+    def __init__(self, uid, rate=None):
+        SimulatedDevice.__init__(self, uid)
+
+        self.rate = rate
+        self.period = 0 # ms, set by the client
+
+    def get_all_values(self):
+        t = time.time()
+
+        return [int(50 + 25 * math.sin(t / 300)), 3, int(2200 + 200 * math.sin(t / 600)),
+                int(4500 + 500 * math.cos(t / 900)), int(101325 + 500 * math.sin(t / 1200))]
+
+    def get_timers(self):
+        return ['all_values']
+
+    def get_interval(self, key):
+        if self.period == 0:
+            return None
+
+        if self.rate != None:
+            return 1.0 / self.rate
+
+        return self.period / 1000.0
+
+    def create_callback(self, key):
+        payload = get_payload_codec('i B i i i').pack(self.get_all_values())
+
+        return create_packet(self.uid, BrickletAirQuality.CALLBACK_ALL_VALUES, 0, payload)
+
+    def handle(self, function_id, values):
+        if function_id == BrickletAirQuality.FUNCTION_GET_ALL_VALUES:
+            return self.get_all_values()
+        elif function_id == BrickletAirQuality.FUNCTION_SET_ALL_VALUES_CALLBACK_CONFIGURATION:
+            self.period = values[0]
+        elif function_id == BrickletAirQuality.FUNCTION_GET_ALL_VALUES_CALLBACK_CONFIGURATION:
+            return [self.period, False]
+
+        return None
+
+class SimulatedOutdoorWeather(SimulatedDevice):
+    DEVICE_CLASS = BrickletOutdoorWeather
+    FORMS = load_function_forms(BrickletOutdoorWeather)
+
+    def __init__(self, uid, stations=1, sensors=1, station_rate=1.0, sensor_rate=1.0):
+        SimulatedDevice.__init__(self, uid)
+
+        self.stations = list(range(stations))
+        self.sensors = list(range(sensors))
+        self.station_rate = station_rate
+        self.sensor_rate = sensor_rate
+        self.station_callbacks = False
+        self.sensor_callbacks = False
+        self.stream_offsets = {} # function_id -> offset of the next identifiers chunk
+        self.start = time.time()
+
+    def get_station_data(self, identifier):
+        t = time.time() + identifier * 37
+
+        return [int(150 + 100 * math.sin(t / 600)), int(60 + 20 * math.cos(t / 900)),
+                int(30 + 30 * abs(math.sin(t / 60))), int(60 + 40 * abs(math.sin(t / 45))),
+                int((t - self.start) / 10), int(t / 120) % 16, False]
+
+    def get_sensor_data(self, identifier):
+        t = time.time() + identifier * 53
+
+        return [int(200 + 50 * math.sin(t / 600)), int(50 + 10 * math.cos(t / 900))]
+
+    def get_timers(self):
+        return [('station', i) for i in self.stations] + [('sensor', i) for i in self.sensors]
+
+    def get_interval(self, key):
+        if key[0] == 'station' and self.station_callbacks and self.station_rate > 0:
+            return 1.0 / self.station_rate
+        elif key[0] == 'sensor' and self.sensor_callbacks and self.sensor_rate > 0:
+            return 1.0 / self.sensor_rate
+
+        return None
+
+    def create_callback(self, key):
+        kind, identifier = key
+
+        if kind == 'station':
+            payload = get_payload_codec('B h B I I I B !').pack([identifier] + self.get_station_data(identifier))
+            return create_packet(self.uid, BrickletOutdoorWeather.CALLBACK_STATION_DATA, 0, payload)
+        else:
+            payload = get_payload_codec('B h B').pack([identifier] + self.get_sensor_data(identifier))
+            return create_packet(self.uid, BrickletOutdoorWeather.CALLBACK_SENSOR_DATA, 0, payload)
+
+    def get_identifiers_chunk(self, function_id, identifiers):
+        offset = self.stream_offsets.get(function_id, 0)
+
+        if offset + 60 >= len(identifiers):
+            self.stream_offsets[function_id] = 0
+        else:
+            self.stream_offsets[function_id] = offset + 60
+
+        chunk = identifiers[offset:offset + 60]
+
+        return [len(identifiers), offset, chunk + [0] * (60 - len(chunk))]
+
+    def handle(self, function_id, values):
+        if function_id == BrickletOutdoorWeather.FUNCTION_GET_STATION_IDENTIFIERS_LOW_LEVEL:
+            return self.get_identifiers_chunk(function_id, self.stations)
+        elif function_id == BrickletOutdoorWeather.FUNCTION_GET_SENSOR_IDENTIFIERS_LOW_LEVEL:
+            return self.get_identifiers_chunk(function_id, self.sensors)
+        elif function_id == BrickletOutdoorWeather.FUNCTION_GET_STATION_DATA:
+            return self.get_station_data(values) + [int(time.time() - self.start) % 65536]
+        elif function_id == BrickletOutdoorWeather.FUNCTION_GET_SENSOR_DATA:
+            return self.get_sensor_data(values) + [int(time.time() - self.start) % 65536]
+        elif function_id == BrickletOutdoorWeather.FUNCTION_SET_STATION_CALLBACK_CONFIGURATION:
+            self.station_callbacks = values
+        elif function_id == BrickletOutdoorWeather.FUNCTION_GET_STATION_CALLBACK_CONFIGURATION:
+            return self.station_callbacks
+        elif function_id == BrickletOutdoorWeather.FUNCTION_SET_SENSOR_CALLBACK_CONFIGURATION:
+            self.sensor_callbacks = values
+        elif function_id == BrickletOutdoorWeather.FUNCTION_GET_SENSOR_CALLBACK_CONFIGURATION:
+            return self.sensor_callbacks
+
+        return None
+
+class Client(object):
+    def __init__(self, connection):
+        self.connection = connection
+        self.send_lock = threading.Lock()
+
+    def send(self, packet):
+        with self.send_lock:
+            self.connection.sendall(packet)
+
+class BrickdSimulator(object):
+    def __init__(self, devices):
+        self.devices = dict([(device.uid, device) for device in devices])
+        self.lock = threading.Lock() # protects devices and clients
+        self.clients = []
+        self.server = None
+        self.stop_event = threading.Event()
+        self.wakeup = threading.Event() # callback configuration changed
+        self.callback_count = 0
+        self.request_count = 0
+
+    def start(self, host='127.0.0.1', port=0):
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind((host, port))
+        self.server.listen(16)
+
+        for target, name in [(self.accept_loop, 'Simulator-Accept'), (self.callback_loop, 'Simulator-Callbacks')]:
+            thread = threading.Thread(name=name, target=target)
+            thread.daemon = True
+            thread.start()
+
+        return self.server.getsockname()
+
+    def stop(self):
+        self.stop_event.set()
+        self.wakeup.set()
+        self.server.close()
+
+        with self.lock:
+            for client in self.clients:
+                try:
+                    client.connection.shutdown(socket.SHUT_RDWR)
+                except socket.error:
+                    pass
+
+    def accept_loop(self):
+        while not self.stop_event.is_set():
+            try:
+                connection, _ = self.server.accept()
+            except socket.error:
+                break
+
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            client = Client(connection)
+
+            with self.lock:
+                self.clients.append(client)
+
+            thread = threading.Thread(name='Simulator-Client', target=self.client_loop, args=(client,))
+            thread.daemon = True
+            thread.start()
+
+    def client_loop(self, client):
+        pending = b''
+
+        try:
+            while True:
+                data = client.connection.recv(8192)
+
+                if len(data) == 0:
+                    break
+
+                pending += data
+
+                while len(pending) >= 8 and len(pending) >= pending[4]:
+                    length = pending[4]
+                    self.handle_request(client, pending[:length])
+                    pending = pending[length:]
+        except socket.error:
+            pass
+
+        with self.lock:
+            self.clients.remove(client)
+
+        client.connection.close()
+
+    def handle_request(self, client, packet):
+        uid, length, function_id, options, _ = PACKET_HEADER.unpack_from(packet)
+        response_expected = (options & 0x08) != 0
+
+        self.request_count += 1
+
+        if function_id == IPConnection.FUNCTION_DISCONNECT_PROBE:
+            return
+
+        if uid == IPConnection.BROADCAST_UID and function_id == IPConnection.FUNCTION_ENUMERATE:
+            codec = get_payload_codec(ENUMERATE_FORM)
+
+            for device in self.devices.values():
+                values = device.get_enumerate_values(IPConnection.ENUMERATION_TYPE_AVAILABLE)
+                client.send(create_packet(device.uid, IPConnection.CALLBACK_ENUMERATE, 0, codec.pack(values)))
+
+            return
+
+        device = self.devices.get(uid)
+
+        if device == None:
+            return # brickd doesn't answer for unknown devices either
+
+        if function_id == FUNCTION_GET_IDENTITY:
+            form, form_ret = '', IDENTITY_FORM
+        elif function_id in device.FORMS:
+            form, form_ret = device.FORMS[function_id]
+        else:
+            if response_expected:
+                client.send(create_packet(uid, function_id, options, error_code=ERROR_CODE_NOT_SUPPORTED))
+
+            return
+
+        values = get_payload_codec(form).unpack(packet, 8) if len(form) > 0 else ()
+
+        with self.lock:
+            if function_id == FUNCTION_GET_IDENTITY:
+                result = device.get_enumerate_values(0)[:-1]
+            else:
+                result = device.handle(function_id, values)
+
+        self.wakeup.set()
+
+        if not response_expected:
+            return
+
+        if len(form_ret) == 0:
+            payload = b''
+        else:
+            if result == None:
+                result = default_values(form_ret)
+            elif len(get_payload_codec(form_ret).fields) == 1:
+                result = [result]
+
+            payload = get_payload_codec(form_ret).pack(result)
+
+        client.send(create_packet(uid, function_id, options, payload))
+
+    def callback_loop(self):
+        next_due = {} # (device uid, timer key) -> time of the next callback
+
+        while not self.stop_event.is_set():
+            now = time.monotonic()
+            timeout = 1.0
+            packets = []
+
+            with self.lock:
+                for device in self.devices.values():
+                    for key in device.get_timers():
+                        interval = device.get_interval(key)
+                        timer = (device.uid, key)
+
+                        if interval == None:
+                            next_due.pop(timer, None)
+                            continue
+
+                        due = next_due.get(timer)
+
+                        if due == None:
+                            due = now + interval
+                        elif due <= now:
+                            packets.append(device.create_callback(key))
+                            # don't try to catch up after a stall
+                            due = max(due + interval, now)
+
+                        next_due[timer] = due
+                        timeout = min(timeout, due - now)
+
+                clients = list(self.clients)
+
+            for packet in packets:
+                for client in clients:
+                    try:
+                        client.send(packet)
+                    except socket.error:
+                        pass # client_loop will clean up
+
+            self.callback_count += len(packets)
+
+            if timeout > 0:
+                self.wakeup.wait(timeout)
+                self.wakeup.clear()
+
+    def get_lcd(self):
+        for device in self.devices.values():
+            if isinstance(device, SimulatedLCD):
+                return device
+
+        return None
+
+def create_simulator(stations=1, sensors=1, station_rate=1.0, sensor_rate=1.0, air_quality_rate=None):
+    return BrickdSimulator([SimulatedLCD('LCD'),
+                            SimulatedAirQuality('AQ1', air_quality_rate),
+                            SimulatedOutdoorWeather('WS1', stations, sensors, station_rate, sensor_rate)])
+
+def main():
+    args = sys.argv[1:]
+
+    def get_argument_value(name, default):
+        if name in args:
+            return args[args.index(name) + 1]
+
+        return default
+
+    port = int(get_argument_value('--port', '4223'))
+    air_quality_rate = get_argument_value('--air-quality-rate', None)
+    png_path = get_argument_value('--png', None)
+
+    simulator = create_simulator(int(get_argument_value('--stations', '1')),
+                                 int(get_argument_value('--sensors', '1')),
+                                 float(get_argument_value('--station-rate', '1')),
+                                 float(get_argument_value('--sensor-rate', '1')),
+                                 float(air_quality_rate) if air_quality_rate != None else None)
+    host, port = simulator.start('0.0.0.0', port)
+
+    print('Simulating brickd on port {0}, Ctrl+C to stop'.format(port))
+
+    try:
+        while True:
+            time.sleep(10)
+            print('{0} requests, {1} callbacks'.format(simulator.request_count, simulator.callback_count))
+    except KeyboardInterrupt:
+        pass
+
+    simulator.stop()
+
+    if png_path != None:
+        write_png(png_path, simulator.get_lcd().display)
+        print('LCD content written to {0}'.format(png_path))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tabletop Weather Station Demo
+Copyright (C) 2026 Tinkerforge GmbH
+
+end_to_end_benchmark.py: Measures IPConnection throughput and latency against the brickd simulator
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public
+License along with this program; if not, write to the
+Free Software Foundation, Inc., 59 Temple Place - Suite 330,
+Boston, MA 02111-1307, USA.
+"""
+
+# Starts the brickd simulator in-process, connects to it like the demo does
+# and reports:
+#
+# - round trip time of get_all_values (median and 99th percentile)
+# - duration of a full screen write_pixels call
+# - Outdoor Weather callbacks received per second compared to the number
+#   sent by the simulator
+#
+# Usage: end_to_end_benchmark.py [--stations N] [--station-rate HZ]
+#                                [--duration S] [--png FILE] [--stats]
+#
+# --stats additionally prints the statistics recorded by the IPConnection
+
+import sys
+if (sys.hexversion & 0xFF000000) != 0x03000000:
+    print('Python 3.x required')
+    sys.exit(1)
+
+import os
+import time
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from brickd_simulator import create_simulator, write_png
+from tabletop_weather_station_demo.tinkerforge.ip_connection import IPConnection
+from tabletop_weather_station_demo.tinkerforge.ip_connection_stats import ConnectionStats
+from tabletop_weather_station_demo.tinkerforge.bricklet_lcd_128x64 import BrickletLCD128x64
+from tabletop_weather_station_demo.tinkerforge.bricklet_air_quality import BrickletAirQuality
+from tabletop_weather_station_demo.tinkerforge.bricklet_outdoor_weather import BrickletOutdoorWeather
+
+def percentile(samples, p):
+    samples = sorted(samples)
+
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+def main():
+    args = sys.argv[1:]
+
+    def get_argument_value(name, default):
+        if name in args:
+            return args[args.index(name) + 1]
+
+        return default
+
+    stations = int(get_argument_value('--stations', '20'))
+    station_rate = float(get_argument_value('--station-rate', '50'))
+    duration = float(get_argument_value('--duration', '5'))
+    png_path = get_argument_value('--png', None)
+    stats = ConnectionStats() if '--stats' in args else None
+
+    simulator = create_simulator(stations, 0, station_rate, 0)
+    host, port = simulator.start()
+
+    ipcon = IPConnection()
+    ipcon.set_stats(stats)
+    ipcon.connect(host, port)
+
+    lcd = BrickletLCD128x64('LCD', ipcon)
+    lcd.set_response_expected_all(True)
+    air_quality = BrickletAirQuality('AQ1', ipcon)
+    outdoor_weather = BrickletOutdoorWeather('WS1', ipcon)
+
+    # request latency
+    samples = []
+
+    for _ in range(500):
+        start = time.perf_counter()
+        air_quality.get_all_values()
+        samples.append(time.perf_counter() - start)
+
+    print('get_all_values:  median {0:6.3f} ms, p99 {1:6.3f} ms'.format(percentile(samples, 0.5) * 1000,
+                                                                       percentile(samples, 0.99) * 1000))
+
+    # drawing
+    samples = []
+
+    for i in range(20):
+        pixels = [(x + y + i) % 3 == 0 for y in range(64) for x in range(128)]
+        start = time.perf_counter()
+        lcd.write_pixels(0, 0, 127, 63, pixels)
+        samples.append(time.perf_counter() - start)
+
+    lcd.draw_text(16, 24, BrickletLCD128x64.FONT_12X16, True, 'Simulated')
+    print('write_pixels:    median {0:6.3f} ms for 128x64 pixels'.format(percentile(samples, 0.5) * 1000))
+
+    # callback throughput
+    received = [0]
+    lock = threading.Lock()
+
+    def cb_station_data(*args):
+        with lock:
+            received[0] += 1
+
+    outdoor_weather.register_callback(BrickletOutdoorWeather.CALLBACK_STATION_DATA, cb_station_data)
+    outdoor_weather.set_station_callback_configuration(True)
+
+    sent_before = simulator.callback_count
+    start = time.perf_counter()
+    time.sleep(duration)
+    outdoor_weather.set_station_callback_configuration(False)
+    time.sleep(0.2) # let the queue drain
+    elapsed = time.perf_counter() - start
+    sent = simulator.callback_count - sent_before
+
+    print('callbacks:       {0} sent, {1} received, {2:.0f}/s ({3} stations at {4} Hz)'.format(
+          sent, received[0], received[0] / elapsed, stations, station_rate))
+
+    ipcon.disconnect()
+    simulator.stop()
+
+    if stats != None:
+        uid_names = {device.uid: device.DEVICE_DISPLAY_NAME for device in [lcd, air_quality, outdoor_weather]}
+
+        for line in stats.format_summary(uid_names):
+            print('stats:           ' + line)
+
+    if png_path != None:
+        write_png(png_path, simulator.get_lcd().display)
+        print('LCD content written to {0}'.format(png_path))
+
+if __name__ == '__main__':
+    main()
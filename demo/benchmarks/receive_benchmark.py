@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tabletop Weather Station Demo
+Copyright (C) 2026 Tinkerforge GmbH
+
+receive_benchmark.py: Measures packets per second of IPConnection.receive_loop
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public
+License along with this program; if not, write to the
+Free Software Foundation, Inc., 59 Temple Place - Suite 330,
+Boston, MA 02111-1307, USA.
+"""
+
+# A burst of callback packets of mixed size (touch gestures, graph data
+# responses, ...) is written to one end of a socket pair and received by
+# IPConnection.receive_loop on the other end. For comparison the same burst
+# is received with the previous implementation that concatenated and sliced
+# bytes objects for every packet.
+#
+# Usage: receive_benchmark.py [--packets N]
+
+import sys
+if (sys.hexversion & 0xFF000000) != 0x03000000:
+    print('Python 3.x required')
+    sys.exit(1)
+
+import os
+import time
+import socket
+import struct
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from tabletop_weather_station_demo.tinkerforge.ip_connection import IPConnection, get_length_from_data
+
+# (length, function_id) of typical packets: touch gesture, touch position,
+# get_all_values response, station data, large read response
+PACKETS = [(35, 12), (18, 11), (28, 1), (26, 9), (80, 3)]
+
+def create_burst(count):
+    burst = bytearray()
+
+    for i in range(count):
+        length, function_id = PACKETS[i % len(PACKETS)]
+        burst += struct.pack('<IBBBB', 1234, length, function_id, 0, 0)
+        burst += bytes(length - 8)
+
+    return bytes(burst)
+
+def legacy_receive_loop(ipcon, socket_id):
+    pending_data = bytes()
+
+    while ipcon.receive_flag:
+        data = ipcon.socket.recv(8192)
+
+        if len(data) == 0:
+            break
+
+        pending_data += data
+
+        while ipcon.receive_flag:
+            if len(pending_data) < 8:
+                break
+
+            length = get_length_from_data(pending_data)
+
+            if len(pending_data) < length:
+                break
+
+            packet = pending_data[0:length]
+            pending_data = pending_data[length:]
+
+            ipcon.handle_response(packet)
+
+def measure(receive_loop, burst, count):
+    sender, receiver = socket.socketpair()
+    received = [0]
+
+    def handle_response(packet):
+        received[0] += 1
+
+    ipcon = IPConnection()
+    ipcon.socket = receiver
+    ipcon.receive_flag = True
+    ipcon.handle_response = handle_response
+    ipcon.handle_disconnect_by_peer = lambda *args: None
+
+    def send():
+        sender.sendall(burst)
+        sender.close()
+
+    thread = threading.Thread(target=send)
+    start = time.perf_counter()
+    thread.start()
+    receive_loop(ipcon, 0)
+    elapsed = time.perf_counter() - start
+    thread.join()
+    receiver.close()
+
+    assert received[0] == count
+
+    return count / elapsed
+
+def main():
+    count = 200000
+    args = sys.argv[1:]
+
+    if '--packets' in args:
+        count = int(args[args.index('--packets') + 1])
+
+    burst = create_burst(count)
+
+    legacy = max(measure(legacy_receive_loop, burst, count) for _ in range(3))
+    current = max(measure(IPConnection.receive_loop, burst, count) for _ in range(3))
+
+    print('{0} packets, {1} bytes'.format(count, len(burst)))
+    print('bytes concatenation: {0:10.0f} packets/s'.format(legacy))
+    print('receive buffer:      {0:10.0f} packets/s ({1:.2f}x)'.format(current, current / legacy))
+
+if __name__ == '__main__':
+    main()
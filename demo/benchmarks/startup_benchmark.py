@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tabletop Weather Station Demo
+Copyright (C) 2026 Tinkerforge GmbH
+
+startup_benchmark.py: Reports the import time per module of the demo package
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public
+License along with this program; if not, write to the
+Free Software Foundation, Inc., 59 Temple Place - Suite 330,
+Boston, MA 02111-1307, USA.
+"""
+
+# Every run imports the given module (default: the screens module, as the
+# main module does) in a fresh interpreter with "-X importtime" and collects
+# the self and cumulative import time of all modules of the demo package.
+# The median over all runs is reported.
+#
+# Usage: startup_benchmark.py [--runs N] [module]
+
+import sys
+if (sys.hexversion & 0xFF000000) != 0x03000000:
+    print('Python 3.x required')
+    sys.exit(1)
+
+import os
+import subprocess
+import statistics
+
+PACKAGE   = 'tabletop_weather_station_demo'
+DEMO_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..')
+
+def import_times(module):
+    code = 'import {0}'.format(module)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            cwd=DEMO_PATH, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                            universal_newlines=True, check=True)
+    times = {}
+
+    # import time:     self [us] | cumulative | imported package
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+
+        fields = line[len('import time:'):].split('|')
+
+        try:
+            self_us = int(fields[0])
+            cumulative_us = int(fields[1])
+        except ValueError:
+            continue # header line
+
+        name = fields[2].strip()
+
+        if name == PACKAGE or name.startswith(PACKAGE + '.'):
+            times[name] = (self_us, cumulative_us)
+
+    return times
+
+def first_icon_time():
+    code = 'import time; from {0} import icons; t = time.perf_counter(); icons.IconTabData.chunks; print(int((time.perf_counter() - t)*1000000))'.format(PACKAGE)
+    result = subprocess.run([sys.executable, '-c', code], cwd=DEMO_PATH, stdout=subprocess.PIPE,
+                            universal_newlines=True, check=True)
+
+    return int(result.stdout)
+
+def main():
+    runs = 10
+    module = PACKAGE + '.screens'
+    args = sys.argv[1:]
+
+    if '--runs' in args:
+        i = args.index('--runs')
+        runs = int(args[i + 1])
+        del args[i:i + 2]
+
+    if len(args) > 0:
+        module = args[0]
+
+    samples = {}
+
+    for _ in range(runs):
+        for name, times in import_times(module).items():
+            samples.setdefault(name, []).append(times)
+
+    print('Importing {0}, median of {1} runs:'.format(module, runs))
+    print('{0:>10} {1:>12}  {2}'.format('self [us]', 'cumul. [us]', 'module'))
+
+    rows = []
+
+    for name, times in samples.items():
+        rows.append((statistics.median([t[0] for t in times]), statistics.median([t[1] for t in times]), name))
+
+    for self_us, cumulative_us, name in sorted(rows, key=lambda row: -row[0]):
+        print('{0:>10.0f} {1:>12.0f}  {2}'.format(self_us, cumulative_us, name))
+
+    icon_us = statistics.median([first_icon_time() for _ in range(runs)])
+    print('First icon access (maps the icon bundle): {0:.0f} us'.format(icon_us))
+
+if __name__ == '__main__':
+    main()
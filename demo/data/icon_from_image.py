@@ -29,8 +29,21 @@ if (sys.hexversion & 0xFF000000) != 0x03000000:
     sys.exit(1)
 
 import os
+import glob
+import hashlib
+import numpy
 from PIL import Image, ImageFont, ImageDraw
 
+DATA_PATH   = os.path.dirname(os.path.realpath(__file__))
+DEMO_PATH   = os.path.join(DATA_PATH, '..', 'tabletop_weather_station_demo')
+BUNDLE_NAME = 'icons.bin'
+BUNDLE_PATH = os.path.join(DEMO_PATH, BUNDLE_NAME)
+INDEX_PATH  = os.path.join(DEMO_PATH, 'icons_index.py')
+
+# Every icon in the bundle is padded to a multiple of one write_pixels chunk
+# (448 pixels), so the chunks can be sliced directly out of the bundle
+CHUNK_SIZE = 56
+
 def bool_list_from_pil_image(image, width=128, height=64):
     # Convert image to black/white pixels
     image_data = image.load()
@@ -51,18 +64,117 @@ def bool_list_from_pil_image(image, width=128, height=64):
     
     return pixels   
 
+def packed_literal_from_bool_list(pixels):
+    # Packs the pixels line by line, 8 pixels per byte, least significant bit
+    # first (as expected by write_pixels_packed) and returns a bytes literal
+    packed = bytearray((len(pixels) + 7) // 8)
+
+    for i, pixel in enumerate(pixels):
+        if pixel:
+            packed[i // 8] |= 1 << (i % 8)
+
+    return "b'" + ''.join('\\x{0:02x}'.format(b) for b in packed) + "'"
+
 def load_image(path):
     image = Image.open(path)
     width, height = image.size
     return bool_list_from_pil_image(image, width, height), width, height
 
+def packed_bytes_from_image(path):
+    # Same thresholding as bool_list_from_pil_image, but done on the whole
+    # image at once: palette/grayscale pixels are set if they are not 0,
+    # color pixels are set if they are not white
+    image = Image.open(path)
+
+    if image.mode in ['1', 'L', 'P']:
+        pixels = numpy.asarray(image) > 0
+    else:
+        pixels = (numpy.asarray(image.convert('RGB')) < 255).any(axis=2)
+
+    height, width = pixels.shape
+    packed = numpy.packbits(pixels.reshape(-1), bitorder='little').tobytes()
+    padding = -len(packed) % CHUNK_SIZE
+
+    return packed + b'\x00' * padding, width, height
+
+def load_index():
+    index = {}
+
+    if os.path.exists(INDEX_PATH) and os.path.exists(BUNDLE_PATH):
+        with open(INDEX_PATH, 'r') as f:
+            exec(f.read(), index)
+
+    return index.get('ICONS', {})
+
+def write_index(entries):
+    with open(INDEX_PATH, 'w') as f:
+        f.write('# -*- coding: utf-8 -*-\n')
+        f.write('\n')
+        f.write('# Generated by "icon_from_image.py --batch" from the images in the ../data/\n')
+        f.write('# folder, do not edit. The pixels are stored in the {0} bundle.\n'.format(BUNDLE_NAME))
+        f.write('\n')
+        f.write("BUNDLE = '{0}'\n".format(BUNDLE_NAME))
+        f.write('\n')
+        f.write('# name: (offset, length, width, height, sha256 of image file)\n')
+        f.write('ICONS = {\n')
+
+        for name, entry in sorted(entries.items()):
+            f.write("    '{0}': {1},\n".format(name, entry))
+
+        f.write('}\n')
+
+def batch():
+    # Converts all images in the data folder into the icon bundle. Images
+    # whose content hash did not change since the last run are not converted
+    # again, their packed data is taken from the existing bundle.
+    old_entries = load_index()
+    old_bundle = b''
+
+    if len(old_entries) > 0:
+        with open(BUNDLE_PATH, 'rb') as f:
+            old_bundle = f.read()
+
+    bundle = b''
+    entries = {}
+    changed = False
+
+    for path in sorted(glob.glob(os.path.join(DATA_PATH, '*.png'))):
+        name = os.path.splitext(os.path.basename(path))[0]
+
+        with open(path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+
+        old_entry = old_entries.get(name)
+
+        if old_entry != None and old_entry[4] == digest:
+            offset, length, width, height, _ = old_entry
+            packed = old_bundle[offset:offset + length]
+        else:
+            print('Converting {0}'.format(os.path.basename(path)))
+            packed, width, height = packed_bytes_from_image(path)
+            changed = True
+
+        entries[name] = (len(bundle), len(packed), width, height, digest)
+        bundle += packed
+
+    if not changed and set(entries.keys()) == set(old_entries.keys()):
+        print('Icon bundle is up to date')
+        return
+
+    with open(BUNDLE_PATH, 'wb') as f:
+        f.write(bundle)
+
+    write_index(entries)
+    print('Wrote {0} icons ({1} bytes) to {2}'.format(len(entries), len(bundle), BUNDLE_NAME))
+
 if __name__ == '__main__':
     if len(sys.argv) < 2:
-        print('Give image file as parameter')
+        print('Give image file or --batch as parameter')
+        sys.exit()
+
+    if sys.argv[1] == '--batch':
+        batch()
         sys.exit()
 
     data, width, height = load_image(sys.argv[1])
-    print('class IconName(Icon):')
-    print('    WIDTH  = {0}'.format(width))
-    print('    HEIGHT = {0}'.format(height))
-    print('    data   = {0}'.format(data))
+    print('IconName = Icon({0}, {1}, {2})'.format(width, height, packed_literal_from_bool_list(data)))
@@ -39,7 +39,7 @@ DESCRIPTION = 'Demo for Tabletop Weather Station'
 packages = find_packages(include=[UNDERSCORE_NAME, '{0}.*'.format(UNDERSCORE_NAME)])
 
 package_data = {}
-image_patterns = ['*.bmp', '*.png', '*.jpg']
+image_patterns = ['*.bmp', '*.png', '*.jpg', '*.bin']
 
 for package in packages:
     package_path = os.path.join(*package.split('.'))
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tabletop Weather Station
+Copyright (C) 2026 Tinkerforge GmbH
+
+aggregator.py: Collects the measurements of several Tabletop Weather Stations
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public
+License along with this program; if not, write to the
+Free Software Foundation, Inc., 59 Temple Place - Suite 330,
+Boston, MA 02111-1307, USA.
+"""
+
+# Headless aggregation mode: connects to a list of brickd endpoints, each with
+# an Air Quality and/or an Outdoor Weather Bricklet, and stores the
+# measurements of all of them in one database. Every row is tagged with the
+# source id of its endpoint. The ids are kept in the sources table of the
+# database (see ValueDB.get_source_id), so an endpoint keeps its id across
+# restarts and changes of the endpoint list.
+#
+# All IPConnections share one ConnectionManager. Every endpoint connects in
+# its own thread and reconnects on its own, so an endpoint that is down or
+# doesn't answer never delays the others. Retries back off per endpoint, see
+# tinkerforge/reconnect_policy.py.
+
+import socket
+import threading
+import time
+import logging as log
+
+try:
+    from tabletop_weather_station_demo.tinkerforge.ip_connection import IPConnection, Error
+    from tabletop_weather_station_demo.tinkerforge.connection_manager import ConnectionManager
+    from tabletop_weather_station_demo.tinkerforge.bricklet_air_quality import BrickletAirQuality
+    from tabletop_weather_station_demo.tinkerforge.bricklet_outdoor_weather import BrickletOutdoorWeather
+    from tabletop_weather_station_demo.tinkerforge.reconnect_policy import ReconnectPolicy
+except ImportError:
+    from tinkerforge.ip_connection import IPConnection, Error
+    from tinkerforge.connection_manager import ConnectionManager
+    from tinkerforge.bricklet_air_quality import BrickletAirQuality
+    from tinkerforge.bricklet_outdoor_weather import BrickletOutdoorWeather
+    from tinkerforge.reconnect_policy import ReconnectPolicy
+
+from tabletop_weather_station_demo.screens import TIME_SECONDS
+
+RECONNECT_INITIAL_INTERVAL = 0.5
+RECONNECT_MAX_INTERVAL     = 60.0
+
+def parse_endpoints(value, default_port):
+    # 'host1,host2:4224' -> [('host1', 4223), ('host2', 4224)]
+    endpoints = []
+
+    for endpoint in value.split(','):
+        endpoint = endpoint.strip()
+
+        if len(endpoint) == 0:
+            continue
+
+        if ':' in endpoint:
+            host, port = endpoint.rsplit(':', 1)
+            endpoints.append((host, int(port)))
+        else:
+            endpoints.append((endpoint, default_port))
+
+    return endpoints
+
+class Source:
+    # One brickd endpoint
+    def __init__(self, aggregator, source_id, host, port):
+        self.aggregator = aggregator
+        self.source_id = source_id
+        self.host = host
+        self.port = port
+        self.name = '{0}:{1}'.format(host, port)
+        self.reconnect_policy = ReconnectPolicy(RECONNECT_INITIAL_INTERVAL, RECONNECT_MAX_INTERVAL)
+        self.ipcon = IPConnection(aggregator.manager)
+        self.ipcon.set_reconnect_policy(self.reconnect_policy)
+        self.air_quality = None
+        self.outdoor_weather = None
+        self.thread = None
+
+        self.last_air_quality_time = 0
+        self.last_station_time = 0
+        self.last_sensor_time = 0
+
+    def start(self):
+        self.thread = threading.Thread(name='Source-' + self.name, target=self.connect)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        self.thread.join(2)
+
+        try:
+            self.ipcon.disconnect()
+        except Error:
+            pass # not connected
+
+    def connect(self):
+        self.ipcon.register_callback(IPConnection.CALLBACK_ENUMERATE, self.cb_enumerate)
+        self.ipcon.register_callback(IPConnection.CALLBACK_CONNECTED, self.cb_connected)
+
+        while not self.aggregator.stop_event.is_set():
+            try:
+                self.ipcon.connect(self.host, self.port)
+                self.reconnect_policy.reset()
+                break
+            except Error as e:
+                self.reconnect_policy.report(log.error, '{0}: Connection Error: {1}'.format(self.name, e.description))
+            except socket.error as e:
+                self.reconnect_policy.report(log.error, '{0}: Socket error: {1}'.format(self.name, e))
+
+            if self.aggregator.stop_event.wait(self.reconnect_policy.next_delay()):
+                break
+
+    def cb_connected(self, connected_reason):
+        if connected_reason == IPConnection.CONNECT_REASON_AUTO_RECONNECT:
+            log.info('{0}: Auto Reconnect'.format(self.name))
+        else:
+            log.info('{0}: Connected, source id {1}'.format(self.name, self.source_id))
+
+        while not self.aggregator.stop_event.is_set():
+            try:
+                self.ipcon.enumerate()
+                self.reconnect_policy.reset()
+                break
+            except Error as e:
+                self.reconnect_policy.report(log.error, '{0}: Enumerate Error: {1}'.format(self.name, e.description))
+
+            if self.aggregator.stop_event.wait(self.reconnect_policy.next_delay()):
+                break
+
+    def cb_enumerate(self, uid, connected_uid, position, hardware_version,
+                     firmware_version, device_identifier, enumeration_type):
+        if enumeration_type != IPConnection.ENUMERATION_TYPE_CONNECTED and \
+           enumeration_type != IPConnection.ENUMERATION_TYPE_AVAILABLE:
+            return
+
+        if device_identifier == BrickletAirQuality.DEVICE_IDENTIFIER:
+            try:
+                self.air_quality = BrickletAirQuality(uid, self.ipcon)
+
+                self.cb_air_quality_all_values(*self.air_quality.get_all_values())
+
+                self.air_quality.register_callback(self.air_quality.CALLBACK_ALL_VALUES, self.cb_air_quality_all_values)
+                self.air_quality.set_all_values_callback_configuration(1000, False)
+
+                log.info('{0}: Air Quality Bricklet initialized'.format(self.name))
+            except Error as e:
+                log.error('{0}: Air Quality Bricklet init failed: {1}'.format(self.name, e.description))
+                self.air_quality = None
+        elif device_identifier == BrickletOutdoorWeather.DEVICE_IDENTIFIER:
+            try:
+                self.outdoor_weather = BrickletOutdoorWeather(uid, self.ipcon)
+
+                identifiers = self.outdoor_weather.get_station_identifiers()
+                for i, data in zip(identifiers, self.outdoor_weather.get_station_data_many(identifiers)):
+                    self.cb_outdoor_weather_station_data(i, *data)
+
+                identifiers = self.outdoor_weather.get_sensor_identifiers()
+                for i, data in zip(identifiers, self.outdoor_weather.get_sensor_data_many(identifiers)):
+                    self.cb_outdoor_weather_sensor_data(i, *data)
+
+                self.outdoor_weather.register_callback(self.outdoor_weather.CALLBACK_STATION_DATA, self.cb_outdoor_weather_station_data)
+                self.outdoor_weather.set_callback_coalescing(self.outdoor_weather.CALLBACK_STATION_DATA, 1) # per identifier
+                self.outdoor_weather.set_station_callback_configuration(True)
+
+                self.outdoor_weather.register_callback(self.outdoor_weather.CALLBACK_SENSOR_DATA, self.cb_outdoor_weather_sensor_data)
+                self.outdoor_weather.set_callback_coalescing(self.outdoor_weather.CALLBACK_SENSOR_DATA, 1) # per identifier
+                self.outdoor_weather.set_sensor_callback_configuration(True)
+
+                log.info('{0}: Outdoor Weather Bricklet initialized'.format(self.name))
+            except Error as e:
+                log.error('{0}: Outdoor Weather Bricklet init failed: {1}'.format(self.name, e.description))
+                self.outdoor_weather = None
+
+    def cb_outdoor_weather_station_data(self, identifier, temperature, humidity, wind_speed, gust_speed, rain, wind_direction, battery_low, last_change = 0):
+        self.aggregator.publish('station', {'source': self.source_id, 'identifier': identifier, 'temperature': temperature,
+                                            'humidity': humidity, 'wind_speed': wind_speed, 'gust_speed': gust_speed, 'rain': rain,
+                                            'wind_direction': wind_direction, 'battery_low': battery_low})
+
+        now = time.time()
+        if now - self.last_station_time >= self.aggregator.logging_period:
+            self.aggregator.vdb.add_data_station(identifier, temperature, humidity, wind_speed, gust_speed, rain, wind_direction, battery_low, self.source_id)
+            self.last_station_time = now
+
+    def cb_outdoor_weather_sensor_data(self, identifier, temperature, humidity, last_change = 0):
+        self.aggregator.publish('sensor', {'source': self.source_id, 'identifier': identifier, 'temperature': temperature, 'humidity': humidity})
+
+        now = time.time()
+        if now - self.last_sensor_time >= self.aggregator.logging_period:
+            self.aggregator.vdb.add_data_sensor(identifier, temperature, humidity, self.source_id)
+            self.last_sensor_time = now
+
+    def cb_air_quality_all_values(self, iaq_index, iaq_index_accuracy, temperature, humidity, air_pressure):
+        self.aggregator.publish('air_quality', {'source': self.source_id, 'iaq_index': iaq_index, 'iaq_index_accuracy': iaq_index_accuracy,
+                                                'temperature': temperature, 'humidity': humidity, 'air_pressure': air_pressure})
+
+        now = time.time()
+        if now - self.last_air_quality_time >= self.aggregator.logging_period:
+            self.aggregator.vdb.add_data_air_quality(iaq_index, iaq_index_accuracy, temperature, humidity, air_pressure, self.source_id)
+            self.last_air_quality_time = now
+
+class Aggregator:
+    def __init__(self, vdb, endpoints, publishers):
+        self.vdb = vdb
+        self.publishers = publishers
+        self.stop_event = threading.Event()
+
+        # an endpoint that is down blocks at most one callback thread with
+        # its auto reconnect, keep one spare for the others
+        self.manager = ConnectionManager(callback_threads=len(endpoints) + 1)
+
+        logging_period_index = vdb.get_setting('logging_period')
+
+        if logging_period_index == None:
+            logging_period_index = 0
+
+        self.logging_period = TIME_SECONDS[int(logging_period_index)]
+        self.sources = [Source(self, vdb.get_source_id('{0}:{1}'.format(host, port)), host, port) for host, port in endpoints]
+
+    def start(self):
+        for source in self.sources:
+            source.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+        for source in self.sources:
+            source.stop()
+
+        self.manager.stop()
+
+    def publish(self, message_type, values):
+        for publisher in self.publishers:
+            publisher.publish(message_type, values)
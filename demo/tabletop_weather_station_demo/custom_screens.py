@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 
 import time
-from tabletop_weather_station_demo.screens import Screen
+from tabletop_weather_station_demo.screens import Screen, REFRESH_SECOND
 
 # Simple example for a custom screen.
 # In this example we show the time in HH:MM:SS format.
@@ -11,12 +11,15 @@ class ClockScreen(Screen):
     text = "Clock" # Text shown on tab
     icon = None    # Icon shown on tab (see icons.py and data/ sub-directory)
 
+    # refresh: List of reasons for calling draw_update (see REFRESH_* in screens.py)
+    refresh = [REFRESH_SECOND] # A clock has to be redrawn every second
+
     # Called when tab is selected
     def draw_init(self):
         self.lcd.draw_text(40, 5, self.lcd.FONT_12X16, self.lcd.COLOR_BLACK, 'Time')
         self.draw_update()
     
-    # Called when new data is available (usually once per second)
+    # Called when one of the refresh reasons occurred
     def draw_update(self):
         # Get current time in HH:MM:SS format
         current_time = time.strftime("%H:%M:%S")
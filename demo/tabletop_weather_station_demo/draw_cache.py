@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tabletop Weather Station
+Copyright (C) 2026 Tinkerforge GmbH
+
+draw_cache.py: Drops redundant drawing calls to the LCD 128x64 Bricklet
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public
+License along with this program; if not, write to the
+Free Software Foundation, Inc., 59 Temple Place - Suite 330,
+Boston, MA 02111-1307, USA.
+"""
+
+from tabletop_weather_station_demo.framebuffer import FONT_SCALES
+
+def rects_overlap(a, b):
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+class CachedLCD:
+    # Stands in for a BrickletLCD128x64 object. Remembers the last arguments
+    # of draw_text, write_pixels, write_pixels_packed (icons) and
+    # set_gui_graph_data per position and drops calls that would draw exactly
+    # the same again.
+    #
+    # Everything that could change the pixels below a remembered call
+    # invalidates it: clear_display, the remove_gui_* functions and drawing
+    # lines or boxes over it.
+    def __init__(self, lcd):
+        self.lcd = lcd
+        self.cache = {} # (primitive, position) -> (arguments, rect)
+        self.hits = 0
+        self.misses = 0
+
+    def __getattr__(self, name):
+        return getattr(self.lcd, name)
+
+    def invalidate(self):
+        self.cache.clear()
+
+    def invalidate_rect(self, rect, keep_key=None):
+        for key, (_, other) in list(self.cache.items()):
+            if key != keep_key and other != None and rects_overlap(rect, other):
+                del self.cache[key]
+
+    def get_statistics(self):
+        return self.hits, self.misses
+
+    def is_cached(self, key, args):
+        cached = self.cache.get(key)
+
+        if cached != None and (cached[0] is args or cached[0] == args):
+            self.hits += 1
+            return True
+
+        self.misses += 1
+        return False
+
+    def remember(self, key, args, rect):
+        if rect != None:
+            self.invalidate_rect(rect, key)
+
+        self.cache[key] = (args, rect)
+
+    def draw_text(self, position_x, position_y, font, color, text):
+        key = ('draw_text', position_x, position_y, font)
+        args = (color, text)
+
+        if self.is_cached(key, args):
+            return
+
+        self.lcd.draw_text(position_x, position_y, font, color, text)
+
+        scale_x, scale_y = FONT_SCALES[font]
+        rect = (position_x, position_y, position_x + len(text)*6*scale_x - 1, position_y + 8*scale_y - 1)
+        self.remember(key, args, rect)
+
+    def write_pixels(self, x_start, y_start, x_end, y_end, pixels):
+        key = ('write_pixels', x_start, y_start, x_end, y_end)
+
+        if self.is_cached(key, pixels):
+            return
+
+        self.lcd.write_pixels(x_start, y_start, x_end, y_end, pixels)
+        self.remember(key, pixels, (x_start, y_start, x_end, y_end))
+
+    def write_pixels_packed(self, x_start, y_start, x_end, y_end, pixels_length, pixels_chunks):
+        key = ('write_pixels', x_start, y_start, x_end, y_end)
+
+        if self.is_cached(key, pixels_chunks):
+            return
+
+        self.lcd.write_pixels_packed(x_start, y_start, x_end, y_end, pixels_length, pixels_chunks)
+        self.remember(key, pixels_chunks, (x_start, y_start, x_end, y_end))
+
+    def set_gui_graph_data(self, index, data):
+        key = ('set_gui_graph_data', index)
+        data = list(data)
+
+        if self.is_cached(key, data):
+            return
+
+        self.lcd.set_gui_graph_data(index, data)
+        self.remember(key, data, None)
+
+    def draw_line(self, position_x_start, position_y_start, position_x_end, position_y_end, color):
+        self.lcd.draw_line(position_x_start, position_y_start, position_x_end, position_y_end, color)
+        self.invalidate_rect((min(position_x_start, position_x_end), min(position_y_start, position_y_end),
+                              max(position_x_start, position_x_end), max(position_y_start, position_y_end)))
+
+    def draw_box(self, position_x_start, position_y_start, position_x_end, position_y_end, fill, color):
+        self.lcd.draw_box(position_x_start, position_y_start, position_x_end, position_y_end, fill, color)
+        self.invalidate_rect((min(position_x_start, position_x_end), min(position_y_start, position_y_end),
+                              max(position_x_start, position_x_end), max(position_y_start, position_y_end)))
+
+    def write_line(self, line, position, text):
+        self.invalidate()
+        self.lcd.write_line(line, position, text)
+
+    def clear_display(self):
+        self.invalidate()
+        self.lcd.clear_display()
+
+    def set_gui_graph_configuration(self, index, graph_type, position_x, position_y, width, height, text_x, text_y):
+        self.invalidate()
+        self.lcd.set_gui_graph_configuration(index, graph_type, position_x, position_y, width, height, text_x, text_y)
+
+    def remove_gui_button(self, index):
+        self.invalidate()
+        self.lcd.remove_gui_button(index)
+
+    def remove_gui_slider(self, index):
+        self.invalidate()
+        self.lcd.remove_gui_slider(index)
+
+    def remove_gui_tab(self, index):
+        self.invalidate()
+        self.lcd.remove_gui_tab(index)
+
+    def remove_gui_graph(self, index):
+        self.invalidate()
+        self.lcd.remove_gui_graph(index)
+
+    def remove_all_gui(self):
+        self.invalidate()
+        self.lcd.remove_all_gui()
@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tabletop Weather Station
+Copyright (C) 2026 Tinkerforge GmbH
+
+framebuffer.py: Off-screen 128x64 framebuffer for the LCD 128x64 Bricklet
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public
+License along with this program; if not, write to the
+Free Software Foundation, Inc., 59 Temple Place - Suite 330,
+Boston, MA 02111-1307, USA.
+"""
+
+# 5x7 font in a 6x8 cell, one byte per column with the top row in bit 0.
+# Characters that are not in this table are drawn as a box.
+FONT_6X8 = {
+    ' ': b'\x00\x00\x00\x00\x00', '!': b'\x00\x00\x5F\x00\x00', '"': b'\x00\x07\x00\x07\x00', '#': b'\x14\x7F\x14\x7F\x14',
+    '$': b'\x24\x2A\x7F\x2A\x12', '%': b'\x23\x13\x08\x64\x62', '&': b'\x36\x49\x55\x22\x50', "'": b'\x00\x05\x03\x00\x00',
+    '(': b'\x00\x1C\x22\x41\x00', ')': b'\x00\x41\x22\x1C\x00', '*': b'\x14\x08\x3E\x08\x14', '+': b'\x08\x08\x3E\x08\x08',
+    ',': b'\x00\x50\x30\x00\x00', '-': b'\x08\x08\x08\x08\x08', '.': b'\x00\x60\x60\x00\x00', '/': b'\x20\x10\x08\x04\x02',
+    '0': b'\x3E\x51\x49\x45\x3E', '1': b'\x00\x42\x7F\x40\x00', '2': b'\x42\x61\x51\x49\x46', '3': b'\x21\x41\x45\x4B\x31',
+    '4': b'\x18\x14\x12\x7F\x10', '5': b'\x27\x45\x45\x45\x39', '6': b'\x3C\x4A\x49\x49\x30', '7': b'\x01\x71\x09\x05\x03',
+    '8': b'\x36\x49\x49\x49\x36', '9': b'\x06\x49\x49\x29\x1E', ':': b'\x00\x36\x36\x00\x00', ';': b'\x00\x56\x36\x00\x00',
+    '<': b'\x08\x14\x22\x41\x00', '=': b'\x14\x14\x14\x14\x14', '>': b'\x00\x41\x22\x14\x08', '?': b'\x02\x01\x51\x09\x06',
+    '@': b'\x32\x49\x79\x41\x3E', 'A': b'\x7E\x11\x11\x11\x7E', 'B': b'\x7F\x49\x49\x49\x36', 'C': b'\x3E\x41\x41\x41\x22',
+    'D': b'\x7F\x41\x41\x22\x1C', 'E': b'\x7F\x49\x49\x49\x41', 'F': b'\x7F\x09\x09\x01\x01', 'G': b'\x3E\x41\x41\x51\x32',
+    'H': b'\x7F\x08\x08\x08\x7F', 'I': b'\x00\x41\x7F\x41\x00', 'J': b'\x20\x40\x41\x3F\x01', 'K': b'\x7F\x08\x14\x22\x41',
+    'L': b'\x7F\x40\x40\x40\x40', 'M': b'\x7F\x02\x04\x02\x7F', 'N': b'\x7F\x04\x08\x10\x7F', 'O': b'\x3E\x41\x41\x41\x3E',
+    'P': b'\x7F\x09\x09\x09\x06', 'Q': b'\x3E\x41\x51\x21\x5E', 'R': b'\x7F\x09\x19\x29\x46', 'S': b'\x46\x49\x49\x49\x31',
+    'T': b'\x01\x01\x7F\x01\x01', 'U': b'\x3F\x40\x40\x40\x3F', 'V': b'\x1F\x20\x40\x20\x1F', 'W': b'\x7F\x20\x18\x20\x7F',
+    'X': b'\x63\x14\x08\x14\x63', 'Y': b'\x03\x04\x78\x04\x03', 'Z': b'\x61\x51\x49\x45\x43', '[': b'\x00\x7F\x41\x41\x00',
+    '\\': b'\x02\x04\x08\x10\x20', ']': b'\x00\x41\x41\x7F\x00', '^': b'\x04\x02\x01\x02\x04', '_': b'\x40\x40\x40\x40\x40',
+    '`': b'\x00\x01\x02\x04\x00', 'a': b'\x20\x54\x54\x54\x78', 'b': b'\x7F\x48\x44\x44\x38', 'c': b'\x38\x44\x44\x44\x20',
+    'd': b'\x38\x44\x44\x48\x7F', 'e': b'\x38\x54\x54\x54\x18', 'f': b'\x08\x7E\x09\x01\x02', 'g': b'\x08\x14\x54\x54\x3C',
+    'h': b'\x7F\x08\x04\x04\x78', 'i': b'\x00\x44\x7D\x40\x00', 'j': b'\x20\x40\x44\x3D\x00', 'k': b'\x00\x7F\x10\x28\x44',
+    'l': b'\x00\x41\x7F\x40\x00', 'm': b'\x7C\x04\x18\x04\x78', 'n': b'\x7C\x08\x04\x04\x78', 'o': b'\x38\x44\x44\x44\x38',
+    'p': b'\x7C\x14\x14\x14\x08', 'q': b'\x08\x14\x14\x18\x7C', 'r': b'\x7C\x08\x04\x04\x08', 's': b'\x48\x54\x54\x54\x20',
+    't': b'\x04\x3F\x44\x40\x20', 'u': b'\x3C\x40\x40\x20\x7C', 'v': b'\x1C\x20\x40\x20\x1C', 'w': b'\x3C\x40\x30\x40\x3C',
+    'x': b'\x44\x28\x10\x28\x44', 'y': b'\x0C\x50\x50\x50\x3C', 'z': b'\x44\x64\x54\x4C\x44', '{': b'\x00\x08\x36\x41\x00',
+    '|': b'\x00\x00\x7F\x00\x00', '}': b'\x00\x41\x36\x08\x00', '~': b'\x02\x01\x02\x04\x02', '\xF8': b'\x00\x06\x09\x09\x06'
+}
+FONT_UNKNOWN = b'\x7F\x41\x41\x41\x7F'
+
+# Horizontal and vertical scaling of the 6x8 font for the FONT_* constants
+# of the LCD 128x64 Bricklet (FONT_6X8 = 0 ... FONT_24X32 = 9)
+FONT_SCALES = [(1, 1), (1, 2), (1, 3), (1, 4), (2, 2), (2, 3), (2, 4), (3, 3), (3, 4), (4, 4)]
+
+class FrameBuffer:
+    WIDTH  = 128
+    HEIGHT = 64
+    STRIDE = WIDTH // 8
+
+    # The pixels are stored line by line top to bottom, each line left to
+    # right with the leftmost pixel in the least significant bit. This is the
+    # same order that is used by the write_pixels function of the Bricklet.
+    def __init__(self):
+        self.data = bytearray(FrameBuffer.STRIDE*FrameBuffer.HEIGHT)
+
+    def clear(self):
+        self.data[:] = bytes(len(self.data))
+
+    def get_pixel(self, x, y):
+        return (self.data[y*FrameBuffer.STRIDE + (x >> 3)] >> (x & 7)) & 1 == 1
+
+    def set_pixel(self, x, y, color):
+        if x < 0 or y < 0 or x >= FrameBuffer.WIDTH or y >= FrameBuffer.HEIGHT:
+            return
+
+        index = y*FrameBuffer.STRIDE + (x >> 3)
+
+        if color:
+            self.data[index] |= 1 << (x & 7)
+        else:
+            self.data[index] &= ~(1 << (x & 7)) & 0xFF
+
+    def draw_line(self, x_start, y_start, x_end, y_end, color):
+        dx = abs(x_end - x_start)
+        dy = -abs(y_end - y_start)
+        sx = 1 if x_start < x_end else -1
+        sy = 1 if y_start < y_end else -1
+        error = dx + dy
+
+        while True:
+            self.set_pixel(x_start, y_start, color)
+
+            if x_start == x_end and y_start == y_end:
+                break
+
+            e2 = 2*error
+
+            if e2 >= dy:
+                error += dy
+                x_start += sx
+
+            if e2 <= dx:
+                error += dx
+                y_start += sy
+
+    def draw_box(self, x_start, y_start, x_end, y_end, fill, color):
+        if fill:
+            for y in range(y_start, y_end + 1):
+                self.draw_line(x_start, y, x_end, y, color)
+        else:
+            self.draw_line(x_start, y_start, x_end, y_start, color)
+            self.draw_line(x_start, y_end, x_end, y_end, color)
+            self.draw_line(x_start, y_start, x_start, y_end, color)
+            self.draw_line(x_end, y_start, x_end, y_end, color)
+
+    def draw_text(self, x, y, font, color, text):
+        scale_x, scale_y = FONT_SCALES[font]
+
+        for char in text:
+            columns = FONT_6X8.get(char, FONT_UNKNOWN) + b'\x00'
+
+            for column, bits in enumerate(columns):
+                for row in range(8):
+                    # Text is drawn opaque, the background is drawn in the
+                    # inverted color, as done by the Bricklet itself
+                    pixel = color if (bits >> row) & 1 else not color
+
+                    for i in range(scale_x):
+                        for j in range(scale_y):
+                            self.set_pixel(x + column*scale_x + i, y + row*scale_y + j, pixel)
+
+            x += 6*scale_x
+
+    def write_pixels(self, x_start, y_start, x_end, y_end, pixels):
+        if isinstance(pixels, (bytes, bytearray, memoryview)):
+            # already bit-packed
+            pixels_length = (x_end - x_start + 1) * (y_end - y_start + 1)
+            self.write_pixels_packed(x_start, y_start, x_end, y_end, pixels_length, [bytes(pixels)])
+            return
+
+        i = 0
+
+        for y in range(y_start, y_end + 1):
+            for x in range(x_start, x_end + 1):
+                if i >= len(pixels):
+                    return
+
+                self.set_pixel(x, y, pixels[i])
+                i += 1
+
+    def write_pixels_packed(self, x_start, y_start, x_end, y_end, pixels_length, pixels_chunks):
+        packed = b''.join(pixels_chunks)
+        i = 0
+
+        for y in range(y_start, y_end + 1):
+            for x in range(x_start, x_end + 1):
+                if i >= pixels_length:
+                    return
+
+                self.set_pixel(x, y, (packed[i // 8] >> (i % 8)) & 1 == 1)
+                i += 1
+
+    def get_pixels(self, x_start, y_start, x_end, y_end):
+        pixels = []
+
+        for y in range(y_start, y_end + 1):
+            for x in range(x_start, x_end + 1):
+                pixels.append(self.get_pixel(x, y))
+
+        return pixels
+
+    def get_pixels_packed(self, x_start, y_start, x_end, y_end):
+        # The window has to be aligned to 8 pixels horizontally, then the
+        # packed pixels are just the row slices of the framebuffer
+        stride = FrameBuffer.STRIDE
+        first = x_start // 8
+        last = x_end // 8 + 1
+
+        return b''.join([bytes(self.data[y*stride + first:y*stride + last]) for y in range(y_start, y_end + 1)])
+
+    def diff(self, other):
+        # Returns the list of rectangles (x_start, y_start, x_end, y_end) that
+        # differ between this and the other framebuffer. Horizontally the
+        # rectangles are aligned to 8 pixels, every contiguous span of changed
+        # bytes in a line is a rectangle of its own. Spans that cover the same
+        # bytes in consecutive lines are merged. The rectangles so never
+        # include unchanged pixels, that might belong to a GUI element drawn
+        # by the Bricklet itself.
+        stride = FrameBuffer.STRIDE
+        rects = []
+        bands = {} # (first, last) byte of a span -> band that includes the previous line
+
+        for y in range(FrameBuffer.HEIGHT):
+            offset = y*stride
+            line_bands = {}
+
+            if self.data[offset:offset + stride] != other.data[offset:offset + stride]:
+                i = 0
+
+                while i < stride:
+                    if self.data[offset + i] == other.data[offset + i]:
+                        i += 1
+                        continue
+
+                    first = i
+                    while i < stride and self.data[offset + i] != other.data[offset + i]:
+                        i += 1
+
+                    key = (first, i - 1)
+                    band = bands.pop(key, None)
+
+                    if band == None:
+                        band = [first*8, y, (i - 1)*8 + 7, y]
+                    else:
+                        band[3] = y
+
+                    line_bands[key] = band
+
+            # bands that don't continue in this line are finished
+            rects.extend(bands.values())
+            bands = line_bands
+
+        rects.extend(bands.values())
+
+        return sorted(tuple(rect) for rect in rects)
+
+class FrameBufferLCD:
+    # Stands in for a BrickletLCD128x64 object. The drawing functions draw into
+    # a local framebuffer, flush() transfers the rectangles that changed since
+    # the last flush with write_pixels. Everything else (GUI elements, display
+    # configuration, getters) is passed through to the Bricklet.
+    def __init__(self, lcd):
+        self.lcd = lcd
+        self.frame = FrameBuffer()
+        self.frame_sent = FrameBuffer()
+
+    def __getattr__(self, name):
+        return getattr(self.lcd, name)
+
+    def clear_display(self):
+        self.frame.clear()
+        self.frame_sent.clear()
+        self.lcd.clear_display()
+
+    def draw_line(self, position_x_start, position_y_start, position_x_end, position_y_end, color):
+        self.frame.draw_line(position_x_start, position_y_start, position_x_end, position_y_end, color)
+
+    def draw_box(self, position_x_start, position_y_start, position_x_end, position_y_end, fill, color):
+        self.frame.draw_box(position_x_start, position_y_start, position_x_end, position_y_end, fill, color)
+
+    def draw_text(self, position_x, position_y, font, color, text):
+        self.frame.draw_text(position_x, position_y, font, color, text)
+
+    def write_pixels(self, x_start, y_start, x_end, y_end, pixels):
+        self.frame.write_pixels(x_start, y_start, x_end, y_end, pixels)
+
+    def write_pixels_packed(self, x_start, y_start, x_end, y_end, pixels_length, pixels_chunks):
+        self.frame.write_pixels_packed(x_start, y_start, x_end, y_end, pixels_length, pixels_chunks)
+
+    def flush(self):
+        rects = self.frame.diff(self.frame_sent)
+
+        for x_start, y_start, x_end, y_end in rects:
+            self.lcd.write_pixels(x_start, y_start, x_end, y_end, self.frame.get_pixels_packed(x_start, y_start, x_end, y_end))
+
+            # Only remember what was actually transferred, if write_pixels
+            # fails the remaining rectangles are sent on the next flush
+            for y in range(y_start, y_end + 1):
+                first = y*FrameBuffer.STRIDE + x_start // 8
+                last = y*FrameBuffer.STRIDE + x_end // 8 + 1
+                self.frame_sent.data[first:last] = self.frame.data[first:last]
+
+        return len(rects)
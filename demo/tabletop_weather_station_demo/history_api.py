@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tabletop Weather Station
+Copyright (C) 2026 Tinkerforge GmbH
+
+history_api.py: Read-only HTTP/JSON access to the recorded history
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public
+License along with this program; if not, write to the
+Free Software Foundation, Inc., 59 Temple Place - Suite 330,
+Boston, MA 02111-1307, USA.
+"""
+
+# GET /api/data?table=station&field=temperature&identifier=1&resolution=60&num=100
+#
+#   The last num values averaged over resolution seconds, oldest first, as
+#   shown by the graph screens (ValueDB.get_data).
+#
+# GET /api/range?table=air_quality&field=iaq_index&resolution=3600&start=...&end=...
+#
+#   [time, value] pairs for all buckets of resolution seconds from start to
+#   end (unix time), value is null for buckets without data
+#   (ValueDB.get_data_range).
+#
+# The parameter source only returns rows of the given source id, see
+# aggregator.py. /api/range averages the buckets over all sources by default.
+# /api/data counts rows instead of time, the rows of several sources would be
+# mixed into the same values, so source is required there if the series has
+# rows of more than one source.
+#
+# Values are the raw values as stored by the Bricklets. All queries go through
+# a pool of read-only connections and never wait for the database thread.
+# Finished buckets are cached until they are evicted, results that include the
+# current bucket are reused until the bucket is finished, but at most for
+# CURRENT_BUCKET_TTL seconds.
+# Responses carry an ETag and are gzip compressed if the client accepts it.
+
+import json
+import gzip
+import time
+import hashlib
+import threading
+import collections
+import logging as log
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from tabletop_weather_station_demo.metrics import ThreadingHTTPServer
+from tabletop_weather_station_demo.value_db import ReadOnlyConnectionPool, get_table_for_resolution, query_data, query_data_range, query_sources
+
+# fields that can be queried per table, the names are used in SQL queries
+HISTORY_FIELDS = {
+    'air_quality': ['iaq_index', 'iaq_index_accuracy', 'temperature', 'humidity', 'air_pressure'],
+    'station':     ['temperature', 'humidity', 'wind_speed', 'gust_speed', 'rain'],
+    'sensor':      ['temperature', 'humidity'],
+}
+
+MAX_NUM = 10000 # maximum number of values or buckets per request
+MIN_GZIP_SIZE = 512
+CURRENT_BUCKET_TTL = 5 # seconds
+
+class RequestError(Exception):
+    def __init__(self, code, message):
+        Exception.__init__(self, message)
+        self.code = code
+        self.message = message
+
+def get_bucket_end(table, bucket, resolution):
+    # Returns the time at which a bucket is finished. The rows of the rollup
+    # tables cover a minute, an hour or a day and keep changing until their
+    # span is over, if the resolution is not a multiple of that span the last
+    # row of a bucket ends after the bucket.
+    _, _, span = get_table_for_resolution(table, resolution)
+    end = bucket + resolution
+
+    return end + (-end) % span
+
+def get_expiry(table, bucket, resolution, now):
+    # Returns the time until which the value of a bucket that is not finished
+    # yet can be reused
+    return min(get_bucket_end(table, bucket, resolution), now + CURRENT_BUCKET_TTL)
+
+class DataCache:
+    # Caches the results of /api/data keyed by (series, resolution, num, start
+    # of the current bucket), each with the time it expires.
+    def __init__(self, max_size=1000):
+        self.max_size = max_size
+        self.values = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, now):
+        # Returns the cached value or None if unknown or expired
+        with self.lock:
+            entry = self.values.get(key)
+
+            if entry == None or entry[1] <= now:
+                self.misses += 1
+                return None
+
+            self.values.move_to_end(key)
+            self.hits += 1
+
+            return entry[0]
+
+    def put(self, key, value, expires):
+        with self.lock:
+            self.values[key] = (value, expires)
+            self.values.move_to_end(key)
+
+            while len(self.values) > self.max_size:
+                self.values.popitem(last=False)
+
+class BucketCache:
+    # Caches the value of every bucket keyed by (series, resolution, bucket
+    # start). Finished buckets never change, as new data is always added to
+    # the current bucket, they are kept until evicted. The current bucket
+    # expires, see get_bucket_end and get_expiry. Buckets without data are
+    # cached as None.
+    def __init__(self, max_size=100000):
+        self.max_size = max_size
+        self.values = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_range(self, pool, series, resolution, start, end):
+        table, field, identifier, source = series
+        now = time.time()
+        buckets = list(range(start, end, resolution))
+        result = {}
+        missing = None
+
+        with self.lock:
+            for bucket in buckets:
+                key = (series, resolution, bucket)
+                entry = self.values.get(key)
+
+                if entry != None and (entry[1] == None or entry[1] > now):
+                    self.values.move_to_end(key)
+                    result[bucket] = entry[0]
+                    self.hits += 1
+                elif missing == None:
+                    missing = bucket
+
+        if missing != None:
+            with pool.cursor() as dbc:
+                values = query_data_range(dbc, missing, end, resolution, field, table, identifier, field == 'rain', source)
+
+            with self.lock:
+                for bucket in range(missing, end, resolution):
+                    if bucket in result:
+                        continue
+
+                    value = values.get(bucket)
+                    result[bucket] = value
+                    self.misses += 1
+
+                    if get_bucket_end(table, bucket, resolution) <= now:
+                        expires = None
+                    else:
+                        expires = get_expiry(table, bucket, resolution, now)
+
+                    self.values[(series, resolution, bucket)] = (value, expires)
+                    self.values.move_to_end((series, resolution, bucket))
+
+                while len(self.values) > self.max_size:
+                    self.values.popitem(last=False)
+
+        return [[bucket, result[bucket]] for bucket in buckets]
+
+def get_int_parameter(parameters, name, default=None, minimum=None):
+    values = parameters.get(name)
+
+    if values == None:
+        if default == None:
+            raise RequestError(400, 'Missing parameter: {0}'.format(name))
+
+        return default
+
+    try:
+        value = int(values[0])
+    except ValueError:
+        raise RequestError(400, 'Invalid parameter: {0}'.format(name))
+
+    if minimum != None and value < minimum:
+        raise RequestError(400, 'Parameter out of range: {0}'.format(name))
+
+    return value
+
+def get_series(parameters):
+    table = parameters.get('table', [None])[0]
+    field = parameters.get('field', [None])[0]
+
+    if table not in HISTORY_FIELDS:
+        raise RequestError(400, 'Unknown table: {0}'.format(table))
+
+    if field not in HISTORY_FIELDS[table]:
+        raise RequestError(400, 'Unknown field: {0}'.format(field))
+
+    if table == 'air_quality':
+        identifier = None
+    else:
+        identifier = get_int_parameter(parameters, 'identifier', minimum=0)
+
+    if 'source' in parameters:
+        source = get_int_parameter(parameters, 'source', minimum=0)
+    else:
+        source = None
+
+    return table, field, identifier, source
+
+class HistoryRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        parameters = parse_qs(url.query)
+
+        try:
+            if url.path == '/api/data':
+                data = self.server.history.get_data(parameters)
+            elif url.path == '/api/range':
+                data = self.server.history.get_data_range(parameters)
+            else:
+                raise RequestError(404, 'Not found')
+        except RequestError as e:
+            self.send_json(e.code, {'error': e.message})
+            return
+        except:
+            log.exception('Error while reading history')
+            self.send_json(500, {'error': 'Internal error'})
+            return
+
+        self.send_json(200, data)
+
+    def send_json(self, code, data):
+        body = json.dumps(data, separators=(',', ':')).encode('utf-8')
+        etag = '"{0}"'.format(hashlib.sha1(body).hexdigest())
+
+        if code == 200 and etag in self.headers.get('If-None-Match', ''):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        gzipped = len(body) >= MIN_GZIP_SIZE and 'gzip' in self.headers.get('Accept-Encoding', '')
+
+        if gzipped:
+            body = gzip.compress(body, 6)
+
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Vary', 'Accept-Encoding')
+
+        if code == 200:
+            self.send_header('ETag', etag)
+
+        if gzipped:
+            self.send_header('Content-Encoding', 'gzip')
+
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class HistoryServer:
+    def __init__(self, host, port, vdb, pool_size=4):
+        self.host = host
+        self.port = port
+        self.pool = ReadOnlyConnectionPool(vdb.db_path, pool_size)
+        self.cache = BucketCache()
+        self.data_cache = DataCache()
+        self.server = None
+        self.thread = None
+
+    def get_data(self, parameters):
+        series = get_series(parameters)
+        resolution = get_int_parameter(parameters, 'resolution', minimum=1)
+        num = get_int_parameter(parameters, 'num', minimum=1)
+
+        if num > MAX_NUM:
+            raise RequestError(400, 'Too many values requested')
+
+        now = time.time()
+        bucket = int(now) - int(now) % resolution
+        key = (series, resolution, num, bucket)
+        values = self.data_cache.get(key, now)
+
+        if values == None:
+            values = self.query_data(series, resolution, num)
+            self.data_cache.put(key, values, get_expiry(series[0], bucket, resolution, now))
+
+        return values
+
+    def query_data(self, series, resolution, num):
+        table, field, identifier, source = series
+
+        with self.pool.cursor() as dbc:
+            if source == None:
+                sources = query_sources(dbc, table, identifier)
+
+                if len(sources) > 1:
+                    raise RequestError(400, 'Missing parameter: source (one of {0})'.format(', '.join(map(str, sources))))
+
+            return query_data(dbc, num, resolution, field, table, identifier, field == 'rain', source)
+
+    def get_data_range(self, parameters):
+        series = get_series(parameters)
+        resolution = get_int_parameter(parameters, 'resolution', minimum=1)
+        end = get_int_parameter(parameters, 'end', int(time.time()), minimum=0)
+        start = get_int_parameter(parameters, 'start', minimum=0)
+        start -= start % resolution
+
+        if end <= start:
+            return []
+
+        if (end - start) // resolution > MAX_NUM:
+            raise RequestError(400, 'Too many buckets requested')
+
+        return self.cache.get_range(self.pool, series, resolution, start, end)
+
+    def start(self):
+        self.server = ThreadingHTTPServer((self.host, self.port), HistoryRequestHandler)
+        self.server.history = self
+
+        self.thread = threading.Thread(name='History-Server', target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+        log.info('Serving history on http://{0}:{1}/api/'.format(*self.server.server_address[:2]))
+
+    def stop(self):
+        if self.server != None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+
+# Generated by "icon_from_image.py --batch" from the images in the ../data/
+# folder, do not edit. The pixels are stored in the icons.bin bundle.
+
+BUNDLE = 'icons.bin'
+
+# name: (offset, length, width, height, sha256 of image file)
+ICONS = {
+    'icon_battery_empty': (0, 56, 16, 7, '8b295113982e5b61cfe5fce47197c22cac263b041670e62ce962a91b4525a1f9'),
+    'icon_battery_full': (56, 56, 16, 7, '88968c500ffa875b7dc4bd130fcfa8e1a80d0ff390e7d1ad81453f72f859262d'),
+    'icon_compass': (112, 168, 30, 31, '22ce3e435d99ca576c63eb31accb4e4b41ab38988552173d581b9da120f25e8e'),
+    'icon_flag_east': (280, 56, 12, 18, 'faca9ae03f62fc29215d7779c58735f2de47354308b010a7027e63c68395a8b9'),
+    'icon_flag_west': (336, 56, 12, 18, '32affa8e3c3befc56fd7b80ab26d1b56c942843c875a15173c8ae11550954e27'),
+    'icon_hand': (392, 56, 21, 21, '220eb7d4a038763736b1458fb22c5ddb40d8b2cc30caf8620b375de5588d2c09'),
+    'icon_humidity': (448, 56, 13, 18, 'de067cd1c9227e0a373f54403aae0eaa219770b0130f7231fca0d2315d6af79b'),
+    'icon_left_swipe_updown': (504, 112, 28, 30, '7ffd35a32b27468847a68b0d83db2e112d4caf1e7223962d0464ceeb56bd38a7'),
+    'icon_left_swipe_updown_small': (616, 112, 21, 30, 'f15ade36736d7f4d6e08cb1d4bb304a2d1599373a12cd5818de727bcfd71ce30'),
+    'icon_pressure': (728, 56, 11, 27, '099e054954160b63416e90e2bc105434cf7b0888a71b68bb9cd48a23611a5f1b'),
+    'icon_pressure_small': (784, 56, 11, 23, '0e50541b216fc28058d2cdd612450faee2020734a9a48471e610c5dfd9777d26'),
+    'icon_rain': (840, 56, 12, 16, '39c355e74aec9c7d19a070eeba0df9296e2bd920e324deb77ba2f96bb1713b80'),
+    'icon_right_swipe_updown': (896, 112, 20, 30, '889d0316973cb6ec0b9f985bdeccc717220ce63f46abc528b14d0f884a41d484'),
+    'icon_tab_data': (1008, 56, 28, 6, '957944d6f4ab0e4f93f93012511fe71a65f5f11da3fbdc4688843b8d62411bf1'),
+    'icon_tab_graph': (1064, 56, 28, 6, 'ec27d58727311256a3ae7656d393fc9c9b91be22820c167c6ed4ce0d81303010'),
+    'icon_tab_sensor': (1120, 56, 28, 6, '9d31c70179e3bdfefc45b84f3e06709bc11a83b0146618a93bdb19bc2aff76c8'),
+    'icon_tab_settings': (1176, 56, 28, 6, 'da958b2fa0aa2906d0d83fdedbcc389d8e157a1e770a2541d2e3a7c77fdbe14b'),
+    'icon_tab_station': (1232, 56, 28, 6, 'c5a273c902fd560f092aff87765c4fbd5e1c7fded7b1079a6c328a0213078df1'),
+    'icon_temperature': (1288, 56, 9, 17, '021aff1e1d56ca081f198794699276e532bf8ccae3cc3435275b1781220a831a'),
+    'icon_thumbs_down': (1344, 56, 21, 21, 'd2e62f5536ad539888c66b08c48114c5242b61c97f6f0f8bdebfa95a7adff881'),
+    'icon_thumbs_none': (1400, 56, 21, 21, '39b3a569c019d9d64d25c572c5c5ac9384847fcdc4731c6fb7e4072df6598562'),
+    'icon_thumbs_side': (1456, 56, 21, 21, '6406d4ac9e2551b3ae5972bc95fbf03818ebdf5ea6596f7a6a6541783e91f325'),
+    'icon_thumbs_up': (1512, 56, 21, 21, '9a7802140c092f81a197427c8f6ddaaeb805a46bedf16623eba734e8546aaee6'),
+    'wind_speed': (1568, 112, 28, 30, 'c7345a4ce0bca1b5887f714af7bfaa67d1e3c3ef2b61fb577b736e4807b4b12f'),
+}
@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tabletop Weather Station
+Copyright (C) 2026 Tinkerforge GmbH
+
+live_stream.py: Pushes incoming measurements to WebSocket clients
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public
+License along with this program; if not, write to the
+Free Software Foundation, Inc., 59 Temple Place - Suite 330,
+Boston, MA 02111-1307, USA.
+"""
+
+# Clients connect to ws://host:port/live and receive one JSON text message
+# per measurement:
+#
+#   {"type": "station", "time": 1700000000.0, "identifier": 12, "temperature": 215, ...}
+#
+# The type is air_quality, station or sensor, the values are the raw values
+# of the callbacks. ws://host:port/live?types=station,sensor only subscribes
+# to the given types.
+#
+# All clients are served by one asyncio event loop in its own thread. The
+# Bricklet callbacks only hand the values over to that loop, every message is
+# encoded once and written to all subscribed clients without waiting. A
+# client that doesn't read fast enough, so that more than MAX_BUFFER_SIZE
+# bytes are waiting to be sent to it, is disconnected.
+
+import json
+import time
+import base64
+import struct
+import asyncio
+import hashlib
+import threading
+import logging as log
+from urllib.parse import urlparse, parse_qs
+
+WEBSOCKET_GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+OPCODE_TEXT = 0x1
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xA
+
+MESSAGE_TYPES = ['air_quality', 'station', 'sensor']
+
+MAX_BUFFER_SIZE = 256 * 1024 # pending bytes per client
+MAX_REQUEST_SIZE = 8192
+MAX_CLIENT_FRAME_SIZE = 4096 # clients only send control frames
+
+def encode_frame(opcode, payload):
+    # server frames are not masked
+    length = len(payload)
+
+    if length < 126:
+        header = struct.pack('!BB', 0x80 | opcode, length)
+    elif length < 65536:
+        header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+
+    return header + payload
+
+async def read_frame(reader):
+    # returns (opcode, payload) of the next client frame
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+
+    if length == 126:
+        length, = struct.unpack('!H', await reader.readexactly(2))
+    elif length == 127:
+        length, = struct.unpack('!Q', await reader.readexactly(8))
+
+    if length > MAX_CLIENT_FRAME_SIZE:
+        raise ValueError('Frame too large')
+
+    if second & 0x80:
+        mask = await reader.readexactly(4)
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(await reader.readexactly(length)))
+    else:
+        payload = await reader.readexactly(length)
+
+    return first & 0x0F, payload
+
+class Client:
+    def __init__(self, writer, types):
+        self.writer = writer
+        self.types = types
+
+class LiveStreamServer:
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self.clients = set()
+        self.client_count = 0 # read without the loop by publish()
+        self.dropped_count = 0
+        self.started = threading.Event()
+        self.error = None
+
+    def start(self):
+        self.thread = threading.Thread(name='Live-Stream', target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+        self.started.wait()
+
+        if self.error != None:
+            raise self.error
+
+        log.info('Serving live stream on ws://{0}:{1}/live'.format(*self.server.sockets[0].getsockname()[:2]))
+
+    def run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+        try:
+            self.server = self.loop.run_until_complete(asyncio.start_server(self.handle_client, self.host, self.port,
+                                                                            limit=MAX_REQUEST_SIZE))
+        except OSError as e:
+            self.error = e
+            self.started.set()
+            return
+
+        self.started.set()
+        self.loop.run_forever()
+
+        self.server.close()
+        self.loop.run_until_complete(self.server.wait_closed())
+        self.loop.close()
+
+    def stop(self):
+        if self.loop != None and self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self.shutdown)
+            self.thread.join(2)
+
+    def shutdown(self):
+        for client in list(self.clients):
+            self.remove_client(client, encode_frame(OPCODE_CLOSE, struct.pack('!H', 1001)))
+
+        self.loop.stop()
+
+    def publish(self, message_type, values):
+        # Called by the Bricklet callbacks, never blocks
+        if self.client_count == 0:
+            return
+
+        try:
+            self.loop.call_soon_threadsafe(self.broadcast, message_type, time.time(), values)
+        except RuntimeError:
+            pass # loop already closed
+
+    def broadcast(self, message_type, timestamp, values):
+        message = {'type': message_type, 'time': timestamp}
+        message.update(values)
+        frame = encode_frame(OPCODE_TEXT, json.dumps(message, separators=(',', ':')).encode('utf-8'))
+
+        for client in list(self.clients):
+            if message_type not in client.types:
+                continue
+
+            if client.writer.transport.get_write_buffer_size() > MAX_BUFFER_SIZE:
+                self.dropped_count += 1
+                self.remove_client(client, None)
+                continue
+
+            client.writer.write(frame)
+
+    def add_client(self, client):
+        self.clients.add(client)
+        self.client_count = len(self.clients)
+
+    def remove_client(self, client, frame):
+        if client not in self.clients:
+            return
+
+        self.clients.discard(client)
+        self.client_count = len(self.clients)
+
+        if frame != None:
+            client.writer.write(frame)
+            client.writer.close()
+        else:
+            client.writer.transport.abort() # slow client, drop pending data
+
+    async def handle_client(self, reader, writer):
+        try:
+            types = await self.handshake(reader, writer)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError, ConnectionError):
+            writer.close()
+            return
+
+        if types == None:
+            writer.close()
+            return
+
+        client = Client(writer, types)
+        self.add_client(client)
+
+        try:
+            while client in self.clients:
+                opcode, payload = await read_frame(reader)
+
+                if opcode == OPCODE_CLOSE:
+                    self.remove_client(client, encode_frame(OPCODE_CLOSE, payload[:2]))
+                elif opcode == OPCODE_PING:
+                    writer.write(encode_frame(OPCODE_PONG, payload))
+        except (asyncio.IncompleteReadError, ValueError, ConnectionError):
+            pass
+        finally:
+            self.remove_client(client, None)
+
+    async def handshake(self, reader, writer):
+        # returns the subscribed message types or None if the request was
+        # answered with an error
+        request = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+        method, target, _ = request[0].split(' ', 2)
+        headers = {}
+
+        for line in request[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+
+        url = urlparse(target)
+
+        if method != 'GET' or url.path != '/live':
+            writer.write(b'HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n')
+            return None
+
+        key = headers.get('sec-websocket-key')
+
+        if headers.get('upgrade', '').lower() != 'websocket' or key == None:
+            writer.write(b'HTTP/1.1 426 Upgrade Required\r\nSec-WebSocket-Version: 13\r\nContent-Length: 0\r\n\r\n')
+            return None
+
+        types = set(MESSAGE_TYPES)
+
+        for value in parse_qs(url.query).get('types', []):
+            types = types.intersection(value.split(','))
+
+        accept = base64.b64encode(hashlib.sha1(key.encode('latin-1') + WEBSOCKET_GUID).digest())
+
+        writer.write(b'HTTP/1.1 101 Switching Protocols\r\n'
+                     b'Upgrade: websocket\r\n'
+                     b'Connection: Upgrade\r\n'
+                     b'Sec-WebSocket-Accept: ' + accept + b'\r\n\r\n')
+
+        return types
@@ -27,7 +27,50 @@ if (sys.hexversion & 0xFF000000) != 0x03000000:
     print('Python 3.x required')
     sys.exit(1)
 
-if hasattr(sys, 'frozen'):
+def get_argument_value(name, default=None):
+    args = sys.argv[1:]
+
+    if name in args and args.index(name) + 1 < len(args):
+        return args[args.index(name) + 1]
+
+    return default
+
+# Optional multi-process layout, see process_link.py: the ingestion process
+# owns the connection to the Air Quality and Outdoor Weather Bricklets and the
+# database, the UI process drives the LCD and the log window. --processes
+# starts the ingestion process as child process and runs the UI process,
+# --process ingestion|ui runs only one of them. Both talk over
+# 127.0.0.1:<link-port>.
+PROCESS_ROLE_ALL       = 'all'
+PROCESS_ROLE_INGESTION = 'ingestion'
+PROCESS_ROLE_UI        = 'ui'
+
+spawn_ingestion = '--processes' in sys.argv[1:]
+
+if spawn_ingestion:
+    process_role = PROCESS_ROLE_UI
+else:
+    process_role = get_argument_value('--process', PROCESS_ROLE_ALL)
+
+if process_role not in [PROCESS_ROLE_ALL, PROCESS_ROLE_INGESTION, PROCESS_ROLE_UI]:
+    print('Unknown process role: ' + process_role)
+    sys.exit(1)
+
+link_port = int(get_argument_value('--link-port', '4290'))
+database_path = get_argument_value('--database')
+
+# Headless aggregation mode: collect the measurements of several Tabletop
+# Weather Stations into one database, endpoints are given as
+# host[:port],host[:port],... see aggregator.py
+aggregate_endpoints = get_argument_value('--aggregate')
+
+if aggregate_endpoints != None and process_role != PROCESS_ROLE_ALL:
+    print('Aggregation mode cannot be combined with --process or --processes')
+    sys.exit(1)
+
+if process_role == PROCESS_ROLE_INGESTION or aggregate_endpoints != None:
+    gui = False # no log window in the ingestion process and the aggregation mode
+elif hasattr(sys, 'frozen'):
     gui = True
 else:
     gui = '--gui' in sys.argv[1:]
@@ -35,6 +78,45 @@ else:
 if gui:
     from PyQt5 import QtCore, QtWidgets, QtGui
 
+# Draw into a local framebuffer and only transfer the changed parts to the LCD
+framebuffer = '--framebuffer' in sys.argv[1:]
+
+# Record all packets from and to brickd into a trace file, or replay such a
+# trace instead of connecting to brickd (speed 0 replays as fast as possible).
+# With --processes each process has its own connection: the UI process records
+# the LCD traffic to PATH and the ingestion process records the Air Quality and
+# Outdoor Weather traffic to PATH.ingestion. --replay PATH likewise replays
+# PATH in the UI process and PATH.ingestion in the ingestion process.
+INGESTION_TRACE_SUFFIX = '.ingestion'
+
+trace_path = get_argument_value('--trace')
+replay_path = get_argument_value('--replay')
+replay_speed = float(get_argument_value('--replay-speed', '1'))
+
+# Record request latencies and callback queue statistics of the IPConnection
+# and log a summary every given number of seconds
+stats_interval = get_argument_value('--stats')
+
+if stats_interval != None:
+    stats_interval = float(stats_interval)
+
+# Serve sensor values and process health in the Prometheus text format on
+# http://<metrics-host>:<metrics-port>/metrics, the response is rendered at
+# most once per metrics interval
+metrics_port = get_argument_value('--metrics-port')
+metrics_host = get_argument_value('--metrics-host', '127.0.0.1')
+metrics_interval = float(get_argument_value('--metrics-interval', '10'))
+
+# Serve the recorded history read-only as JSON on
+# http://<history-host>:<history-port>/api/, see history_api.py
+history_port = get_argument_value('--history-port')
+history_host = get_argument_value('--history-host', '127.0.0.1')
+
+# Push every measurement to WebSocket clients connected to
+# ws://<live-host>:<live-port>/live, see live_stream.py
+live_port = get_argument_value('--live-port')
+live_host = get_argument_value('--live-host', '127.0.0.1')
+
 import os
 import signal
 
@@ -44,6 +126,7 @@ log.basicConfig(format='%(asctime)s <%(levelname)s> %(message)s', level=log.INFO
 import time
 import threading
 import socket
+import subprocess
 
 import queue
 
@@ -77,14 +160,27 @@ try:
     from tabletop_weather_station_demo.tinkerforge.bricklet_lcd_128x64 import BrickletLCD128x64
     from tabletop_weather_station_demo.tinkerforge.bricklet_air_quality import BrickletAirQuality, GetAllValues
     from tabletop_weather_station_demo.tinkerforge.bricklet_outdoor_weather import BrickletOutdoorWeather, GetStationData, GetSensorData
+    from tabletop_weather_station_demo.tinkerforge.packet_trace import TraceWriter, ReplayServer
+    from tabletop_weather_station_demo.tinkerforge.ip_connection_stats import ConnectionStats
+    from tabletop_weather_station_demo.tinkerforge.reconnect_policy import ReconnectPolicy
 except ImportError:
     from tinkerforge.ip_connection import IPConnection, Error
     from tinkerforge.bricklet_lcd_128x64 import BrickletLCD128x64
     from tinkerforge.bricklet_air_quality import BrickletAirQuality, GetAllValues
     from tinkerforge.bricklet_outdoor_weather import BrickletOutdoorWeather, GetStationData, GetSensorData
-
-from tabletop_weather_station_demo.screens import screen_set_lcd, screen_tab_selected, screen_touch_gesture, screen_update, screen_slider_value, Screen, TIME_SECONDS
-from tabletop_weather_station_demo.value_db import ValueDB
+    from tinkerforge.packet_trace import TraceWriter, ReplayServer
+    from tinkerforge.ip_connection_stats import ConnectionStats
+    from tinkerforge.reconnect_policy import ReconnectPolicy
+
+from tabletop_weather_station_demo.screens import screen_set_lcd, screen_tab_selected, screen_touch_gesture, screen_update, screen_slider_value, \
+    screen_set_wakeup_queue, screen_mark_dirty, screen_get_timeout, screen_get_draw_cache_statistics, Screen, TIME_SECONDS, REFRESH_AIR_QUALITY, REFRESH_STATION, REFRESH_SENSOR, \
+    RENDER_MODE_DIRECT
+from tabletop_weather_station_demo.value_db import ValueDB, ValueDBReader, get_db_path, get_schema_version, SCHEMA_VERSION
+from tabletop_weather_station_demo.metrics import MetricsServer
+from tabletop_weather_station_demo.history_api import HistoryServer
+from tabletop_weather_station_demo.live_stream import LiveStreamServer
+from tabletop_weather_station_demo.process_link import IngestionLink, UILink
+from tabletop_weather_station_demo.aggregator import Aggregator, parse_endpoints
 from tabletop_weather_station_demo.config import DEMO_VERSION
 
 def get_resources_path(relative_path, warn_on_missing_file=True):
@@ -129,6 +225,15 @@ if INTERNAL != None:
 elif SNAPSHOT != None:
     DEMO_FULL_VERSION += '+snapshot~{}'.format(SNAPSHOT)
 
+# Backoff of the connect and enumerate retries and of the auto-reconnect, see
+# tinkerforge/reconnect_policy.py
+RECONNECT_INITIAL_INTERVAL = 0.5
+RECONNECT_MAX_INTERVAL     = 30.0
+
+# Callback lanes of the IPConnection, see Device.set_callback_lane
+CALLBACK_LANE_GUI  = 'gui'
+CALLBACK_LANE_DATA = 'data'
+
 if gui:
     class GUIHandler(QtCore.QObject, log.Handler):
         qtcb_add = QtCore.pyqtSignal(str)
@@ -157,6 +262,7 @@ class TabletopWeatherStation(object):
     vdb = None
     ipcon = None
     lcd128x64 = None
+    display_configuration = None # contrast, backlight and automatic draw set by the user
     air_quality = None
     outdoor_weather = None
 
@@ -166,6 +272,7 @@ class TabletopWeatherStation(object):
 
     graph_resolution_index = None
     logging_period_index = None
+    render_mode_index = None
 
     def update_graph_resolution(self):
         index = self.vdb.get_setting('graph_resolution')
@@ -181,12 +288,21 @@ class TabletopWeatherStation(object):
             self.vdb.set_setting('logging_period', '1')
         self.logging_period_index = int(index)
 
-    def __init__(self, vdb, run_ref, stop_queue):
+    def update_render_mode(self):
+        index = self.vdb.get_setting('render_mode')
+        if index == None:
+            index = RENDER_MODE_DIRECT
+            self.vdb.set_setting('render_mode', str(index))
+        self.render_mode_index = int(index)
+
+    def __init__(self, vdb, run_ref, stop_queue, publishers):
         self.vdb = vdb
         self.run_ref = run_ref
         self.stop_queue = stop_queue
+        self.publishers = publishers # get every measurement, see live_stream.py and process_link.py
         self.update_graph_resolution()
         self.update_logging_period()
+        self.update_render_mode()
 
         # We use this lock to make sure that there is never an update at the
         # same time as a gesture or GUI callback. Otherwise we might draw two
@@ -197,48 +313,91 @@ class TabletopWeatherStation(object):
         self.last_station_time = 0
         self.last_sensor_time = 0
 
+        host = TabletopWeatherStation.HOST
+        port = TabletopWeatherStation.PORT
+
+        if replay_path != None:
+            self.replay = ReplayServer(replay_path, replay_speed)
+            host, port = self.replay.start()
+            log.info('Replaying {0} at speed {1}'.format(replay_path, replay_speed))
+
+        # Shared by the connect and enumerate retries below and in
+        # cb_connected and by the auto-reconnect of the IPConnection
+        self.reconnect_policy = ReconnectPolicy(RECONNECT_INITIAL_INTERVAL, RECONNECT_MAX_INTERVAL)
+
         self.ipcon = IPConnection()
+        self.ipcon.set_reconnect_policy(self.reconnect_policy)
+
+        if trace_path != None:
+            self.ipcon.set_trace(TraceWriter(trace_path))
+            log.info('Recording packet trace to {0}'.format(trace_path))
+
+        if stats_interval != None or (metrics_port != None and process_role != PROCESS_ROLE_UI):
+            self.ipcon.set_stats(ConnectionStats())
+
         while self.run_ref[0]:
             try:
-                self.ipcon.connect(TabletopWeatherStation.HOST, TabletopWeatherStation.PORT)
+                self.ipcon.connect(host, port)
+                self.reconnect_policy.reset()
                 break
             except Error as e:
-                log.error('Connection Error: ' + str(e.description))
-
-                try:
-                    self.stop_queue.get(timeout=1.0)
-                    break
-                except queue.Empty:
-                    pass
+                self.reconnect_policy.report(log.error, 'Connection Error: ' + str(e.description))
             except socket.error as e:
-                log.error('Socket error: ' + str(e))
+                self.reconnect_policy.report(log.error, 'Socket error: ' + str(e))
 
-                try:
-                    self.stop_queue.get(timeout=1.0)
-                    break
-                except queue.Empty:
-                    pass
+            if self.wait_for_stop(self.reconnect_policy.next_delay()):
+                break
 
         self.ipcon.register_callback(IPConnection.CALLBACK_ENUMERATE, self.cb_enumerate)
         self.ipcon.register_callback(IPConnection.CALLBACK_CONNECTED, self.cb_connected)
 
+        self.enumerate()
+
+    def enumerate(self):
         while self.run_ref[0]:
             try:
                 self.ipcon.enumerate()
+                self.reconnect_policy.reset()
                 break
             except Error as e:
-                log.error('Enumerate Error: ' + str(e.description))
+                self.reconnect_policy.report(log.error, 'Enumerate Error: ' + str(e.description))
 
-                try:
-                    self.stop_queue.get(timeout=1.0)
-                    break
-                except queue.Empty:
-                    pass
+            if self.wait_for_stop(self.reconnect_policy.next_delay()):
+                break
+
+    def wait_for_stop(self, timeout):
+        # The stop queue is also used to wake up the screen loop for a redraw,
+        # only None means that the program should stop
+        deadline = time.time() + timeout
+
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return False
+
+            try:
+                if self.stop_queue.get(timeout=remaining) == None:
+                    return True
+            except queue.Empty:
+                return False
 
     def update(self):
         if self.lcd128x64 == None:
             return
 
+    def get_uid_names(self):
+        uid_names = {}
+
+        for device in [self.lcd128x64, self.air_quality, self.outdoor_weather]:
+            if device != None:
+                uid_names[device.uid] = device.DEVICE_DISPLAY_NAME
+
+        return uid_names
+
+    def log_stats(self):
+        for line in self.ipcon.stats.format_summary(self.get_uid_names()):
+            log.info('IPConnection: ' + line)
+
     def cb_touch_gesture(self, gesture, duration, pressure_max, x_start, x_end, y_start, y_end, age):
         self.update_lock.acquire()
         screen_touch_gesture(gesture, duration, pressure_max, x_start, x_end, y_start, y_end, age)
@@ -259,6 +418,9 @@ class TabletopWeatherStation(object):
         if enumeration_type == IPConnection.ENUMERATION_TYPE_CONNECTED or \
            enumeration_type == IPConnection.ENUMERATION_TYPE_AVAILABLE:
             if device_identifier == BrickletLCD128x64.DEVICE_IDENTIFIER:
+                if process_role == PROCESS_ROLE_INGESTION:
+                    return
+
                 try:
                     self.lcd128x64 = BrickletLCD128x64(uid, self.ipcon)
                     self.lcd128x64.set_response_expected_all(True)
@@ -267,17 +429,35 @@ class TabletopWeatherStation(object):
                     self.lcd128x64.register_callback(self.lcd128x64.CALLBACK_TOUCH_GESTURE, self.cb_touch_gesture)
                     self.lcd128x64.register_callback(self.lcd128x64.CALLBACK_GUI_TAB_SELECTED, self.cb_gui_tab_selected)
                     self.lcd128x64.register_callback(self.lcd128x64.CALLBACK_GUI_SLIDER_VALUE, self.cb_gui_slider_value)
+
+                    # Touch and GUI callbacks get their own lane, so they are
+                    # not stuck behind data callbacks waiting for the database
+                    self.lcd128x64.set_callback_lane(self.lcd128x64.CALLBACK_TOUCH_GESTURE, CALLBACK_LANE_GUI)
+                    self.lcd128x64.set_callback_lane(self.lcd128x64.CALLBACK_GUI_TAB_SELECTED, CALLBACK_LANE_GUI)
+                    self.lcd128x64.set_callback_lane(self.lcd128x64.CALLBACK_GUI_SLIDER_VALUE, CALLBACK_LANE_GUI)
+
+                    # Only the latest queued position per slider index matters
+                    self.lcd128x64.set_callback_coalescing(self.lcd128x64.CALLBACK_GUI_SLIDER_VALUE, 1)
+
                     self.lcd128x64.set_touch_gesture_callback_configuration(10, True)
                     self.lcd128x64.set_gui_tab_selected_callback_configuration(100, True)
                     self.lcd128x64.set_gui_slider_value_callback_configuration(100, True)
 
-                    screen_set_lcd(self.lcd128x64)
+                    # Only read once, the settings screen changes it and the
+                    # buffered render mode toggles automatic draw per frame
+                    self.display_configuration = self.lcd128x64.get_display_configuration()
+
+                    screen_set_lcd(self.lcd128x64, framebuffer)
                     log.info('LCD 128x64 Bricklet initialized')
                 except Error as e:
                     log.error('LCD 128x64 Bricklet init failed: ' + str(e.description))
                     self.lcd128x64 = None
+                    self.display_configuration = None
                     screen_set_lcd(None)
             elif device_identifier == BrickletAirQuality.DEVICE_IDENTIFIER:
+                if process_role == PROCESS_ROLE_UI:
+                    return
+
                 try:
                     self.air_quality = BrickletAirQuality(uid, self.ipcon)
 
@@ -285,6 +465,8 @@ class TabletopWeatherStation(object):
                     self.cb_air_quality_all_values(*self.air_quality.get_all_values())
 
                     self.air_quality.register_callback(self.air_quality.CALLBACK_ALL_VALUES, self.cb_air_quality_all_values)
+                    self.air_quality.set_callback_lane(self.air_quality.CALLBACK_ALL_VALUES, CALLBACK_LANE_DATA)
+                    self.air_quality.set_callback_coalescing(self.air_quality.CALLBACK_ALL_VALUES, 0)
                     self.air_quality.set_all_values_callback_configuration(1000, False)
 
                     log.info('Air Quality Bricklet initialized')
@@ -292,20 +474,29 @@ class TabletopWeatherStation(object):
                     log.error('Air Quality Bricklet init failed: ' + str(e.description))
                     self.air_quality = None
             elif device_identifier == BrickletOutdoorWeather.DEVICE_IDENTIFIER:
+                if process_role == PROCESS_ROLE_UI:
+                    return
+
                 try:
                     self.outdoor_weather = BrickletOutdoorWeather(uid, self.ipcon)
 
                     # Update data once directly on initial enumerate
-                    for i in self.outdoor_weather.get_station_identifiers():
-                        self.cb_outdoor_weather_station_data(i, *self.outdoor_weather.get_station_data(i))
+                    identifiers = self.outdoor_weather.get_station_identifiers()
+                    for i, data in zip(identifiers, self.outdoor_weather.get_station_data_many(identifiers)):
+                        self.cb_outdoor_weather_station_data(i, *data)
 
-                    for i in self.outdoor_weather.get_sensor_identifiers():
-                        self.cb_outdoor_weather_sensor_data(i, *self.outdoor_weather.get_sensor_data(i))
+                    identifiers = self.outdoor_weather.get_sensor_identifiers()
+                    for i, data in zip(identifiers, self.outdoor_weather.get_sensor_data_many(identifiers)):
+                        self.cb_outdoor_weather_sensor_data(i, *data)
 
                     self.outdoor_weather.register_callback(self.outdoor_weather.CALLBACK_STATION_DATA, self.cb_outdoor_weather_station_data)
+                    self.outdoor_weather.set_callback_lane(self.outdoor_weather.CALLBACK_STATION_DATA, CALLBACK_LANE_DATA)
+                    self.outdoor_weather.set_callback_coalescing(self.outdoor_weather.CALLBACK_STATION_DATA, 1) # per identifier
                     self.outdoor_weather.set_station_callback_configuration(True)
 
                     self.outdoor_weather.register_callback(self.outdoor_weather.CALLBACK_SENSOR_DATA, self.cb_outdoor_weather_sensor_data)
+                    self.outdoor_weather.set_callback_lane(self.outdoor_weather.CALLBACK_SENSOR_DATA, CALLBACK_LANE_DATA)
+                    self.outdoor_weather.set_callback_coalescing(self.outdoor_weather.CALLBACK_SENSOR_DATA, 1) # per identifier
                     self.outdoor_weather.set_sensor_callback_configuration(True)
 
                     log.info('Outdoor Weather Bricklet initialized')
@@ -316,22 +507,15 @@ class TabletopWeatherStation(object):
     def cb_connected(self, connected_reason):
         if connected_reason == IPConnection.CONNECT_REASON_AUTO_RECONNECT:
             log.info('Auto Reconnect')
-
-            while self.run_ref[0]:
-                try:
-                    self.ipcon.enumerate()
-                    break
-                except Error as e:
-                    log.error('Enumerate Error: ' + str(e.description))
-
-                    try:
-                        self.stop_queue.get(timeout=1.0)
-                        break
-                    except queue.Empty:
-                        pass
+            self.enumerate()
 
     def cb_outdoor_weather_station_data(self, identifier, temperature, humidity, wind_speed, gust_speed, rain, wind_direction, battery_low, last_change = 0):
         self.outdoor_weather_station_last_value[identifier] = GetStationData(temperature, humidity, wind_speed, gust_speed, rain, wind_direction, battery_low, last_change)
+        screen_mark_dirty(REFRESH_STATION)
+
+        self.publish('station', {'identifier': identifier, 'temperature': temperature, 'humidity': humidity,
+                                 'wind_speed': wind_speed, 'gust_speed': gust_speed, 'rain': rain,
+                                 'wind_direction': wind_direction, 'battery_low': battery_low})
 
         now = time.time()
         if now - self.last_station_time >= TIME_SECONDS[self.logging_period_index]:
@@ -340,6 +524,9 @@ class TabletopWeatherStation(object):
 
     def cb_outdoor_weather_sensor_data(self, identifier, temperature, humidity, last_change = 0):
         self.outdoor_weather_sensor_last_value[identifier] = GetSensorData(temperature, humidity, 0)
+        screen_mark_dirty(REFRESH_SENSOR)
+
+        self.publish('sensor', {'identifier': identifier, 'temperature': temperature, 'humidity': humidity})
 
         now = time.time()
         if now - self.last_sensor_time >= TIME_SECONDS[self.logging_period_index]:
@@ -348,17 +535,177 @@ class TabletopWeatherStation(object):
 
     def cb_air_quality_all_values(self, iaq_index, iaq_index_accuracy, temperature, humidity, air_pressure):
         self.air_quality_last_value = GetAllValues(iaq_index, iaq_index_accuracy, temperature, humidity, air_pressure)
+        screen_mark_dirty(REFRESH_AIR_QUALITY)
+
+        self.publish('air_quality', {'iaq_index': iaq_index, 'iaq_index_accuracy': iaq_index_accuracy,
+                                     'temperature': temperature, 'humidity': humidity, 'air_pressure': air_pressure})
 
         now = time.time()
         if now - self.last_air_quality_time >= TIME_SECONDS[self.logging_period_index]:
             self.vdb.add_data_air_quality(iaq_index, iaq_index_accuracy, temperature, humidity, air_pressure)
             self.last_air_quality_time = now
 
-def loop(run_ref, stop_queue, packaged):
-    vdb = ValueDB(gui, packaged)
-    tws = TabletopWeatherStation(vdb, run_ref, stop_queue)
-    Screen.tws = tws
+    def publish(self, message_type, values):
+        for publisher in self.publishers:
+            publisher.publish(message_type, values)
+
+    def get_link_state(self):
+        # Last values as (type, values) messages for a newly connected UI
+        # process, the same messages as published by the callbacks
+        state = []
+
+        if self.air_quality_last_value != None:
+            state.append(('air_quality', self.air_quality_last_value._asdict()))
+
+        for identifier, value in sorted(dict(self.outdoor_weather_station_last_value).items()):
+            values = value._asdict()
+            values.pop('last_change')
+            values['identifier'] = identifier
+            state.append(('station', values))
+
+        for identifier, value in sorted(dict(self.outdoor_weather_sensor_last_value).items()):
+            values = value._asdict()
+            values.pop('last_change')
+            values['identifier'] = identifier
+            state.append(('sensor', values))
+
+        return state
+
+    def cb_link_values(self, message_type, values):
+        # UI process: a measurement received by the ingestion process
+        if message_type == 'air_quality':
+            self.air_quality_last_value = GetAllValues(values['iaq_index'], values['iaq_index_accuracy'], values['temperature'],
+                                                       values['humidity'], values['air_pressure'])
+            screen_mark_dirty(REFRESH_AIR_QUALITY)
+        elif message_type == 'station':
+            self.outdoor_weather_station_last_value[values['identifier']] = GetStationData(values['temperature'], values['humidity'], values['wind_speed'],
+                                                                                           values['gust_speed'], values['rain'], values['wind_direction'],
+                                                                                           values['battery_low'], 0)
+            screen_mark_dirty(REFRESH_STATION)
+        elif message_type == 'sensor':
+            self.outdoor_weather_sensor_last_value[values['identifier']] = GetSensorData(values['temperature'], values['humidity'], 0)
+            screen_mark_dirty(REFRESH_SENSOR)
+
+    def cb_link_setting(self, key, value):
+        # Ingestion process: a setting changed on the settings screen of the
+        # UI process
+        self.vdb.set_setting(key, value)
+
+        if key == 'logging_period':
+            self.logging_period_index = int(value)
+        elif key == 'graph_resolution':
+            self.graph_resolution_index = int(value)
+        elif key == 'render_mode':
+            self.render_mode_index = int(value)
+
+# Upper bound for the time the screen loop sleeps without a redraw request,
+# in case a wakeup got consumed by one of the connect/enumerate retry loops
+SCREEN_IDLE_TIMEOUT = 10.0
+
+def start_history_server(vdb):
+    if history_port == None:
+        return None
+
+    history_server = HistoryServer(history_host, int(history_port), vdb)
+
+    try:
+        history_server.start()
+    except socket.error as e:
+        log.error('Could not start history server: ' + str(e))
+        return None
+
+    return history_server
+
+def start_live_stream():
+    if live_port == None:
+        return None
+
+    live_stream = LiveStreamServer(live_host, int(live_port))
+
+    try:
+        live_stream.start()
+    except socket.error as e:
+        log.error('Could not start live stream: ' + str(e))
+        return None
+
+    return live_stream
+
+def is_database_ready(db_path):
+    version = get_schema_version(db_path)
+
+    return version != None and version >= SCHEMA_VERSION
+
+def wait_for_database(db_path, stop_queue):
+    # The UI process only reads the database, it has to wait until the
+    # ingestion process created or migrated all tables
+    if not is_database_ready(db_path):
+        log.info('Waiting for database: {0}'.format(db_path))
+
+    while not is_database_ready(db_path):
+        try:
+            if stop_queue.get(timeout=1.0) == None:
+                return False
+        except queue.Empty:
+            pass
+
+    return True
+
+def loop(run_ref, stop_queue, packaged, metrics_server):
+    ui_link = None
+    ingestion_link = None
+    publishers = []
+
+    if process_role == PROCESS_ROLE_UI:
+        db_path = database_path
+
+        if db_path == None:
+            db_path = get_db_path(gui, packaged)
+
+        if not wait_for_database(db_path, stop_queue):
+            return
+
+        # start the link before the station, the station already stores
+        # settings while it is constructed
+        ui_link = UILink('127.0.0.1', link_port)
+        ui_link.start()
+        vdb = ValueDBReader(db_path, ui_link.set_setting)
+    else:
+        vdb = ValueDB(gui, packaged, database_path)
+
+    if process_role == PROCESS_ROLE_INGESTION:
+        ingestion_link = IngestionLink('127.0.0.1', link_port)
+
+        try:
+            ingestion_link.start()
+            publishers.append(ingestion_link)
+        except socket.error as e:
+            log.error('Could not start link to UI process: ' + str(e))
+            ingestion_link = None
+
     Screen.vdb = vdb
+    history_server = None
+    live_stream = None
+
+    if process_role != PROCESS_ROLE_UI:
+        history_server = start_history_server(vdb)
+        live_stream = start_live_stream()
+
+    if live_stream != None:
+        publishers.append(live_stream)
+
+    screen_set_wakeup_queue(stop_queue)
+    tws = TabletopWeatherStation(vdb, run_ref, stop_queue, publishers)
+    Screen.tws = tws
+
+    if ingestion_link != None:
+        ingestion_link.set_station(tws)
+
+    if ui_link != None:
+        ui_link.set_station(tws)
+
+    if metrics_server != None:
+        metrics_server.set_sources(tws, vdb)
+    last_stats_time = time.time()
 
     while run_ref[0]:
         tws.update_lock.acquire()
@@ -370,12 +717,40 @@ def loop(run_ref, stop_queue, packaged):
 
         tws.update_lock.release()
 
+        if stats_interval != None and time.time() - last_stats_time >= stats_interval:
+            last_stats_time = time.time()
+            tws.log_stats()
+
+        # Sleep until the selected screen needs a time based refresh or
+        # until new data marks it dirty
+        timeout = screen_get_timeout()
+        if timeout == None or timeout > SCREEN_IDLE_TIMEOUT:
+            timeout = SCREEN_IDLE_TIMEOUT
+
         try:
-            stop_queue.get(timeout=1.0)
-            break
+            if stop_queue.get(timeout=timeout) == None:
+                break
         except queue.Empty:
             pass
 
+    hits, misses = screen_get_draw_cache_statistics()
+    log.info('Draw cache: {0} calls dropped, {1} calls sent'.format(hits, misses))
+
+    if history_server != None:
+        history_server.stop()
+
+    if live_stream != None:
+        live_stream.stop()
+
+    if ingestion_link != None:
+        ingestion_link.stop()
+
+    if ui_link != None:
+        ui_link.stop()
+
+    if stats_interval != None:
+        tws.log_stats()
+
     vdb.stop()
 
     if tws.ipcon != None:
@@ -384,6 +759,81 @@ def loop(run_ref, stop_queue, packaged):
         except Error:
             pass
 
+        if tws.ipcon.trace != None:
+            tws.ipcon.trace.close()
+
+def aggregate_loop(stop_queue, packaged):
+    vdb = ValueDB(gui, packaged, database_path)
+    history_server = start_history_server(vdb)
+    live_stream = start_live_stream()
+    publishers = []
+
+    if live_stream != None:
+        publishers.append(live_stream)
+
+    aggregator = Aggregator(vdb, parse_endpoints(aggregate_endpoints, TabletopWeatherStation.PORT), publishers)
+    aggregator.start()
+
+    while stop_queue.get() != None:
+        pass
+
+    aggregator.stop()
+
+    if history_server != None:
+        history_server.stop()
+
+    if live_stream != None:
+        live_stream.stop()
+
+    vdb.stop()
+
+def start_ingestion_process(packaged):
+    # Runs this program again as ingestion process with the same arguments.
+    # The database path depends on the GUI mode, the child doesn't have a GUI
+    # and gets the path of this process. The trace and replay files get the
+    # ingestion suffix, two processes can't record into the same file.
+    args = []
+    skip_value = False
+
+    for arg in sys.argv[1:]:
+        if skip_value:
+            skip_value = False
+        elif arg in ['--trace', '--replay']:
+            skip_value = True
+        elif arg not in ['--processes', '--gui']:
+            args.append(arg)
+
+    args += ['--process', PROCESS_ROLE_INGESTION]
+
+    if trace_path != None:
+        args += ['--trace', trace_path + INGESTION_TRACE_SUFFIX]
+
+    if replay_path != None:
+        args += ['--replay', replay_path + INGESTION_TRACE_SUFFIX]
+
+    if database_path == None:
+        args += ['--database', get_db_path(gui, packaged)]
+
+    if hasattr(sys, 'frozen'):
+        command = [sys.executable] + args
+    else:
+        command = [sys.executable, os.path.realpath(__file__)] + args
+
+    log.info('Starting ingestion process')
+
+    return subprocess.Popen(command)
+
+def stop_ingestion_process(ingestion_process):
+    log.info('Stopping ingestion process')
+
+    ingestion_process.terminate()
+
+    try:
+        ingestion_process.wait(5)
+    except subprocess.TimeoutExpired:
+        ingestion_process.kill()
+        ingestion_process.wait()
+
 def main(packaged):
     if gui:
         from tabletop_weather_station_demo.load_pixmap import load_pixmap
@@ -463,9 +913,24 @@ def main(packaged):
 
     run_ref = [True]
     stop_queue = queue.Queue()
+    metrics_server = None
+
+    if metrics_port != None and process_role != PROCESS_ROLE_UI and aggregate_endpoints == None:
+        metrics_server = MetricsServer(metrics_host, int(metrics_port), metrics_interval)
+
+        try:
+            metrics_server.start()
+        except socket.error as e:
+            log.error('Could not start metrics server: ' + str(e))
+            metrics_server = None
+
+    ingestion_process = None
+
+    if spawn_ingestion:
+        ingestion_process = start_ingestion_process(packaged)
 
     if gui:
-        thread = threading.Thread(target=loop, args=(run_ref, stop_queue, packaged))
+        thread = threading.Thread(target=loop, args=(run_ref, stop_queue, packaged, metrics_server))
         thread.daemon = True
         thread.start()
 
@@ -490,10 +955,19 @@ def main(packaged):
         signal.signal(signal.SIGINT, quit_)
         signal.signal(signal.SIGTERM, quit_)
 
-        loop(run_ref, stop_queue, packaged)
+        if aggregate_endpoints != None:
+            aggregate_loop(stop_queue, packaged)
+        else:
+            loop(run_ref, stop_queue, packaged, metrics_server)
 
         ec = 0
 
+    if metrics_server != None:
+        metrics_server.stop()
+
+    if ingestion_process != None:
+        stop_ingestion_process(ingestion_process)
+
     log.info('Tabletop Weather Station: End')
 
     sys.exit(ec)
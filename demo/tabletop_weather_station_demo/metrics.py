@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tabletop Weather Station
+Copyright (C) 2026 Tinkerforge GmbH
+
+metrics.py: Prometheus text format endpoint for sensor values and process health
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public
+License along with this program; if not, write to the
+Free Software Foundation, Inc., 59 Temple Place - Suite 330,
+Boston, MA 02111-1307, USA.
+"""
+
+import time
+import threading
+import socketserver
+import logging as log
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+from tabletop_weather_station_demo.screens import screen_get_redraw_statistics
+
+PREFIX = 'tabletop_weather_station_'
+
+# (field, metric name, divisor, help) of the last values, the divisor converts
+# the raw Bricklet value into the unit given in the metric name
+STATION_FIELDS = [
+    ('temperature',    'outdoor_weather_station_temperature_celsius',    10.0, 'Temperature of the outdoor weather station'),
+    ('humidity',       'outdoor_weather_station_humidity_percent',       1.0,  'Humidity of the outdoor weather station'),
+    ('wind_speed',     'outdoor_weather_station_wind_speed_mps',         10.0, 'Wind speed of the outdoor weather station'),
+    ('gust_speed',     'outdoor_weather_station_gust_speed_mps',         10.0, 'Gust speed of the outdoor weather station'),
+    ('rain',           'outdoor_weather_station_rain_mm',                10.0, 'Rain since the outdoor weather station was started'),
+    ('wind_direction', 'outdoor_weather_station_wind_direction',         1.0,  'Wind direction of the outdoor weather station (0 = N, 1 = NNE, ..., 255 = error)'),
+    ('battery_low',    'outdoor_weather_station_battery_low',            1.0,  'Battery of the outdoor weather station is low'),
+]
+
+SENSOR_FIELDS = [
+    ('temperature',    'outdoor_weather_sensor_temperature_celsius',     10.0, 'Temperature of the outdoor weather sensor'),
+    ('humidity',       'outdoor_weather_sensor_humidity_percent',        1.0,  'Humidity of the outdoor weather sensor'),
+]
+
+AIR_QUALITY_FIELDS = [
+    ('iaq_index',          'air_quality_iaq_index',                      1.0,   'IAQ index of the Air Quality Bricklet'),
+    ('iaq_index_accuracy', 'air_quality_iaq_index_accuracy',             1.0,   'IAQ index accuracy of the Air Quality Bricklet (0 = unreliable to 3 = high)'),
+    ('temperature',        'air_quality_temperature_celsius',            100.0, 'Temperature of the Air Quality Bricklet'),
+    ('humidity',           'air_quality_humidity_percent',               100.0, 'Humidity of the Air Quality Bricklet'),
+    ('air_pressure',       'air_quality_air_pressure_hpa',               100.0, 'Air pressure of the Air Quality Bricklet'),
+]
+
+def format_labels(labels):
+    if len(labels) == 0:
+        return ''
+
+    return '{' + ','.join('{0}="{1}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                          for key, value in labels) + '}'
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+
+    return repr(float(value))
+
+class MetricsWriter:
+    def __init__(self):
+        self.lines = []
+
+    def add(self, name, kind, help_, samples):
+        # samples is a list of (suffix, labels, value)
+        self.lines.append('# HELP {0}{1} {2}'.format(PREFIX, name, help_))
+        self.lines.append('# TYPE {0}{1} {2}'.format(PREFIX, name, kind))
+
+        for suffix, labels, value in samples:
+            self.lines.append('{0}{1}{2}{3} {4}'.format(PREFIX, name, suffix, format_labels(labels), format_value(value)))
+
+    def add_last_values(self, fields, values, label_name):
+        # values is a list of (label, namedtuple), the label is left out if
+        # label_name is None
+        for field, name, divisor, help_ in fields:
+            samples = []
+
+            for label, value in values:
+                labels = [] if label_name == None else [(label_name, label)]
+                samples.append(('', labels, getattr(value, field) / divisor))
+
+            self.add(name, 'gauge', help_, samples)
+
+    def add_duration_summary(self, name, help_, statistics):
+        count, duration_sum, duration_last = statistics
+
+        self.add(name + '_seconds', 'summary', help_,
+                 [('_count', [], count), ('_sum', [], duration_sum)])
+        self.add(name + '_last_seconds', 'gauge', help_ + ', last one', [('', [], duration_last)])
+
+    def get_text(self):
+        return '\n'.join(self.lines) + '\n'
+
+def collect(tws, vdb):
+    # Renders all metrics. Only copies of the values are read, neither
+    # update_lock is taken nor the database is accessed.
+    writer = MetricsWriter()
+
+    station_values = sorted(dict(tws.outdoor_weather_station_last_value).items())
+    sensor_values = sorted(dict(tws.outdoor_weather_sensor_last_value).items())
+    air_quality_value = tws.air_quality_last_value
+
+    writer.add_last_values(STATION_FIELDS, station_values, 'identifier')
+    writer.add_last_values(SENSOR_FIELDS, sensor_values, 'identifier')
+    writer.add_last_values(AIR_QUALITY_FIELDS, [] if air_quality_value == None else [(None, air_quality_value)], None)
+
+    writer.add('value_db_queue_depth', 'gauge', 'Calls waiting for the database thread',
+               [('', [], vdb.get_queue_depth())])
+    writer.add_duration_summary('value_db_commit_duration', 'Duration of database commits',
+                                vdb.get_commit_statistics())
+    writer.add_duration_summary('screen_redraw_duration', 'Duration of screen redraws',
+                                screen_get_redraw_statistics())
+
+    stats = tws.ipcon.stats if tws.ipcon != None else None
+
+    if stats != None:
+        summary = stats.get_summary()
+        uid_names = tws.get_uid_names()
+        buckets = []
+        timeouts = []
+
+        for (uid, function_id), request in sorted(summary['requests'].items()):
+            labels = [('device', uid_names.get(uid, uid)), ('function_id', function_id)]
+            latency = request['latency']
+            total = 0
+
+            for bound, count in zip(list(latency.bounds) + [float('inf')], latency.counts):
+                total += count
+                buckets.append(('_bucket', labels + [('le', format_value(bound))], total))
+
+            buckets.append(('_sum', labels, latency.sum))
+            buckets.append(('_count', labels, latency.count))
+            timeouts.append(('', labels, request['timeout_count']))
+
+        writer.add('ipcon_request_duration_seconds', 'histogram', 'Round trip time of requests', buckets)
+        writer.add('ipcon_request_timeouts_total', 'counter', 'Requests without response in time', timeouts)
+        writer.add('ipcon_sent_bytes_total', 'counter', 'Bytes sent to brickd', [('', [], summary['bytes_sent'])])
+        writer.add('ipcon_received_bytes_total', 'counter', 'Bytes received from brickd', [('', [], summary['bytes_received'])])
+        writer.add('ipcon_callback_queue_depth', 'gauge', 'Callbacks waiting to be dispatched',
+                   [('', [], summary['callback_queue_depth'])])
+
+    return writer.get_text()
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+
+        try:
+            body = self.server.metrics.get_text().encode('utf-8')
+        except:
+            log.exception('Error while collecting metrics')
+            self.send_error(500)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass # don't flood the log with scrapes
+
+class MetricsServer:
+    # Serves the metrics on http://host:port/metrics. The rendered text is
+    # cached for interval seconds, so any number of scrapes within one
+    # scrape interval cost a single collect().
+    def __init__(self, host, port, interval):
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.tws = None
+        self.vdb = None
+        self.lock = threading.Lock()
+        self.text = None
+        self.text_time = 0
+        self.server = None
+        self.thread = None
+
+    def set_sources(self, tws, vdb):
+        with self.lock:
+            self.tws = tws
+            self.vdb = vdb
+            self.text = None
+
+    def get_text(self):
+        with self.lock:
+            now = time.time()
+
+            if self.text == None or now - self.text_time >= self.interval:
+                if self.tws == None:
+                    return '' # still starting
+
+                self.text = collect(self.tws, self.vdb)
+                self.text_time = now
+
+            return self.text
+
+    def start(self):
+        self.server = ThreadingHTTPServer((self.host, self.port), MetricsRequestHandler)
+        self.server.metrics = self
+
+        self.thread = threading.Thread(name='Metrics-Server', target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+        log.info('Serving metrics on http://{0}:{1}/metrics'.format(*self.server.server_address[:2]))
+
+    def stop(self):
+        if self.server != None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
@@ -0,0 +1,328 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tabletop Weather Station
+Copyright (C) 2026 Tinkerforge GmbH
+
+process_link.py: Connects the ingestion and the UI process
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public
+License along with this program; if not, write to the
+Free Software Foundation, Inc., 59 Temple Place - Suite 330,
+Boston, MA 02111-1307, USA.
+"""
+
+# In the multi-process layout the ingestion process owns the IPConnection to
+# the Air Quality and Outdoor Weather Bricklets and the ValueDB, the UI
+# process drives the LCD and the Qt log window. The UI process reads the
+# history directly from the database (read-only, WAL mode), the link only
+# carries what the database doesn't have:
+#
+# - ingestion to UI: every measurement as it arrives, as published to the
+#   live stream (see live_stream.py), and all last values on connect
+# - UI to ingestion: settings changed on the settings screen, the ingestion
+#   process writes them and applies the logging period
+#
+# Messages are JSON objects, one per line, over a TCP connection on the
+# loopback interface.
+#
+# Both ends of the link are started before their station is constructed.
+# Settings are kept until the link is connected and the receiving station
+# exists, the latest measurement per series is kept until the UI station
+# exists.
+
+import json
+import queue
+import collections
+import socket
+import threading
+import logging as log
+
+MAX_QUEUED_MESSAGES = 1000 # per UI process, a UI that stops reading is dropped
+
+def encode_message(message):
+    return (json.dumps(message, separators=(',', ':')) + '\n').encode('utf-8')
+
+def read_messages(sock):
+    # yields the messages received on sock until it is closed
+    pending = b''
+
+    while True:
+        data = sock.recv(8192)
+
+        if len(data) == 0:
+            return
+
+        pending += data
+
+        while b'\n' in pending:
+            line, pending = pending.split(b'\n', 1)
+
+            if len(line) > 0:
+                yield json.loads(line.decode('utf-8'))
+
+class LinkClient:
+    def __init__(self, sock):
+        self.socket = sock
+        self.queue = queue.Queue(MAX_QUEUED_MESSAGES)
+
+class IngestionLink:
+    # Server side, runs in the ingestion process. It is started before the
+    # station connects to brickd, so the UI process can connect early.
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.station = None
+        self.server = None
+        self.clients = set()
+        self.lock = threading.Lock()
+        self.pending_settings = collections.OrderedDict() # received before set_station, protected by lock
+
+    def start(self):
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind((self.host, self.port))
+        self.server.listen(4)
+
+        thread = threading.Thread(name='Link-Server', target=self.accept_loop)
+        thread.daemon = True
+        thread.start()
+
+        log.info('Waiting for UI process on {0}:{1}'.format(*self.server.getsockname()[:2]))
+
+    def set_station(self, station):
+        with self.lock:
+            self.station = station
+
+            # UI processes that connected before don't have the state yet
+            for client in list(self.clients):
+                self.queue_state(client)
+
+            for key, value in self.pending_settings.items():
+                station.cb_link_setting(key, value)
+
+            self.pending_settings.clear()
+
+    def queue_state(self, client):
+        # NOTE: assumes that lock is locked
+        if self.station == None:
+            return
+
+        for message_type, values in self.station.get_link_state():
+            try:
+                client.queue.put_nowait(self.create_message(message_type, values))
+            except queue.Full:
+                self.remove_client(client)
+                break
+
+    def stop(self):
+        if self.server != None:
+            self.server.close()
+            self.server = None
+
+        with self.lock:
+            for client in list(self.clients):
+                self.remove_client(client)
+
+    def accept_loop(self):
+        while True:
+            try:
+                sock, _ = self.server.accept()
+            except (socket.error, AttributeError):
+                break
+
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            client = LinkClient(sock)
+
+            with self.lock:
+                # queue the current state before any newer measurement
+                self.clients.add(client)
+                self.queue_state(client)
+
+            log.info('UI process connected')
+
+            for target in [self.send_loop, self.receive_loop]:
+                thread = threading.Thread(name='Link-Client', target=target, args=(client,))
+                thread.daemon = True
+                thread.start()
+
+    def remove_client(self, client):
+        # NOTE: assumes that lock is locked
+        if client not in self.clients:
+            return
+
+        self.clients.discard(client)
+        client.queue.put(None)
+
+        try:
+            client.socket.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+
+    def create_message(self, message_type, values):
+        message = {'type': message_type}
+        message.update(values)
+
+        return encode_message(message)
+
+    def publish(self, message_type, values):
+        # Called by the Bricklet callbacks, never blocks
+        if len(self.clients) == 0:
+            return
+
+        data = self.create_message(message_type, values)
+
+        with self.lock:
+            for client in list(self.clients):
+                try:
+                    client.queue.put_nowait(data)
+                except queue.Full:
+                    log.warning('UI process does not keep up, disconnecting it')
+                    self.remove_client(client)
+
+    def send_loop(self, client):
+        while True:
+            data = client.queue.get()
+
+            if data == None:
+                break
+
+            try:
+                client.socket.sendall(data)
+            except socket.error:
+                break
+
+        with self.lock:
+            self.remove_client(client)
+
+    def receive_loop(self, client):
+        try:
+            for message in read_messages(client.socket):
+                if message.get('type') != 'setting':
+                    continue
+
+                with self.lock:
+                    if self.station == None:
+                        self.pending_settings[message['key']] = message['value']
+                        continue
+
+                self.station.cb_link_setting(message['key'], message['value'])
+        except (socket.error, ValueError, KeyError):
+            pass
+
+        with self.lock:
+            self.remove_client(client)
+
+        client.socket.close()
+        log.info('UI process disconnected')
+
+class UILink:
+    # Client side, runs in the UI process
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.station = None
+        self.socket = None
+        self.send_lock = threading.Lock()
+        self.running = False
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.lock = threading.Lock()
+        self.pending_values = collections.OrderedDict() # (type, identifier) -> latest values received before set_station, protected by lock
+        self.pending_settings = collections.OrderedDict() # set while not connected, protected by send_lock
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(name='Link-Client', target=self.loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.stop_event.set()
+
+        sock = self.socket
+
+        if sock != None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+
+        self.thread.join(2)
+
+    def loop(self):
+        while self.running:
+            try:
+                sock = socket.create_connection((self.host, self.port))
+            except socket.error:
+                self.stop_event.wait(1.0)
+                continue
+
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            with self.send_lock:
+                self.socket = sock
+                self.send_pending_settings()
+
+            log.info('Connected to ingestion process')
+
+            try:
+                for message in read_messages(sock):
+                    message_type = message.pop('type', None)
+
+                    with self.lock:
+                        if self.station == None:
+                            self.pending_values[(message_type, message.get('identifier'))] = message
+                        else:
+                            self.station.cb_link_values(message_type, message)
+            except (socket.error, ValueError):
+                pass
+
+            with self.send_lock:
+                self.socket = None
+
+            sock.close()
+
+            if self.running:
+                log.error('Lost connection to ingestion process')
+
+    def set_station(self, station):
+        with self.lock:
+            self.station = station
+
+            for (message_type, _), values in self.pending_values.items():
+                station.cb_link_values(message_type, values)
+
+            self.pending_values.clear()
+
+    def set_setting(self, key, value):
+        with self.send_lock:
+            # the latest value per key is sent once the link is (re)connected
+            self.pending_settings[key] = value
+            self.pending_settings.move_to_end(key)
+
+            if self.socket != None:
+                self.send_pending_settings()
+
+    def send_pending_settings(self):
+        # NOTE: assumes that send_lock is locked and socket is not None
+        while len(self.pending_settings) > 0:
+            key, value = next(iter(self.pending_settings.items()))
+
+            try:
+                self.socket.sendall(encode_message({'type': 'setting', 'key': key, 'value': value}))
+            except socket.error:
+                break # kept for the next connection
+
+            del self.pending_settings[key]
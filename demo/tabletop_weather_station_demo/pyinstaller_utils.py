@@ -175,7 +175,7 @@ class PyinstallerUtils:
             if prepare_script_working_dir is not None:
                 os.chdir(self.root_path)
 
-        self.datas = self.collect_data(by_ext(['bmp', 'jpg', 'png', 'svg', 'obj', 'mtl', 'frag', 'vert']))
+        self.datas = self.collect_data(by_ext(['bmp', 'jpg', 'png', 'svg', 'obj', 'mtl', 'frag', 'vert', 'bin']))
         self.datas += self.collect_data(by_name('internal'))
         self.datas += self.collect_data(by_name('snapshot'))
 
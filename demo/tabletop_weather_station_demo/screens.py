@@ -22,21 +22,44 @@ Free Software Foundation, Inc., 59 Temple Place - Suite 330,
 Boston, MA 02111-1307, USA.
 """
 
+import time
+import threading
+import contextlib
+
 from tabletop_weather_station_demo import icons
+from tabletop_weather_station_demo.framebuffer import FrameBufferLCD
+from tabletop_weather_station_demo.draw_cache import CachedLCD
 
 TIME_SHORTCUTS = ['1s', '2s', '5s', '10s', '30s', '1m', '2m', '5m', '10m', '30m', '1h', '2h', '4h', '8h', '12h', '1d', '10d', '1M']
 TIME_STRINGS   = ['1 second', '2 seconds', '5 seconds', '10 seconds', '30 seconds', '1 minute', '2 minutes', '5 minutes', '10 minutes', '30 minutes', '1 hour', '2 hours', '4 hours', '8 hours', '12 hours', '1 day', '10 days', '1 month']
 TIME_SECONDS   = [1, 2, 5, 10, 30, 1*60, 2*60, 5*60, 10*60, 30*60, 1*60*60, 2*60*60, 4*60*60, 8*60*60, 12*60*60, 1*60*60*24, 10*60*60*24, 30*60*60*24]
 
+# Reasons for a screen redraw. Each screen lists the reasons it cares about in
+# its "refresh" attribute, data callbacks mark the screens dirty with
+# screen_mark_dirty() and the time based reasons are handled by screen_update().
+REFRESH_AIR_QUALITY = 'air_quality' # new Air Quality Bricklet data
+REFRESH_STATION     = 'station'     # new outdoor weather station data
+REFRESH_SENSOR      = 'sensor'      # new outdoor weather sensor data
+REFRESH_SECOND      = 'second'      # every second (e.g. for a clock)
+REFRESH_BUCKET      = 'bucket'      # every graph resolution bucket boundary
+
+# Render modes selectable on the settings screen. In buffered mode automatic
+# draw is disabled while a screen is drawn and the complete frame is shown at
+# once with draw_buffered_frame (see screen_frame).
+RENDER_MODE_DIRECT   = 0
+RENDER_MODE_BUFFERED = 1
+RENDER_MODE_STRINGS  = ['Direct', 'Buffered']
+
 class Screen:
     WIDTH  = 128
     HEIGHT = 64
 
-    lcd    = None
-    text   = "TBD"
-    icon   = None
-    tws    = None
-    vdb    = None
+    lcd     = None
+    text    = "TBD"
+    icon    = None
+    tws     = None
+    vdb     = None
+    refresh = [REFRESH_SECOND]
 
     def draw_init(self):
         pass
@@ -51,7 +74,7 @@ class Screen:
         pass
 
     def draw_icon(self, x, y, icon):
-        Screen.lcd.write_pixels(x, y, x + icon.WIDTH-1, y + icon.HEIGHT-1, icon.data)
+        Screen.lcd.write_pixels_packed(x, y, x + icon.WIDTH-1, y + icon.HEIGHT-1, icon.WIDTH*icon.HEIGHT, icon.chunks)
 
     def scale_data_for_graph(self, data):
         if not data:
@@ -68,8 +91,9 @@ class Screen:
         return ret, value_min, value_max
 
 class IndoorScreen(Screen):
-    text = "Data"
-    icon = icons.IconTabData
+    text    = "Data"
+    icon    = icons.IconTabData
+    refresh = [REFRESH_AIR_QUALITY]
 
     def draw_init(self):
         self.iaq_test = 0
@@ -120,8 +144,9 @@ class IndoorScreen(Screen):
         pass
 
 class GraphScreen(Screen):
-    text = "Graph"
-    icon = icons.IconTabGraph
+    text    = "Graph"
+    icon    = icons.IconTabGraph
+    refresh = [REFRESH_BUCKET]
 
     caption_air_quality  = ['\xF8C', '%RH', 'hPa', 'IAQ']
     formats_air_quality  = ['{0:.1f}', '{0:.1f}', '{0:.1f}', '{0:.0f}']
@@ -154,13 +179,13 @@ class GraphScreen(Screen):
 
         for i, station in enumerate(self.stations):
             if num < 4:
-                num_icon = (i+1, len(self.stations), icons.rotate_left_90(icons.IconTabStation))
+                num_icon = (i+1, len(self.stations), icons.IconTabStation.rotate_left_90())
                 return self.caption_station[num], self.formats_station[num], self.divisors_station[num], self.fields_station[num], self.tables[1], station, num_icon
             num -= 4
 
         for i, sensor in enumerate(self.sensors):
             if num < 2:
-                num_icon = (i+1, len(self.sensors), icons.rotate_left_90(icons.IconTabSensor))
+                num_icon = (i+1, len(self.sensors), icons.IconTabSensor.rotate_left_90())
                 return self.caption_sensor[num], self.formats_sensor[num], self.divisors_sensor[num], self.fields_sensor[num], self.tables[2], sensor, num_icon
             num -= 2
 
@@ -232,8 +257,9 @@ class GraphScreen(Screen):
 
 
 class SensorScreen(Screen):
-    text = 'Senso'
-    icon = icons.IconTabSensor
+    text    = 'Senso'
+    icon    = icons.IconTabSensor
+    refresh = [REFRESH_SENSOR]
 
     def __init__(self, keys):
         self.keys = keys
@@ -310,6 +336,7 @@ class SensorScreen(Screen):
 class StationScreen(Screen):
     text       = 'Stati'
     icon       = icons.IconTabStation
+    refresh    = [REFRESH_STATION]
     directions = [('N', 0, -7), ('NNE', 3, -6), ('NE', 5, -5), ('ENE', 6, -3),
                   ('E', 7, 0), ('ESE', 6, 3), ('SE', 5, 5), ('SSE', 3, 6),
                   ('S', 0, 7), ('SSW', -3, 6), ('SW', -5, 5), ('WSW', -6, 3),
@@ -408,9 +435,10 @@ class StationScreen(Screen):
                 self.draw_init()
 
 class SettingsScreen(Screen):
-    text = "Conf"
-    icon = icons.IconTabSettings
-    settings = ['Display', 'Graph', 'Logging']
+    text     = "Conf"
+    icon     = icons.IconTabSettings
+    refresh  = []
+    settings = ['Display', 'Graph', 'Logging', 'Drawing']
 
     def __init__(self):
         self.num = 0
@@ -419,6 +447,16 @@ class SettingsScreen(Screen):
         s = '  {0}  '.format(TIME_STRINGS[index])
         self.lcd.draw_text(56 - int(len(s)*6/2), 42, self.lcd.FONT_6X8, self.lcd.COLOR_BLACK, s)
 
+    def draw_render_mode(self, index):
+        s = '  {0}  '.format(RENDER_MODE_STRINGS[index])
+        self.lcd.draw_text(56 - int(len(s)*6/2), 42, self.lcd.FONT_6X8, self.lcd.COLOR_BLACK, s)
+
+    def render_mode_to_slider(self, value):
+        return int(round(value*97.0/(len(RENDER_MODE_STRINGS)-1)))
+
+    def slider_to_render_mode(self, value):
+        return int(round(value*(len(RENDER_MODE_STRINGS)-1)/97.0))
+
     def index_to_slider(self, value):
         return int(round(value*97.0/(len(TIME_STRINGS)-1)))
 
@@ -435,7 +473,7 @@ class SettingsScreen(Screen):
         self.lcd.draw_line(113, 11 + 19 + 10, 118, 16 + 19, self.num != 0)
 
         if self.num == 0:
-            conf = self.lcd.get_display_configuration()
+            conf = self.tws.display_configuration
             brightness = int(conf.backlight*67/100)
             contrast = min(conf.contrast, 67)
 
@@ -452,15 +490,21 @@ class SettingsScreen(Screen):
             self.lcd.set_gui_slider(0, 0, 10, 105, self.lcd.DIRECTION_HORIZONTAL, self.index_to_slider(self.tws.logging_period_index))
             self.lcd.draw_text(13, 30, self.lcd.FONT_6X8, self.lcd.COLOR_BLACK, 'Logging Period')
             self.draw_time_per_pixel(self.tws.logging_period_index)
+        elif self.num == 3:
+            self.lcd.set_gui_slider(0, 0, 10, 105, self.lcd.DIRECTION_HORIZONTAL, self.render_mode_to_slider(self.tws.render_mode_index))
+            self.lcd.draw_text(19, 30, self.lcd.FONT_6X8, self.lcd.COLOR_BLACK, 'Drawing Mode')
+            self.draw_render_mode(self.tws.render_mode_index)
 
     def slider_value(self, index, value):
         if self.num == 0:
-            conf = self.lcd.get_display_configuration()
+            conf = self.tws.display_configuration
 
             if index == 0:
-                self.lcd.set_display_configuration(conf.contrast, value*100/67, conf.invert, conf.automatic_draw)
+                self.tws.display_configuration = conf._replace(backlight=value*100//67)
             elif index == 1:
-                self.lcd.set_display_configuration(value, conf.backlight, conf.invert, conf.automatic_draw)
+                self.tws.display_configuration = conf._replace(contrast=value)
+
+            screen_set_display_configuration()
         elif self.num == 1:
             if index == 0:
                 new_res = self.slider_to_index(value)
@@ -475,6 +519,13 @@ class SettingsScreen(Screen):
                     self.tws.logging_period_index = new_res
                     self.draw_time_per_pixel(self.tws.logging_period_index)
                     self.vdb.set_setting('logging_period', str(new_res))
+        elif self.num == 3:
+            if index == 0:
+                new_mode = self.slider_to_render_mode(value)
+                if new_mode != self.tws.render_mode_index:
+                    self.tws.render_mode_index = new_mode
+                    self.draw_render_mode(self.tws.render_mode_index)
+                    self.vdb.set_setting('render_mode', str(new_mode))
 
     def touch_gesture(self, gesture, duration, pressure_max, x_start, x_end, y_start, y_end, age):
         if gesture == self.lcd.GESTURE_BOTTOM_TO_TOP:
@@ -496,6 +547,21 @@ class SettingsScreen(Screen):
 screens = []
 screen_selected = None
 
+# Redraw scheduling state. screen_dirty is shared between the callback threads
+# and the screen loop and is protected by screen_dirty_lock.
+screen_dirty = set()
+screen_dirty_lock = threading.Lock()
+screen_wakeup_queue = None
+screen_next_refresh = None
+screen_device = None
+screen_framebuffer = None
+screen_draw_cache = None
+screen_frame_depth = 0
+screen_frame_buffered = False
+screen_redraw_count = 0
+screen_redraw_duration_sum = 0.0
+screen_redraw_duration_last = 0.0
+
 def screen_init(initial_init = True, stations = [], sensors = []):
     global screens, screen_selected
     if Screen.lcd == None:
@@ -542,29 +608,179 @@ def screen_update_tabs():
     if ((len(station_keys) > 0) and (station_screen == None)) or \
        ((len(sensor_keys)  > 0) and (sensor_screen == None)) or \
        ((station_screen != None) and (station_keys != station_screen.keys)) or \
-       ((station_screen != None) and (sensor_keys  != sensor_screen.keys)):
+       ((sensor_screen  != None) and (sensor_keys  != sensor_screen.keys)):
        screen_init(False, station_keys, sensor_keys)
 
 def screen_slider_value(index, value):
-    screen_selected.slider_value(index, value)
+    with screen_frame():
+        screen_selected.slider_value(index, value)
 
 def screen_touch_gesture(gesture, duration, pressure_max, x_start, x_end, y_start, y_end, age):
-    screen_selected.touch_gesture(gesture, duration, pressure_max, x_start, x_end, y_start, y_end, age)
+    with screen_frame():
+        screen_selected.touch_gesture(gesture, duration, pressure_max, x_start, x_end, y_start, y_end, age)
 
 def screen_tab_selected(index):
-    global screen_selected
-    Screen.lcd.remove_gui_button(255)
-    Screen.lcd.remove_gui_slider(255)
-    Screen.lcd.remove_gui_graph(255)
-    Screen.lcd.clear_display()
-    screen_selected = screens[index]
-    screen_selected.draw_init()
-
-def screen_set_lcd(lcd):
+    global screen_selected, screen_next_refresh
+
+    # removing the GUI elements of the old screen and clearing the display
+    # are part of the frame of the new screen
+    with screen_frame():
+        Screen.lcd.remove_gui_button(255)
+        Screen.lcd.remove_gui_slider(255)
+        Screen.lcd.remove_gui_graph(255)
+        Screen.lcd.clear_display()
+        if screen_draw_cache != None:
+            screen_draw_cache.invalidate()
+        screen_selected = screens[index]
+
+        screen_selected.draw_init()
+
+    screen_next_refresh = screen_get_next_refresh(screen_selected, time.time())
+
+def screen_set_lcd(lcd, framebuffer=False):
+    global screen_device, screen_framebuffer, screen_draw_cache
+    screen_device = lcd
+    screen_framebuffer = None
+    screen_draw_cache = None
+
+    if lcd != None:
+        if framebuffer:
+            screen_framebuffer = FrameBufferLCD(lcd)
+            lcd = screen_framebuffer
+
+        screen_draw_cache = CachedLCD(lcd)
+        lcd = screen_draw_cache
+
     Screen.lcd = lcd
     screen_init()
 
+def screen_get_draw_cache_statistics():
+    # Returns the number of dropped (hits) and sent (misses) drawing calls
+    if screen_draw_cache == None:
+        return 0, 0
+
+    return screen_draw_cache.get_statistics()
+
+def screen_get_redraw_statistics():
+    # Returns the number of redraws, their total and their last duration
+    return screen_redraw_count, screen_redraw_duration_sum, screen_redraw_duration_last
+
+def screen_set_display_configuration():
+    # Sends the display configuration of the station to the LCD, automatic
+    # draw stays disabled while a buffered frame is drawn
+    conf = Screen.tws.display_configuration
+    automatic_draw = conf.automatic_draw and not screen_frame_buffered
+
+    Screen.lcd.set_display_configuration(conf.contrast, conf.backlight, conf.invert, automatic_draw)
+
+@contextlib.contextmanager
+def screen_frame():
+    # Wraps the drawing of one frame. In buffered render mode automatic draw
+    # is disabled for the frame and the complete frame is drawn at once at the
+    # end, afterwards automatic draw is set back to the setting of the user.
+    # The drawing calls of a frame are pipelined, errors are raised at the
+    # end of the frame.
+    global screen_frame_depth, screen_frame_buffered
+    buffered = False
+
+    with contextlib.ExitStack() as stack:
+        if screen_frame_depth == 0 and screen_device != None:
+            stack.enter_context(screen_device.ipcon.pipeline(screen_device))
+
+        if screen_frame_depth == 0 and Screen.tws != None and Screen.tws.display_configuration != None and \
+           Screen.tws.render_mode_index == RENDER_MODE_BUFFERED:
+            buffered = True
+            screen_frame_buffered = True
+            screen_set_display_configuration()
+
+        screen_frame_depth += 1
+
+        try:
+            yield
+        finally:
+            screen_frame_depth -= 1
+
+            if screen_frame_depth == 0:
+                screen_flush()
+
+            if buffered:
+                screen_frame_buffered = False
+
+                try:
+                    Screen.lcd.draw_buffered_frame(False)
+                finally:
+                    screen_set_display_configuration()
+
+def screen_flush():
+    # Transfers the changed parts of the framebuffer to the LCD, if the
+    # screens draw into a framebuffer instead of directly to the LCD
+    if screen_framebuffer != None:
+        screen_framebuffer.flush()
+
+def screen_set_wakeup_queue(wakeup_queue):
+    global screen_wakeup_queue
+    screen_wakeup_queue = wakeup_queue
+
+def screen_mark_dirty(reason):
+    with screen_dirty_lock:
+        screen_dirty.add(reason)
+
+    # Only wake up the screen loop if the selected screen actually cares,
+    # everything else is picked up on the next regular wakeup
+    screen = screen_selected
+    if screen_wakeup_queue != None and screen != None and \
+       (reason in screen.refresh or reason in [REFRESH_STATION, REFRESH_SENSOR]):
+        screen_wakeup_queue.put(reason)
+
+def screen_get_next_refresh(screen, now):
+    next_refresh = None
+
+    if REFRESH_SECOND in screen.refresh:
+        next_refresh = int(now) + 1
+
+    if REFRESH_BUCKET in screen.refresh and Screen.tws != None:
+        period = TIME_SECONDS[Screen.tws.graph_resolution_index]
+        boundary = (int(now) // period + 1) * period
+        if next_refresh == None or boundary < next_refresh:
+            next_refresh = boundary
+
+    return next_refresh
+
+def screen_get_timeout():
+    # Returns the number of seconds until the next time based refresh of the
+    # selected screen or None if the selected screen only redraws on new data
+    if screen_next_refresh == None:
+        return None
+
+    return max(0, screen_next_refresh - time.time())
+
 def screen_update():
-    if screen_selected != None:
+    global screen_next_refresh, screen_redraw_count, screen_redraw_duration_sum, screen_redraw_duration_last
+    if screen_selected == None:
+        return
+
+    with screen_dirty_lock:
+        reasons = set(screen_dirty)
+        screen_dirty.clear()
+
+    if REFRESH_STATION in reasons or REFRESH_SENSOR in reasons:
         screen_update_tabs()
-        screen_selected.draw_update()
+
+    now = time.time()
+    redraw = screen_next_refresh != None and now >= screen_next_refresh
+
+    for reason in reasons:
+        if reason in screen_selected.refresh:
+            redraw = True
+
+    if redraw:
+        start = time.time()
+
+        with screen_frame():
+            screen_selected.draw_update()
+
+        screen_redraw_duration_last = time.time() - start
+        screen_redraw_duration_sum += screen_redraw_duration_last
+        screen_redraw_count += 1
+
+    screen_next_refresh = screen_get_next_refresh(screen_selected, now)
@@ -0,0 +1,394 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2026 Tinkerforge GmbH
+#
+# Redistribution and use in source and binary forms of this file,
+# with or without modification, are permitted. See the Creative
+# Commons Zero (CC0 1.0) License for more details.
+
+# asyncio version of the IPConnection (Python 3.7 or newer). There are no
+# threads: responses resolve futures and callbacks are delivered as async
+# iterators. The payload codec and the device bindings are shared with the
+# threaded IPConnection:
+#
+#   ipcon = AsyncIPConnection()
+#   await ipcon.connect('localhost', 4223)
+#   air_quality = AsyncBrickletAirQuality(uid, ipcon)
+#   print(await air_quality.get_all_values())
+#
+#   async for values in air_quality.callbacks(BrickletAirQuality.CALLBACK_ALL_VALUES):
+#       print(values)
+#
+# Authentication and high-level (streaming) callbacks are not supported.
+
+import asyncio
+import contextvars
+import socket
+
+try:
+    from .ip_connection import IPConnection, Error, get_payload_codec, check_response_error, \
+        get_uid_from_data, get_function_id_from_data, get_sequence_number_from_data
+    from .bricklet_lcd_128x64 import BrickletLCD128x64
+    from .bricklet_air_quality import BrickletAirQuality
+    from .bricklet_outdoor_weather import BrickletOutdoorWeather
+except ValueError:
+    from ip_connection import IPConnection, Error, get_payload_codec, check_response_error, \
+        get_uid_from_data, get_function_id_from_data, get_sequence_number_from_data
+    from bricklet_lcd_128x64 import BrickletLCD128x64
+    from bricklet_air_quality import BrickletAirQuality
+    from bricklet_outdoor_weather import BrickletOutdoorWeather
+
+ENUMERATE_FORM = '8s 8s c 3B 3B H B'
+
+class CallbackStream(object):
+    # Async iterator over the values of one callback. Callbacks that arrive
+    # while the stream is full replace the oldest queued value, so a slow
+    # consumer never blocks the connection.
+    END = object()
+
+    def __init__(self, ipcon, key, maxsize):
+        self.ipcon = ipcon
+        self.key = key
+        self.queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+        ipcon.callback_streams.setdefault(key, set()).add(self)
+
+    def put(self, values):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+
+        self.queue.put_nowait(values)
+
+    def close(self):
+        streams = self.ipcon.callback_streams.get(self.key)
+
+        if streams != None:
+            streams.discard(self)
+
+        self.put(CallbackStream.END)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        values = await self.queue.get()
+
+        if values is CallbackStream.END:
+            raise StopAsyncIteration
+
+        return values
+
+class AsyncIPConnection(object):
+    def __init__(self):
+        self.timeout = 2.5
+        self.reader = None
+        self.writer = None
+        self.receive_task = None
+        self.next_sequence_number = 0
+        self.devices = {} # uid -> Device, filled by the Device constructor
+        self.pending_requests = {} # (uid, function_id, sequence_number) -> (asyncio.Future, form_ret)
+        self.callback_streams = {} # (uid, function_id) -> set of CallbackStream
+        self.binding_adapter = BindingAdapter(self)
+
+    async def connect(self, host, port):
+        if self.writer != None:
+            raise Error(Error.ALREADY_CONNECTED, 'Already connected to {0}:{1}'.format(host, port))
+
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+
+        sock = self.writer.get_extra_info('socket')
+
+        if sock != None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        self.receive_task = asyncio.ensure_future(self.receive_loop())
+
+    async def disconnect(self):
+        if self.writer == None:
+            raise Error(Error.NOT_CONNECTED, 'Not connected')
+
+        self.receive_task.cancel()
+
+        try:
+            await self.receive_task
+        except asyncio.CancelledError:
+            pass
+
+        self.close_connection()
+
+    def close_connection(self):
+        writer = self.writer
+        self.reader = None
+        self.writer = None
+        self.receive_task = None
+
+        if writer != None:
+            writer.close()
+
+        for future, _ in self.pending_requests.values():
+            if not future.done():
+                future.set_exception(Error(Error.NOT_CONNECTED, 'Not connected'))
+
+        self.pending_requests.clear()
+
+        for streams in list(self.callback_streams.values()):
+            for stream in list(streams):
+                stream.close()
+
+    def get_next_sequence_number(self):
+        sequence_number = self.next_sequence_number + 1
+        self.next_sequence_number = sequence_number % 15
+        return sequence_number
+
+    def create_packet_header(self, device, length, function_id):
+        return IPConnection.create_packet_header(self, device, length, function_id)
+
+    def send_request_nowait(self, device, function_id, data, form, form_ret):
+        # Writes the request and returns a future for its result. The future
+        # is already done if no response is expected.
+        if self.writer == None:
+            raise Error(Error.NOT_CONNECTED, 'Not connected')
+
+        codec = get_payload_codec(form)
+        request, response_expected, sequence_number = \
+            self.create_packet_header(device, 8 + codec.size, function_id)
+
+        request += codec.pack(data)
+        future = asyncio.get_event_loop().create_future()
+
+        if response_expected:
+            key = (device.uid, function_id, sequence_number)
+            other = self.pending_requests.get(key)
+
+            if other != None and not other[0].done():
+                other[0].set_exception(Error(Error.TIMEOUT, 'Sequence number reused for function {0}'.format(function_id)))
+
+            self.pending_requests[key] = (future, form_ret)
+            asyncio.get_event_loop().call_later(self.timeout, self.expire_request, key, future)
+        else:
+            future.set_result(None)
+
+        self.writer.write(request)
+
+        return future
+
+    async def send_request(self, device, function_id, data, form, form_ret):
+        return await self.send_request_nowait(device, function_id, data, form, form_ret)
+
+    def expire_request(self, key, future):
+        if future.done():
+            return
+
+        if self.pending_requests.get(key, (None,))[0] is future:
+            del self.pending_requests[key]
+
+        future.set_exception(Error(Error.TIMEOUT, 'Did not receive response for function {0} in time'.format(key[1])))
+
+    async def enumerate(self):
+        if self.writer == None:
+            raise Error(Error.NOT_CONNECTED, 'Not connected')
+
+        request, _, _ = self.create_packet_header(None, 8, IPConnection.FUNCTION_ENUMERATE)
+
+        self.writer.write(request)
+        await self.writer.drain()
+
+    def enumerations(self, maxsize=0):
+        # async iterator over (uid, connected_uid, position, hardware_version,
+        # firmware_version, device_identifier, enumeration_type) tuples
+        return CallbackStream(self, (IPConnection.BROADCAST_UID, IPConnection.CALLBACK_ENUMERATE), maxsize)
+
+    def callbacks(self, device, callback_id, maxsize=0):
+        return CallbackStream(self, (device.uid, callback_id), maxsize)
+
+    async def receive_loop(self):
+        try:
+            while True:
+                header = await self.reader.readexactly(8)
+                length = header[4]
+
+                if length > 8:
+                    packet = header + await self.reader.readexactly(length - 8)
+                else:
+                    packet = header
+
+                self.handle_response(packet)
+        except (asyncio.IncompleteReadError, ConnectionError, OSError):
+            self.close_connection()
+
+    def handle_response(self, packet):
+        function_id = get_function_id_from_data(packet)
+        sequence_number = get_sequence_number_from_data(packet)
+
+        if sequence_number == 0 and function_id == IPConnection.CALLBACK_ENUMERATE:
+            self.dispatch_callback((IPConnection.BROADCAST_UID, function_id), packet, ENUMERATE_FORM)
+            return
+
+        uid = get_uid_from_data(packet)
+
+        if sequence_number == 0:
+            device = self.devices.get(uid)
+
+            if device != None and function_id in device.callback_formats:
+                self.dispatch_callback((uid, function_id), packet, device.callback_formats[function_id])
+
+            return
+
+        future, form_ret = self.pending_requests.pop((uid, function_id, sequence_number), (None, None))
+
+        if future == None or future.done():
+            # Response seems to be OK, but can't be handled
+            return
+
+        try:
+            check_response_error(packet, function_id)
+        except Error as e:
+            future.set_exception(e)
+            return
+
+        if len(form_ret) > 0:
+            future.set_result(get_payload_codec(form_ret).unpack(packet, 8))
+        else:
+            future.set_result(None)
+
+    def dispatch_callback(self, key, packet, form):
+        streams = self.callback_streams.get(key)
+
+        if not streams:
+            return
+
+        codec = get_payload_codec(form)
+
+        if len(codec.fields) == 0:
+            values = ()
+        elif len(codec.fields) == 1:
+            values = codec.unpack(packet, 8)
+        else:
+            values = tuple(codec.unpack(packet, 8))
+
+        for stream in list(streams):
+            stream.put(values)
+
+current_replay = contextvars.ContextVar('current_replay')
+
+class AwaitRequired(Exception):
+    def __init__(self, futures):
+        Exception.__init__(self)
+        self.futures = futures
+
+class Replay(object):
+    # Requests issued by one call of a device method. The method is run
+    # again after every response it had to wait for, requests that were
+    # already sent in an earlier run return their result instead. As in
+    # IPConnection.send_request_pipelined at most PIPELINE_WINDOW requests
+    # are in flight, as the sequence numbers would collide otherwise.
+    def __init__(self, ipcon):
+        self.ipcon = ipcon
+        self.futures = []
+        self.index = 0
+
+    def next_request(self, device, function_id, data, form, form_ret):
+        if self.index == len(self.futures):
+            pending = [future for future in self.futures if not future.done()]
+
+            if len(pending) >= IPConnection.PIPELINE_WINDOW:
+                raise AwaitRequired(pending[:1])
+
+            self.futures.append(self.ipcon.send_request_nowait(device, function_id, data, form, form_ret))
+
+        future = self.futures[self.index]
+        self.index += 1
+
+        return future
+
+def get_result(futures):
+    pending = [future for future in futures if not future.done()]
+
+    if len(pending) > 0:
+        raise AwaitRequired(pending)
+
+    return [future.result() for future in futures]
+
+class BindingAdapter(object):
+    # Stands in for the IPConnection of the device bindings, the generated
+    # methods can so be used unchanged by AsyncDevice
+    def __init__(self, ipcon):
+        self.devices = ipcon.devices
+
+    def send_request(self, device, function_id, data, form, form_ret):
+        return get_result([current_replay.get().next_request(device, function_id, data, form, form_ret)])[0]
+
+    def send_request_pipelined(self, device, function_id, data, form, form_ret):
+        # the result is checked by wait_for_pipeline
+        current_replay.get().next_request(device, function_id, data, form, form_ret)
+
+    def send_request_batch(self, device, requests):
+        replay = current_replay.get()
+        futures = [replay.next_request(device, *request) for request in requests]
+
+        return get_result(futures)
+
+    def send_request_stream(self, device, requests):
+        self.send_request_batch(device, requests)
+
+    def wait_for_pipeline(self, device):
+        get_result(current_replay.get().futures)
+
+class AsyncDevice(object):
+    # Wraps a device binding, every function that talks to the device is an
+    # awaitable coroutine function, constants and response expected
+    # configuration are passed through unchanged.
+    DEVICE_CLASS = None
+    LOCAL_FUNCTIONS = ['get_api_version', 'get_response_expected', 'set_response_expected',
+                       'set_response_expected_all', 'register_callback', 'set_callback_lane',
+                       'set_callback_coalescing']
+
+    def __init__(self, uid, ipcon):
+        self.ipcon = ipcon
+        self.device = self.DEVICE_CLASS(uid, ipcon.binding_adapter)
+
+    def __getattr__(self, name):
+        value = getattr(self.device, name)
+
+        if name.startswith('_') or name in AsyncDevice.LOCAL_FUNCTIONS or not callable(value):
+            return value
+
+        async def call(*args):
+            return await self.call(name, *args)
+
+        return call
+
+    async def call(self, name, *args):
+        replay = Replay(self.ipcon)
+        token = current_replay.set(replay)
+
+        try:
+            while True:
+                replay.index = 0
+
+                try:
+                    result = getattr(self.device, name)(*args)
+                    break
+                except AwaitRequired as e:
+                    await asyncio.wait(e.futures)
+        finally:
+            current_replay.reset(token)
+
+        # pipelined setters don't wait for their response, but the call is
+        # only done once the device acknowledged it
+        await asyncio.gather(*replay.futures)
+
+        return result
+
+    def callbacks(self, callback_id, maxsize=0):
+        return self.ipcon.callbacks(self.device, callback_id, maxsize)
+
+class AsyncBrickletLCD128x64(AsyncDevice):
+    DEVICE_CLASS = BrickletLCD128x64
+
+class AsyncBrickletAirQuality(AsyncDevice):
+    DEVICE_CLASS = BrickletAirQuality
+
+class AsyncBrickletOutdoorWeather(AsyncDevice):
+    DEVICE_CLASS = BrickletOutdoorWeather
@@ -12,9 +12,9 @@
 from collections import namedtuple
 
 try:
-    from .ip_connection import Device, IPConnection, Error, create_char, create_char_list, create_string, create_chunk_data
+    from .ip_connection import Device, IPConnection, Error, create_char, create_char_list, create_string, create_chunk_data, pack_bool_list
 except ValueError:
-    from ip_connection import Device, IPConnection, Error, create_char, create_char_list, create_string, create_chunk_data
+    from ip_connection import Device, IPConnection, Error, create_char, create_char_list, create_string, create_chunk_data, pack_bool_list
 
 ReadPixelsLowLevel = namedtuple('ReadPixelsLowLevel', ['pixels_length', 'pixels_chunk_offset', 'pixels_chunk_data'])
 GetDisplayConfiguration = namedtuple('DisplayConfiguration', ['contrast', 'backlight', 'invert', 'automatic_draw'])
@@ -1118,30 +1118,75 @@ class BrickletLCD128x64(Device):
 
         Automatic draw can be configured with the :func:`Set Display Configuration`
         function.
+
+        Instead of a list of bools the pixels can also be given already bit-packed
+        as bytes, bytearray or memoryview (line by line, 8 pixels per byte, least
+        significant bit first). In that case the number of pixels is the size of
+        the window.
         """
         x_start = int(x_start)
         y_start = int(y_start)
         x_end = int(x_end)
         y_end = int(y_end)
-        pixels = list(map(bool, pixels))
 
-        if len(pixels) > 65535:
-            raise Error(Error.INVALID_PARAMETER, 'Pixels can be at most 65535 items long')
+        if isinstance(pixels, (bytes, bytearray, memoryview)):
+            if isinstance(pixels, memoryview):
+                pixels = pixels.tobytes()
+
+            pixels_length = max(0, (x_end - x_start + 1) * (y_end - y_start + 1))
+
+            if len(pixels) * 8 < pixels_length:
+                raise Error(Error.INVALID_PARAMETER, 'Packed pixels are too short for the window')
 
-        pixels_length = len(pixels)
-        pixels_chunk_offset = 0
+            packed = bytes(pixels[:(pixels_length + 7) // 8])
+        else:
+            if not isinstance(pixels, (list, tuple)):
+                pixels = list(pixels)
+
+            pixels_length = len(pixels)
+            packed = pack_bool_list(pixels)
+
+        if pixels_length > 65535:
+            raise Error(Error.INVALID_PARAMETER, 'Pixels can be at most 65535 items long')
 
         if pixels_length == 0:
             pixels_chunk_data = [False] * 448
-            ret = self.write_pixels_low_level(x_start, y_start, x_end, y_end, pixels_length, pixels_chunk_offset, pixels_chunk_data)
-        else:
-            with self.stream_lock:
-                while pixels_chunk_offset < pixels_length:
-                    pixels_chunk_data = create_chunk_data(pixels, pixels_chunk_offset, 448, False)
-                    ret = self.write_pixels_low_level(x_start, y_start, x_end, y_end, pixels_length, pixels_chunk_offset, pixels_chunk_data)
-                    pixels_chunk_offset += 448
+            return self.write_pixels_low_level(x_start, y_start, x_end, y_end, pixels_length, 0, pixels_chunk_data)
 
-        return ret
+        pixels_chunks = []
+
+        for offset in range(0, len(packed), 56):
+            pixels_chunk_data = packed[offset:offset + 56]
+            pixels_chunks.append(pixels_chunk_data + b'\x00' * (56 - len(pixels_chunk_data)))
+
+        self.write_pixels_packed(x_start, y_start, x_end, y_end, pixels_length, pixels_chunks)
+
+    def write_pixels_packed(self, x_start, y_start, x_end, y_end, pixels_length, pixels_chunks):
+        """
+        Same as :func:`Write Pixels`, but takes the pixels already packed and split
+        into chunks. Each chunk is a bytes object of 56 bytes (448 pixels, least
+        significant bit first) and ``pixels_length`` is the number of pixels.
+
+        This avoids any per-pixel work for pixel data that is drawn repeatedly,
+        like icons.
+        """
+        x_start = int(x_start)
+        y_start = int(y_start)
+        x_end = int(x_end)
+        y_end = int(y_end)
+        pixels_length = int(pixels_length)
+
+        if pixels_length > 65535:
+            raise Error(Error.INVALID_PARAMETER, 'Pixels can be at most 65535 items long')
+
+        if len(pixels_chunks) != (pixels_length + 447) // 448:
+            raise Error(Error.INVALID_PARAMETER, 'Pixels chunks do not match pixels length')
+
+        requests = [(BrickletLCD128x64.FUNCTION_WRITE_PIXELS_LOW_LEVEL, (x_start, y_start, x_end, y_end, pixels_length, i*448, pixels_chunk_data), 'B B B B H H 448!', '')
+                    for i, pixels_chunk_data in enumerate(pixels_chunks)]
+
+        with self.stream_lock:
+            self.ipcon.send_request_stream(self, requests)
 
     def read_pixels(self, x_start, y_start, x_end, y_end):
         """
@@ -1216,11 +1261,17 @@ class BrickletLCD128x64(Device):
             data_chunk_data = [0] * 59
             ret = self.set_gui_graph_data_low_level(index, data_length, data_chunk_offset, data_chunk_data)
         else:
+            ret = None
+
+            requests = []
+
+            while data_chunk_offset < data_length:
+                data_chunk_data = create_chunk_data(data, data_chunk_offset, 59, 0)
+                requests.append((BrickletLCD128x64.FUNCTION_SET_GUI_GRAPH_DATA_LOW_LEVEL, (index, data_length, data_chunk_offset, data_chunk_data), 'B H H 59B', ''))
+                data_chunk_offset += 59
+
             with self.stream_lock:
-                while data_chunk_offset < data_length:
-                    data_chunk_data = create_chunk_data(data, data_chunk_offset, 59, 0)
-                    ret = self.set_gui_graph_data_low_level(index, data_length, data_chunk_offset, data_chunk_data)
-                    data_chunk_offset += 59
+                self.ipcon.send_request_stream(self, requests)
 
         return ret
 
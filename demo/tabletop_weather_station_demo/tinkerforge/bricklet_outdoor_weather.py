@@ -179,6 +179,28 @@ class BrickletOutdoorWeather(Device):
 
         return GetSensorData(*self.ipcon.send_request(self, BrickletOutdoorWeather.FUNCTION_GET_SENSOR_DATA, (identifier,), 'B', 'h B H'))
 
+    def get_station_data_many(self, identifiers):
+        """
+        Returns the data of :func:`Get Station Data` for all given identifiers as a
+        list in the same order. The requests are sent back to back and the responses
+        are collected afterwards, so this takes about one round trip instead of one
+        round trip per identifier.
+        """
+        requests = [(BrickletOutdoorWeather.FUNCTION_GET_STATION_DATA, (int(identifier),), 'B', 'h B I I I B ! H') for identifier in identifiers]
+
+        return [GetStationData(*ret) for ret in self.ipcon.send_request_batch(self, requests)]
+
+    def get_sensor_data_many(self, identifiers):
+        """
+        Returns the data of :func:`Get Sensor Data` for all given identifiers as a
+        list in the same order. The requests are sent back to back and the responses
+        are collected afterwards, so this takes about one round trip instead of one
+        round trip per identifier.
+        """
+        requests = [(BrickletOutdoorWeather.FUNCTION_GET_SENSOR_DATA, (int(identifier),), 'B', 'h B H') for identifier in identifiers]
+
+        return [GetSensorData(*ret) for ret in self.ipcon.send_request_batch(self, requests)]
+
     def set_station_callback_configuration(self, enable_callback):
         """
         Turns callback for station data on or off. Default is off.
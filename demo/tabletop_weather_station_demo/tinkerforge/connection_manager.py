@@ -0,0 +1,372 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2026 Tinkerforge GmbH
+#
+# Redistribution and use in source and binary forms of this file,
+# with or without modification, are permitted. See the Creative
+# Commons Zero (CC0 1.0) License for more details.
+
+# Serves many IPConnections with a fixed number of threads (Python 3 only).
+# Every IPConnection normally starts a receive, a callback and a disconnect
+# probe thread. IPConnections created with a ConnectionManager instead share one
+# selector thread, that receives packets and sends disconnect probes for all
+# sockets, and one pool of callback threads:
+#
+#   manager = ConnectionManager()
+#   ipcon1 = IPConnection(manager)
+#   ipcon2 = IPConnection(manager)
+#
+# Apart from that the IPConnections are used as before. The callbacks of one
+# IPConnection are still dispatched one after another in the order they were
+# received. A callback that blocks (including the auto-reconnect attempts of
+# a lost connection) only occupies one of the pool threads.
+#
+# The selector thread never holds the lock of the manager while it receives
+# or probes, so registering a connection never waits for the packets of
+# another one to be handled. Each Registration has its own lock instead,
+# that is held while the selector thread uses its socket.
+
+import collections
+import selectors
+import socket
+import threading
+import time
+import queue
+
+try:
+    from .ip_connection import IPConnection
+except ValueError:
+    from ip_connection import IPConnection
+
+MSG_DONTWAIT = getattr(socket, 'MSG_DONTWAIT', 0) # not available on Windows, where sockets have a 100ms timeout
+
+class CallbackLane(IPConnection.CallbackContext):
+    # Callback queue of one IPConnection, drained by the callback pool of the
+    # manager. Only one pool thread at a time works on a lane, so callbacks
+    # keep their order.
+    BATCH_SIZE = 64 # items dispatched before the lane is put back into line
+
+    def __init__(self, ipcon, pool, parent=None):
+        IPConnection.CallbackContext.__init__(self)
+
+        self.ipcon = ipcon
+        self.pool = pool
+        self.parent = parent # main lane, if this is a lane of Device.set_callback_lane
+        self.queue = self # put() is the only queue function used by IPConnection
+        self.items = collections.deque()
+        self.items_lock = threading.Lock()
+        self.scheduled = False
+        self.exited = threading.Event()
+        self.lock = threading.Lock()
+
+    def put(self, item):
+        with self.items_lock:
+            if self.exited.is_set():
+                return
+
+            self.items.append(item)
+
+            if self.scheduled:
+                return
+
+            self.scheduled = True
+
+        self.pool.ready.put(self)
+
+    def run(self):
+        self.thread = threading.current_thread()
+
+        try:
+            for _ in range(CallbackLane.BATCH_SIZE):
+                with self.items_lock:
+                    if len(self.items) == 0:
+                        self.scheduled = False
+                        return
+
+                    kind, data = self.items.popleft()
+
+                if not self.ipcon.dispatch_queue_item(self.parent or self, self, kind, data):
+                    self.exit()
+                    self.end_lanes()
+                    return
+        finally:
+            self.thread = None
+
+        # more items left, let other lanes go first
+        self.pool.ready.put(self)
+
+    def exit(self):
+        with self.items_lock:
+            self.items.clear()
+            self.scheduled = False
+            self.exited.set()
+
+    def join(self):
+        self.exited.wait()
+
+    def create_lane(self, ipcon, name):
+        # lanes are served by the pool as well, no extra threads
+        return CallbackLane(ipcon, self.pool, self)
+
+class CallbackPool(object):
+    def __init__(self, size):
+        self.ready = queue.Queue() # lanes with pending items, each at most once
+        self.threads = []
+
+        for i in range(size):
+            thread = threading.Thread(name='Callback-Pool-{0}'.format(i), target=self.loop)
+            thread.daemon = True
+            thread.start()
+
+            self.threads.append(thread)
+
+    def loop(self):
+        while True:
+            lane = self.ready.get()
+
+            if lane == None:
+                break
+
+            lane.run()
+
+    def stop(self):
+        for _ in self.threads:
+            self.ready.put(None)
+
+        for thread in self.threads:
+            if thread is not threading.current_thread():
+                thread.join()
+
+class Registration(object):
+    def __init__(self, ipcon, socket_id):
+        self.ipcon = ipcon
+        self.socket = ipcon.socket
+        self.socket_id = socket_id
+        self.buffer = bytearray(IPConnection.RECEIVE_BUFFER_SIZE)
+        self.view = memoryview(self.buffer)
+        self.data_start = 0
+        self.data_end = 0
+        self.next_probe = time.monotonic() + IPConnection.DISCONNECT_PROBE_INTERVAL
+        self.lock = threading.Lock() # held while the selector thread uses the socket
+        self.active = True # protected by lock, False once unregistered
+
+class ConnectionManager(object):
+    def __init__(self, callback_threads=4):
+        self.callback_threads = callback_threads
+        self.lock = threading.Lock() # protects selector and registrations
+        self.selector = None
+        self.registrations = {} # IPConnection -> Registration
+        self.wakeup_receiver = None
+        self.wakeup_sender = None
+        self.thread = None
+        self.pool = None
+        self.running = False
+
+    def start_unlocked(self):
+        if self.running:
+            return
+
+        self.selector = selectors.DefaultSelector()
+        self.wakeup_receiver, self.wakeup_sender = socket.socketpair()
+        self.wakeup_receiver.setblocking(False)
+        self.selector.register(self.wakeup_receiver, selectors.EVENT_READ, None)
+        self.pool = CallbackPool(self.callback_threads)
+        self.running = True
+        self.thread = threading.Thread(name='Brickd-Selector', target=self.loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        # all IPConnections of this manager have to be disconnected before
+        with self.lock:
+            if not self.running:
+                return
+
+            self.running = False
+            self.wakeup()
+
+        self.thread.join()
+        self.pool.stop()
+        self.selector.close()
+        self.wakeup_receiver.close()
+        self.wakeup_sender.close()
+
+    def wakeup(self):
+        try:
+            self.wakeup_sender.send(b'\0')
+        except socket.error:
+            pass
+
+    def create_callback_context(self, ipcon):
+        with self.lock:
+            self.start_unlocked()
+
+            return CallbackLane(ipcon, self.pool)
+
+    def register(self, ipcon, socket_id):
+        # NOTE: called with the socket_lock of the IPConnection locked
+        with self.lock:
+            self.start_unlocked()
+
+            registration = Registration(ipcon, socket_id)
+
+            self.selector.register(registration.socket, selectors.EVENT_READ, registration)
+            self.registrations[ipcon] = registration
+            self.wakeup()
+
+    def unregister(self, ipcon):
+        # NOTE: called with the socket_lock of the IPConnection locked. once
+        #       this returns the selector thread doesn't use the socket anymore
+        with self.lock:
+            registration = self.unregister_unlocked(ipcon)
+
+        if registration != None and threading.current_thread() is not self.thread:
+            # wait for the selector thread to finish a receive or probe
+            with registration.lock:
+                registration.active = False
+
+    def unregister_unlocked(self, ipcon):
+        registration = self.registrations.pop(ipcon, None)
+
+        if registration != None:
+            self.selector.unregister(registration.socket)
+
+        return registration
+
+    def get_connection_count(self):
+        return len(self.registrations)
+
+    def loop(self):
+        while True:
+            with self.lock:
+                if not self.running:
+                    break
+
+                registrations = list(self.registrations.values())
+
+            if len(registrations) > 0:
+                timeout = max(0, min(r.next_probe for r in registrations) - time.monotonic())
+            else:
+                timeout = None
+
+            events = self.selector.select(timeout)
+
+            for key, _ in events:
+                registration = key.data
+
+                if registration == None:
+                    try:
+                        while self.wakeup_receiver.recv(4096):
+                            pass
+                    except socket.error:
+                        pass
+                else:
+                    with registration.lock:
+                        if registration.active:
+                            self.receive(registration)
+
+            now = time.monotonic()
+
+            for registration in registrations:
+                if registration.next_probe <= now:
+                    registration.next_probe = now + IPConnection.DISCONNECT_PROBE_INTERVAL
+
+                    with registration.lock:
+                        if registration.active:
+                            self.probe(registration)
+
+    def disconnect_by_peer(self, registration, disconnect_reason):
+        # NOTE: assumes that the lock of the registration is locked
+        ipcon = registration.ipcon
+
+        # the socket would stay readable forever, stop watching it right now.
+        # closing the socket is left to the callback thread as usual
+        with self.lock:
+            if self.registrations.get(ipcon) is registration:
+                self.unregister_unlocked(ipcon)
+
+        registration.active = False
+
+        if ipcon.receive_flag:
+            ipcon.handle_disconnect_by_peer(disconnect_reason, registration.socket_id, False)
+
+    def receive(self, registration):
+        # same buffer handling as in IPConnection.receive_loop
+        buffer = registration.buffer
+        view = registration.view
+
+        if registration.data_start == registration.data_end:
+            registration.data_start = 0
+            registration.data_end = 0
+        elif len(buffer) - registration.data_end < IPConnection.RECEIVE_SIZE:
+            view[0:registration.data_end - registration.data_start] = \
+                view[registration.data_start:registration.data_end].tobytes()
+            registration.data_end -= registration.data_start
+            registration.data_start = 0
+
+        try:
+            length = registration.socket.recv_into(view[registration.data_end:registration.data_end + IPConnection.RECEIVE_SIZE])
+        except socket.timeout:
+            return
+        except socket.error:
+            self.disconnect_by_peer(registration, IPConnection.DISCONNECT_REASON_ERROR)
+            return
+
+        if length == 0:
+            self.disconnect_by_peer(registration, IPConnection.DISCONNECT_REASON_SHUTDOWN)
+            return
+
+        data_start = registration.data_start
+        data_end = registration.data_end + length
+        handle_response = registration.ipcon.handle_response
+
+        while data_end - data_start >= 8:
+            length = buffer[data_start + 4]
+
+            if data_end - data_start < length:
+                # Wait for complete packet
+                break
+
+            packet = view[data_start:data_start + length].tobytes()
+            data_start += length
+
+            handle_response(packet)
+
+        registration.data_start = data_start
+        registration.data_end = data_end
+
+    def probe(self, registration):
+        # same logic as IPConnection.disconnect_probe_loop
+        ipcon = registration.ipcon
+
+        if not ipcon.disconnect_probe_flag:
+            ipcon.disconnect_probe_flag = True
+            return
+
+        # the selector thread must not block on a connection whose brickd
+        # doesn't read anymore. if a request is being sent right now or the
+        # send buffer is full the probe is skipped, the next one follows
+        # after DISCONNECT_PROBE_INTERVAL
+        if not ipcon.socket_send_lock.acquire(False):
+            return
+
+        request, _, _ = ipcon.create_packet_header(None, 8, IPConnection.FUNCTION_DISCONNECT_PROBE)
+
+        try:
+            length = registration.socket.send(request, MSG_DONTWAIT)
+
+            if length < len(request):
+                # don't leave a partial packet in the stream
+                registration.socket.sendall(request[length:])
+        except (BlockingIOError, socket.timeout):
+            return
+        except socket.error:
+            self.disconnect_by_peer(registration, IPConnection.DISCONNECT_REASON_ERROR)
+            return
+        finally:
+            ipcon.socket_send_lock.release()
+
+        if ipcon.trace is not None:
+            ipcon.trace.sent(request)
+
+        if ipcon.stats is not None:
+            ipcon.stats.sent(len(request))
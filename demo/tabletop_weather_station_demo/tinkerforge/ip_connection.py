@@ -16,12 +16,19 @@ import hmac
 import hashlib
 import errno
 import threading
+import collections
+import contextlib
 
 try:
     import queue # Python 3
 except ImportError:
     import Queue as queue # Python 2
 
+try:
+    from .reconnect_policy import ReconnectPolicy
+except (ValueError, ImportError):
+    from reconnect_policy import ReconnectPolicy
+
 def get_uid_from_data(data):
     return struct.unpack('<I', data[0:4])[0]
 
@@ -80,6 +87,67 @@ def create_chunk_data(data, chunk_offset, chunk_length, chunk_padding):
 
     return chunk_data
 
+if sys.hexversion < 0x03000000:
+    def pack_bool_list(data): # return str with bit i set if data[i] is true
+        packed = bytearray((len(data) + 7) // 8)
+
+        for i, b in enumerate(data):
+            if b:
+                packed[i // 8] |= 1 << (i % 8)
+
+        return str(packed)
+
+    def unpack_bool_list(packed, count): # return tuple of count bools
+        packed = bytearray(packed)
+
+        return tuple([packed[i // 8] & (1 << (i % 8)) != 0 for i in range(count)])
+else:
+    BYTES_TO_DIGITS = b'0' + b'1' * 255
+
+    def pack_bool_list(data): # return bytes with bit i set if data[i] is true
+        # the bools are turned into a string of binary digits that is parsed
+        # as one integer, least significant bit first. this avoids a Python
+        # loop over all bits
+        length = (len(data) + 7) // 8
+
+        if length == 0:
+            return b''
+
+        digits = None
+
+        if isinstance(data, (list, tuple)):
+            try:
+                digits = bytes(data) # fast path for bools and small ints
+            except (TypeError, ValueError):
+                pass
+        else:
+            numpy = sys.modules.get('numpy') # only if the caller uses numpy
+
+            if numpy != None and isinstance(data, numpy.ndarray) and data.ndim == 1:
+                return numpy.packbits(data.astype(bool), bitorder='little').tobytes()
+
+            try:
+                view = memoryview(data)
+            except TypeError:
+                pass
+            else:
+                # bytes() copies the raw buffer, so this is only correct for
+                # one byte per item, e.g. bytearray or array('B')
+                if view.ndim == 1 and view.itemsize == 1:
+                    digits = view.tobytes()
+
+        if digits == None:
+            digits = bytes(map(bool, data))
+
+        digits = digits.translate(BYTES_TO_DIGITS)
+
+        return int(digits[::-1], 2).to_bytes(length, 'little')
+
+    def unpack_bool_list(packed, count): # return tuple of count bools
+        digits = '{0:0{1}b}'.format(int.from_bytes(packed, 'little'), len(packed) * 8)
+
+        return tuple(map('1'.__eq__, digits[::-1][:count]))
+
 if sys.hexversion < 0x03000000:
     def create_char(value): # return str with len() == 1 and ord() <= 255
         if isinstance(value, str) and len(value) == 1: # Python2 str satisfies ord() <= 255 by default
@@ -190,111 +258,169 @@ else:
         else:
             return ''.join(create_char_list(value, expected_type='string'))
 
-def pack_payload(data, form):
-    if sys.hexversion < 0x03000000:
-        packed = ''
-    else:
-        packed = b''
-
-    for f, d in zip(form.split(' '), data):
-        if '!' in f:
-            if len(f) > 1:
-                if int(f.replace('!', '')) != len(d):
-                    raise ValueError('Incorrect bool list length')
+class PayloadCodec(object):
+    # Compiled form of a space separated payload format string. All fields are
+    # packed and unpacked with a single struct.Struct, only bool arrays, chars
+    # and strings need some post-processing.
+    FIELD_VALUE = 0
+    FIELD_ARRAY = 1
+    FIELD_BOOL = 2
+    FIELD_BOOL_ARRAY = 3
+    FIELD_CHAR = 4
+    FIELD_CHAR_ARRAY = 5
+    FIELD_STRING = 6
+
+    def __init__(self, form):
+        self.form = form
+        self.fields = [] # (kind, count)
+        patched_form = []
 
-                p = [0] * int(math.ceil(len(d) / 8.0))
-
-                for i, b in enumerate(d):
-                    if b:
-                        p[i // 8] |= 1 << (i % 8)
+        for f in form.split(' '):
+            if len(f) == 0:
+                continue
 
-                packed += struct.pack('<{0}B'.format(len(p)), *p)
+            if len(f) > 1 and f[:-1].isdigit():
+                count = int(f[:-1])
             else:
-                packed += struct.pack('<?', d)
-        elif 'c' in f:
-            if sys.hexversion < 0x03000000:
+                count = 1
+
+            if '!' in f:
                 if len(f) > 1:
-                    packed += struct.pack('<' + f, *d)
+                    self.fields.append((PayloadCodec.FIELD_BOOL_ARRAY, count))
+                    patched_form.append('{0}s'.format(int(math.ceil(count / 8.0))))
                 else:
-                    packed += struct.pack('<' + f, d)
-            else:
+                    self.fields.append((PayloadCodec.FIELD_BOOL, 1))
+                    patched_form.append('?')
+            elif 'c' in f:
                 if len(f) > 1:
-                    packed += struct.pack('<' + f, *list(map(lambda char: bytes([ord(char)]), d)))
+                    self.fields.append((PayloadCodec.FIELD_CHAR_ARRAY, count))
                 else:
-                    packed += struct.pack('<' + f, bytes([ord(d)]))
-        elif 's' in f:
-            if sys.hexversion < 0x03000000:
-                packed += struct.pack('<' + f, d)
+                    self.fields.append((PayloadCodec.FIELD_CHAR, 1))
+
+                patched_form.append(f)
+            elif 's' in f:
+                self.fields.append((PayloadCodec.FIELD_STRING, count))
+                patched_form.append(f)
+            elif len(f) > 1:
+                self.fields.append((PayloadCodec.FIELD_ARRAY, count))
+                patched_form.append(f)
             else:
-                packed += struct.pack('<' + f, bytes(map(ord, d)))
-        elif len(f) > 1:
-            packed += struct.pack('<' + f, *d)
-        else:
-            packed += struct.pack('<' + f, d)
+                self.fields.append((PayloadCodec.FIELD_VALUE, 1))
+                patched_form.append(f)
+
+        self.struct = struct.Struct('<' + ' '.join(patched_form))
+        self.size = self.struct.size
+
+    def pack(self, data):
+        values = []
+
+        for (kind, count), d in zip(self.fields, data):
+            if kind == PayloadCodec.FIELD_VALUE or kind == PayloadCodec.FIELD_BOOL:
+                values.append(d)
+            elif kind == PayloadCodec.FIELD_ARRAY:
+                values.extend(d)
+            elif kind == PayloadCodec.FIELD_BOOL_ARRAY:
+                if isinstance(d, (bytes, bytearray)):
+                    # already packed bool list
+                    if int(math.ceil(count / 8.0)) != len(d):
+                        raise ValueError('Incorrect packed bool list length')
+
+                    values.append(bytes(d))
+                else:
+                    if count != len(d):
+                        raise ValueError('Incorrect bool list length')
 
-    return packed
+                    values.append(pack_bool_list(d))
+            elif kind == PayloadCodec.FIELD_CHAR:
+                if sys.hexversion < 0x03000000:
+                    values.append(d)
+                else:
+                    values.append(bytes([ord(d)]))
+            elif kind == PayloadCodec.FIELD_CHAR_ARRAY:
+                if sys.hexversion < 0x03000000:
+                    values.extend(d)
+                else:
+                    values.extend(map(lambda char: bytes([ord(char)]), d))
+            else: # FIELD_STRING
+                if sys.hexversion < 0x03000000:
+                    values.append(d)
+                else:
+                    values.append(bytes(map(ord, d)))
+
+        return self.struct.pack(*values)
+
+    def unpack(self, data, offset=0):
+        x = self.struct.unpack_from(data, offset)
+        ret = []
+        i = 0
+
+        for kind, count in self.fields:
+            if kind == PayloadCodec.FIELD_VALUE or kind == PayloadCodec.FIELD_BOOL:
+                ret.append(x[i])
+                i += 1
+            elif kind == PayloadCodec.FIELD_ARRAY:
+                if count > 1:
+                    ret.append(x[i:i + count])
+                else:
+                    ret.append(x[i])
 
-def unpack_payload(data, form):
-    ret = []
+                i += count
+            elif kind == PayloadCodec.FIELD_BOOL_ARRAY:
+                y = unpack_bool_list(x[i], count)
 
-    for f in form.split(' '):
-        o = f
+                if count > 1:
+                    ret.append(y)
+                else:
+                    ret.append(y[0])
 
-        if '!' in f:
-            if len(f) > 1:
-                f = '{0}B'.format(int(math.ceil(int(f.replace('!', '')) / 8.0)))
-            else:
-                f = 'B'
+                i += 1
+            elif kind == PayloadCodec.FIELD_CHAR or kind == PayloadCodec.FIELD_CHAR_ARRAY:
+                if sys.hexversion < 0x03000000:
+                    y = x[i:i + count]
+                else:
+                    y = tuple(map(lambda item: chr(ord(item)), x[i:i + count]))
 
-        f = '<' + f
-        length = struct.calcsize(f)
-        x = struct.unpack(f, data[:length])
+                if count > 1:
+                    ret.append(y)
+                else:
+                    ret.append(y[0])
 
-        if '!' in o:
-            y = []
+                i += count
+            else: # FIELD_STRING
+                if sys.hexversion < 0x03000000:
+                    s = x[i]
+                else:
+                    s = ''.join(map(chr, x[i]))
 
-            if len(o) > 1:
-                for i in range(int(o.replace('!', ''))):
-                    y.append(x[i // 8] & (1 << (i % 8)) != 0)
-            else:
-                y.append(x[0] != 0)
+                k = s.find('\x00')
 
-            x = tuple(y)
+                if k >= 0:
+                    s = s[:k]
 
-        if 'c' in f:
-            if sys.hexversion < 0x03000000:
-                if len(x) > 1:
-                    ret.append(x)
-                else:
-                    ret.append(x[0])
-            else:
-                if len(x) > 1:
-                    ret.append(tuple(map(lambda item: chr(ord(item)), x)))
-                else:
-                    ret.append(chr(ord(x[0])))
-        elif 's' in f:
-            if sys.hexversion < 0x03000000:
-                s = x[0]
-            else:
-                s = ''.join(map(chr, x[0]))
+                ret.append(s)
+                i += 1
 
-            i = s.find('\x00')
+        if len(ret) == 1:
+            return ret[0]
+        else:
+            return ret
 
-            if i >= 0:
-                s = s[:i]
+payload_codecs = {}
 
-            ret.append(s)
-        elif len(x) > 1:
-            ret.append(x)
-        else:
-            ret.append(x[0])
+def get_payload_codec(form):
+    codec = payload_codecs.get(form)
 
-        data = data[length:]
+    if codec is None:
+        codec = PayloadCodec(form)
+        payload_codecs[form] = codec
 
-    if len(ret) == 1:
-        return ret[0]
-    else:
-        return ret
+    return codec
+
+def pack_payload(data, form):
+    return get_payload_codec(form).pack(data)
+
+def unpack_payload(data, form):
+    return get_payload_codec(form).unpack(data)
 
 class Error(Exception):
     TIMEOUT = -1
@@ -312,6 +438,100 @@ class Error(Exception):
         self.value = value
         self.description = description
 
+def check_response_error(response, function_id):
+    error_code = get_error_code_from_data(response)
+
+    if error_code == 0:
+        # no error
+        pass
+    elif error_code == 1:
+        msg = 'Got invalid parameter for function {0}'.format(function_id)
+        raise Error(Error.INVALID_PARAMETER, msg)
+    elif error_code == 2:
+        msg = 'Function {0} is not supported'.format(function_id)
+        raise Error(Error.NOT_SUPPORTED, msg)
+    else:
+        msg = 'Function {0} returned an unknown error'.format(function_id)
+        raise Error(Error.UNKNOWN_ERROR_CODE, msg)
+
+class RequestFuture(object):
+    # Result of a pipelined request, see IPConnection.send_request_pipelined.
+    # Requests that expect a response are registered in the pending requests
+    # of their device keyed by (function_id, sequence_number) until the
+    # response arrives or waiting for it times out.
+    def __init__(self, device, function_id, sequence_number, form_ret, timeout):
+        self.device = device
+        self.function_id = function_id
+        self.sequence_number = sequence_number
+        self.form_ret = form_ret
+        self.deadline = time.time() + timeout
+        self.event = threading.Event()
+        self.response = None
+        self.error = None
+        self.collected = False # result was already taken by a caller
+        self.sent_time = None # set if the IPConnection records statistics
+
+    def get_key(self):
+        return (self.function_id, self.sequence_number)
+
+    def set_response(self, response):
+        self.response = response
+        self.event.set()
+
+    def set_done(self):
+        self.event.set()
+
+    def set_error(self, error):
+        self.error = error
+        self.event.set()
+
+    def done(self):
+        return self.event.is_set()
+
+    def wait(self):
+        # returns False if the response did not arrive in time
+        if not self.event.wait(max(0, self.deadline - time.time())):
+            with self.device.pending_lock:
+                if self.device.pending_requests.get(self.get_key()) is self:
+                    del self.device.pending_requests[self.get_key()]
+
+            if not self.event.is_set():
+                msg = 'Did not receive response for function {0} in time'.format(self.function_id)
+                self.error = Error(Error.TIMEOUT, msg)
+                self.event.set()
+
+                stats = self.device.ipcon.stats
+
+                if stats is not None and self.sent_time is not None:
+                    stats.request_timed_out(self.device.uid, self.function_id)
+
+        return self.error == None
+
+    def get_error(self):
+        # waits like result, but returns the error instead of raising it
+        if self.wait() and self.response != None:
+            try:
+                check_response_error(self.response, self.function_id)
+            except Error as e:
+                self.error = e
+
+        return self.error
+
+    def result(self):
+        self.collected = True
+        self.wait()
+
+        if self.error != None:
+            raise self.error
+
+        if self.response == None:
+            return None
+
+        check_response_error(self.response, self.function_id)
+
+        if len(self.form_ret) > 0:
+            return get_payload_codec(self.form_ret).unpack(self.response, 8)
+
 class Device(object):
     RESPONSE_EXPECTED_INVALID_FUNCTION_ID = 0
     RESPONSE_EXPECTED_ALWAYS_TRUE = 1 # getter
@@ -335,11 +555,19 @@ class Device(object):
         self.registered_callbacks = {}
         self.callback_formats = {}
         self.high_level_callbacks = {}
+        self.callback_lanes = {} # function_id -> lane name, see set_callback_lane
+        self.coalesced_callbacks = {} # function_id -> key length, see set_callback_coalescing
         self.expected_response_function_id = None # protected by request_lock
         self.expected_response_sequence_number = None # protected by request_lock
         self.response_queue = queue.Queue()
         self.request_lock = threading.Lock()
         self.stream_lock = threading.Lock()
+        self.pending_requests = {} # (function_id, sequence_number) -> RequestFuture, protected by pending_lock
+        self.pending_lock = threading.Lock()
+        self.pipeline = collections.deque() # RequestFutures in send order, protected by pipeline_lock
+        self.pipeline_lock = threading.Lock()
+        self.pipeline_thread = None # thread inside IPConnection.pipeline, protected by pipeline_lock
+        self.pipeline_error = None # first error of a request that left the pipeline uncollected, protected by pipeline_lock
 
         self.response_expected = [Device.RESPONSE_EXPECTED_INVALID_FUNCTION_ID] * 256
         self.response_expected[IPConnection.FUNCTION_ADC_CALIBRATE] = Device.RESPONSE_EXPECTED_ALWAYS_TRUE
@@ -433,6 +661,47 @@ class Device(object):
             if self.response_expected[i] in [Device.RESPONSE_EXPECTED_TRUE, Device.RESPONSE_EXPECTED_FALSE]:
                 self.response_expected[i] = flag
 
+    def set_callback_lane(self, callback_id, lane):
+        """
+        Dispatches the callback with the given *callback_id* on the callback
+        lane with the given name instead of the callback thread of the IP
+        Connection. Every lane has its own thread, callbacks on one lane are
+        dispatched in the order they were received. A slow callback function
+        only delays the other callbacks on its lane.
+
+        Use the same lane for all callbacks of a device to keep their
+        relative order. Passing *None* as *lane* moves the callback back to
+        the callback thread.
+        """
+
+        function_id = abs(callback_id) # high-level callbacks have negative IDs
+
+        if lane is None:
+            self.callback_lanes.pop(function_id, None)
+        else:
+            self.callback_lanes[function_id] = lane
+
+    def set_callback_coalescing(self, callback_id, key_length):
+        """
+        Enables latest-value-wins coalescing for the callback with the given
+        *callback_id*. If a callback arrives while an older one with the same
+        key is still queued, the older one is dropped and the newer one takes
+        its place in the queue. The key is made of the first *key_length*
+        bytes of the callback payload, for example 1 for a callback that
+        starts with a one byte index or identifier, 0 to keep only the latest
+        callback. Passing *None* as *key_length* disables coalescing.
+
+        See IPConnection.get_coalesce_count for the number of dropped
+        callbacks.
+        """
+
+        function_id = abs(callback_id) # high-level callbacks have negative IDs
+
+        if key_length is None:
+            self.coalesced_callbacks.pop(function_id, None)
+        else:
+            self.coalesced_callbacks[function_id] = int(key_length)
+
 class BrickDaemon(Device):
     FUNCTION_GET_AUTHENTICATION_NONCE = 1
     FUNCTION_AUTHENTICATE = 2
@@ -491,20 +760,67 @@ class IPConnection(object):
     QUEUE_EXIT = 0
     QUEUE_META = 1
     QUEUE_PACKET = 2
+    QUEUE_COALESCED = 3 # packet is taken from coalesced_packets
 
     DISCONNECT_PROBE_INTERVAL = 5
 
+    PIPELINE_WINDOW = 15 # sequence numbers go from 1 to 15
+
+    RECEIVE_SIZE = 8192
+    RECEIVE_BUFFER_SIZE = 2 * RECEIVE_SIZE
+
     class CallbackContext(object):
         def __init__(self):
             self.queue = None
             self.thread = None
             self.packet_dispatch_allowed = False
             self.lock = None
+            self.lanes = {} # lane name -> queue, see Device.set_callback_lane
+            self.lanes_lock = threading.Lock()
+
+        def is_current(self):
+            return threading.current_thread() is self.thread
+
+        def join(self):
+            self.thread.join()
 
-    def __init__(self):
+        def create_lane(self, ipcon, name):
+            lane_queue = queue.Queue()
+            thread = threading.Thread(name='Callback-Lane-{0}'.format(name),
+                                      target=ipcon.callback_lane_loop,
+                                      args=(self, lane_queue))
+            thread.daemon = True
+            thread.start()
+
+            return lane_queue
+
+        def get_lane(self, ipcon, name):
+            with self.lanes_lock:
+                lane_queue = self.lanes.get(name)
+
+                if lane_queue is None:
+                    lane_queue = self.create_lane(ipcon, name)
+                    self.lanes[name] = lane_queue
+
+                return lane_queue
+
+        def end_lanes(self):
+            # the lanes are not joined, a lane could be the thread that is
+            # waiting for the callback thread to end in disconnect
+            with self.lanes_lock:
+                for lane_queue in self.lanes.values():
+                    lane_queue.put((IPConnection.QUEUE_EXIT, None))
+
+                self.lanes = {}
+
+    def __init__(self, manager=None):
         """
         Creates an IP Connection object that can be used to enumerate the available
         devices. It is also required for the constructor of Bricks and Bricklets.
+
+        If a ConnectionManager is given, the connection doesn't start its own
+        receive, callback and disconnect probe threads but is served by the
+        threads of the manager.
         """
 
         self.host = None
@@ -513,6 +829,8 @@ class IPConnection(object):
         self.auto_reconnect = True
         self.auto_reconnect_allowed = False
         self.auto_reconnect_pending = False
+        self.reconnect_policy = ReconnectPolicy()
+        self.reconnect_wakeup = threading.Event() # ends the wait between auto-reconnect attempts
         self.sequence_number_lock = threading.Lock()
         self.next_sequence_number = 0 # protected by sequence_number_lock
         self.authentication_lock = threading.Lock() # protects authentication handshake
@@ -529,6 +847,12 @@ class IPConnection(object):
         self.disconnect_probe_flag = False
         self.disconnect_probe_queue = None
         self.disconnect_probe_thread = None
+        self.manager = manager
+        self.coalesced_packets = {} # (uid, function_id, key) -> packet, protected by coalesce_lock
+        self.coalesce_lock = threading.Lock()
+        self.coalesce_count = 0 # protected by coalesce_lock
+        self.trace = None
+        self.stats = None
         self.waiter = threading.Semaphore()
         self.brickd = BrickDaemon('2', self)
 
@@ -563,6 +887,7 @@ class IPConnection(object):
 
         with self.socket_lock:
             self.auto_reconnect_allowed = False
+            self.reconnect_wakeup.set()
 
             if self.auto_reconnect_pending:
                 # abort potentially pending auto reconnect
@@ -584,8 +909,8 @@ class IPConnection(object):
                              IPConnection.DISCONNECT_REASON_REQUEST, None)))
         callback.queue.put((IPConnection.QUEUE_EXIT, None))
 
-        if threading.current_thread() is not callback.thread:
-            callback.thread.join()
+        if not callback.is_current():
+            callback.join()
 
     def authenticate(self, secret):
         """
@@ -658,6 +983,7 @@ class IPConnection(object):
         if not self.auto_reconnect:
             # abort potentially pending auto reconnect
             self.auto_reconnect_allowed = False
+            self.reconnect_wakeup.set()
 
     def get_auto_reconnect(self):
         """
@@ -729,11 +1055,56 @@ class IPConnection(object):
         else:
             self.registered_callbacks[callback_id] = function
 
+    def set_trace(self, trace):
+        """
+        Records every sent and received packet into the given *trace*, an
+        object with sent(packet) and received(packet) functions such as
+        packet_trace.TraceWriter. Passing *None* stops the recording.
+        """
+
+        self.trace = trace
+
+    def set_reconnect_policy(self, reconnect_policy):
+        """
+        Sets the reconnect_policy.ReconnectPolicy that gives the time to wait
+        between auto-reconnect attempts. The policy can be shared with the
+        connect loop of the application. By default every IP Connection has
+        its own policy, starting at 0.1 seconds and backing off to 30 seconds.
+        """
+
+        self.reconnect_policy = reconnect_policy
+
+    def set_stats(self, stats):
+        """
+        Records request latencies, timeouts, traffic and callback queue
+        statistics into the given *stats*, a ip_connection_stats.ConnectionStats
+        object. Passing *None* stops the recording.
+        """
+
+        self.stats = stats
+
+    def get_coalesce_count(self):
+        """
+        Returns the number of callbacks that were dropped, because a newer
+        callback with the same key arrived while they were queued. See
+        set_callback_coalescing of the devices.
+        """
+
+        return self.coalesce_count
+
     def connect_unlocked(self, is_auto_reconnect):
         # NOTE: assumes that socket is None and socket_lock is locked
 
-        # create callback thread and queue
         if self.callback is None:
+            # forget packets of a previous callback queue that ended before
+            # dispatching them, their keys would be stuck otherwise
+            with self.coalesce_lock:
+                self.coalesced_packets.clear()
+
+        # create callback thread and queue
+        if self.callback is None and self.manager is not None:
+            self.callback = self.manager.create_callback_context(self)
+        elif self.callback is None:
             try:
                 self.callback = IPConnection.CallbackContext()
                 self.callback.queue = queue.Queue()
@@ -771,8 +1142,8 @@ class IPConnection(object):
                 if not is_auto_reconnect:
                     self.callback.queue.put((IPConnection.QUEUE_EXIT, None))
 
-                    if threading.current_thread() is not self.callback.thread:
-                        self.callback.thread.join()
+                    if not self.callback.is_current():
+                        self.callback.join()
 
                     self.callback = None
 
@@ -782,63 +1153,92 @@ class IPConnection(object):
         self.socket = tmp
         self.socket_id += 1
 
-        # create disconnect probe thread
-        try:
-            self.disconnect_probe_flag = True
-            self.disconnect_probe_queue = queue.Queue()
-            self.disconnect_probe_thread = threading.Thread(name='Disconnect-Prober',
-                                                            target=self.disconnect_probe_loop,
-                                                            args=(self.disconnect_probe_queue,))
-            self.disconnect_probe_thread.daemon = True
-            self.disconnect_probe_thread.start()
-        except:
-            def cleanup2():
-                self.disconnect_probe_thread = None
+        if self.manager is not None:
+            # the manager receives packets and sends disconnect probes for
+            # this socket instead of the receive and disconnect probe threads
+            self.callback.packet_dispatch_allowed = True
 
-                # close socket
-                self.socket.close()
-                self.socket = None
+            try:
+                self.disconnect_probe_flag = True
+                self.receive_flag = True
+                self.manager.register(self, self.socket_id)
+            except:
+                def cleanup4():
+                    self.receive_flag = False
 
-                # end callback thread
-                if not is_auto_reconnect:
-                    self.callback.queue.put((IPConnection.QUEUE_EXIT, None))
+                    # close socket
+                    self.socket.close()
+                    self.socket = None
 
-                    if threading.current_thread() is not self.callback.thread:
-                        self.callback.thread.join()
+                    # end callback thread
+                    if not is_auto_reconnect:
+                        self.callback.queue.put((IPConnection.QUEUE_EXIT, None))
 
-                    self.callback = None
+                        if not self.callback.is_current():
+                            self.callback.join()
 
-            cleanup2()
-            raise
+                        self.callback = None
 
-        # create receive thread
-        self.callback.packet_dispatch_allowed = True
+                cleanup4()
+                raise
+        else:
+            # create disconnect probe thread
+            try:
+                self.disconnect_probe_flag = True
+                self.disconnect_probe_queue = queue.Queue()
+                self.disconnect_probe_thread = threading.Thread(name='Disconnect-Prober',
+                                                                target=self.disconnect_probe_loop,
+                                                                args=(self.disconnect_probe_queue,))
+                self.disconnect_probe_thread.daemon = True
+                self.disconnect_probe_thread.start()
+            except:
+                def cleanup2():
+                    self.disconnect_probe_thread = None
 
-        try:
-            self.receive_flag = True
-            self.receive_thread = threading.Thread(name='Brickd-Receiver',
-                                                   target=self.receive_loop,
-                                                   args=(self.socket_id,))
-            self.receive_thread.daemon = True
-            self.receive_thread.start()
-        except:
-            def cleanup3():
-                self.receive_thread = None
+                    # close socket
+                    self.socket.close()
+                    self.socket = None
 
-                # close socket
-                self.disconnect_unlocked()
+                    # end callback thread
+                    if not is_auto_reconnect:
+                        self.callback.queue.put((IPConnection.QUEUE_EXIT, None))
 
-                # end callback thread
-                if not is_auto_reconnect:
-                    self.callback.queue.put((IPConnection.QUEUE_EXIT, None))
+                        if not self.callback.is_current():
+                            self.callback.join()
 
-                    if threading.current_thread() is not self.callback.thread:
-                        self.callback.thread.join()
+                        self.callback = None
 
-                    self.callback = None
+                cleanup2()
+                raise
 
-            cleanup3()
-            raise
+            # create receive thread
+            self.callback.packet_dispatch_allowed = True
+
+            try:
+                self.receive_flag = True
+                self.receive_thread = threading.Thread(name='Brickd-Receiver',
+                                                       target=self.receive_loop,
+                                                       args=(self.socket_id,))
+                self.receive_thread.daemon = True
+                self.receive_thread.start()
+            except:
+                def cleanup3():
+                    self.receive_thread = None
+
+                    # close socket
+                    self.disconnect_unlocked()
+
+                    # end callback thread
+                    if not is_auto_reconnect:
+                        self.callback.queue.put((IPConnection.QUEUE_EXIT, None))
+
+                        if not self.callback.is_current():
+                            self.callback.join()
+
+                        self.callback = None
+
+                cleanup3()
+                raise
 
         self.auto_reconnect_allowed = False
         self.auto_reconnect_pending = False
@@ -855,15 +1255,19 @@ class IPConnection(object):
     def disconnect_unlocked(self):
         # NOTE: assumes that socket is not None and socket_lock is locked
 
-        # end disconnect probe thread
-        self.disconnect_probe_queue.put(True)
-        self.disconnect_probe_thread.join() # FIXME: use a timeout?
-        self.disconnect_probe_thread = None
+        if self.manager is not None:
+            # stop receiving and probing in the manager
+            self.manager.unregister(self)
+        else:
+            # end disconnect probe thread
+            self.disconnect_probe_queue.put(True)
+            self.disconnect_probe_thread.join() # FIXME: use a timeout?
+            self.disconnect_probe_thread = None
 
         # stop dispatching packet callbacks before ending the receive
         # thread to avoid timeout exceptions due to callback functions
         # trying to call getters
-        if threading.current_thread() is not self.callback.thread:
+        if not self.callback.is_current():
             # FIXME: cannot hold callback lock here because this can
             #        deadlock due to an ordering problem with the socket lock
             #with self.callback.lock:
@@ -888,15 +1292,29 @@ class IPConnection(object):
         self.socket.close()
         self.socket = None
 
+        self.fail_pending_requests()
+
     def receive_loop(self, socket_id):
-        if sys.hexversion < 0x03000000:
-            pending_data = ''
-        else:
-            pending_data = bytes()
+        # received data is read directly into a preallocated buffer. complete
+        # packets are framed in place between data_start and data_end, the
+        # remaining partial packet is only moved to the front of the buffer
+        # if there is not enough room left for the next receive call
+        buffer = bytearray(IPConnection.RECEIVE_BUFFER_SIZE)
+        view = memoryview(buffer)
+        data_start = 0
+        data_end = 0
 
         while self.receive_flag:
+            if data_start == data_end:
+                data_start = 0
+                data_end = 0
+            elif len(buffer) - data_end < IPConnection.RECEIVE_SIZE:
+                view[0:data_end - data_start] = view[data_start:data_end].tobytes()
+                data_end -= data_start
+                data_start = 0
+
             try:
-                data = self.socket.recv(8192)
+                length = self.socket.recv_into(view[data_end:data_end + IPConnection.RECEIVE_SIZE])
             except socket.timeout:
                 continue
             except socket.error:
@@ -908,26 +1326,26 @@ class IPConnection(object):
                     self.handle_disconnect_by_peer(IPConnection.DISCONNECT_REASON_ERROR, socket_id, False)
                 break
 
-            if len(data) == 0:
+            if length == 0:
                 if self.receive_flag:
                     self.handle_disconnect_by_peer(IPConnection.DISCONNECT_REASON_SHUTDOWN, socket_id, False)
                 break
 
-            pending_data += data
+            data_end += length
 
             while self.receive_flag:
-                if len(pending_data) < 8:
+                if data_end - data_start < 8:
                     # Wait for complete header
                     break
 
-                length = get_length_from_data(pending_data)
+                length = buffer[data_start + 4]
 
-                if len(pending_data) < length:
+                if data_end - data_start < length:
                     # Wait for complete packet
                     break
 
-                packet = pending_data[0:length]
-                pending_data = pending_data[length:]
+                packet = view[data_start:data_start + length].tobytes()
+                data_start += length
 
                 self.handle_response(packet)
 
@@ -944,10 +1362,13 @@ class IPConnection(object):
                     # don't close the socket if it got disconnected or
                     # reconnected in the meantime
                     if self.socket is not None and self.socket_id == socket_id:
-                        # end disconnect probe thread
-                        self.disconnect_probe_queue.put(True)
-                        self.disconnect_probe_thread.join() # FIXME: use a timeout?
-                        self.disconnect_probe_thread = None
+                        if self.manager is not None:
+                            self.manager.unregister(self)
+                        else:
+                            # end disconnect probe thread
+                            self.disconnect_probe_queue.put(True)
+                            self.disconnect_probe_thread.join() # FIXME: use a timeout?
+                            self.disconnect_probe_thread = None
 
                         # close socket
                         self.socket.close()
@@ -964,36 +1385,42 @@ class IPConnection(object):
             if parameter != IPConnection.DISCONNECT_REASON_REQUEST and \
                self.auto_reconnect and self.auto_reconnect_allowed:
                 self.auto_reconnect_pending = True
-                retry = True
+                self.reconnect_wakeup.clear()
 
                 # block here until reconnect. this is okay, there is no
-                # callback to deliver when there is no connection
-                while retry:
-                    retry = False
+                # callback to deliver when there is no connection. the
+                # socket_lock is not held while waiting between attempts and
+                # disconnect ends the wait
+                while True:
+                    with self.socket_lock:
+                        if not self.auto_reconnect_allowed or self.socket is not None:
+                            self.auto_reconnect_pending = False
+                            break
+
+                    self.reconnect_wakeup.wait(self.reconnect_policy.next_delay())
 
                     with self.socket_lock:
                         if self.auto_reconnect_allowed and self.socket is None:
                             try:
                                 self.connect_unlocked(True)
                             except:
-                                retry = True
-                        else:
-                            self.auto_reconnect_pending = False
+                                continue
+
+                            self.reconnect_policy.reset()
 
-                    if retry:
-                        time.sleep(0.1)
+                        self.auto_reconnect_pending = False
+                        break
 
     def dispatch_packet(self, packet):
         uid = get_uid_from_data(packet)
         length = get_length_from_data(packet)
         function_id = get_function_id_from_data(packet)
-        payload = packet[8:]
 
         if function_id == IPConnection.CALLBACK_ENUMERATE and \
            IPConnection.CALLBACK_ENUMERATE in self.registered_callbacks:
             uid, connected_uid, position, hardware_version, \
                 firmware_version, device_identifier, enumeration_type = \
-                unpack_payload(payload, '8s 8s c 3B 3B H B')
+                get_payload_codec('8s 8s c 3B 3B H B').unpack(packet, 8)
 
             cb = self.registered_callbacks[IPConnection.CALLBACK_ENUMERATE]
             cb(uid, connected_uid, position, hardware_version,
@@ -1008,7 +1435,7 @@ class IPConnection(object):
         if -function_id in device.high_level_callbacks:
             hlcb = device.high_level_callbacks[-function_id] # [roles, options, data]
             form = device.callback_formats[function_id] # FIXME: currently assuming that form is longer than 1
-            llvalues = unpack_payload(payload, form)
+            llvalues = get_payload_codec(form).unpack(packet, 8)
             has_data = False
             data = None
 
@@ -1062,29 +1489,64 @@ class IPConnection(object):
             cb = device.registered_callbacks[function_id]
             form = device.callback_formats[function_id]
 
-            if len(form) == 0:
+            codec = get_payload_codec(form)
+
+            if len(codec.fields) == 0:
                 cb()
-            elif len(form.split(' ')) == 1:
-                cb(unpack_payload(payload, form))
+            elif len(codec.fields) == 1:
+                cb(codec.unpack(packet, 8))
             else:
-                cb(*unpack_payload(payload, form))
+                cb(*codec.unpack(packet, 8))
 
     def callback_loop(self, callback):
         while True:
             kind, data = callback.queue.get()
 
-            # FIXME: cannot hold callback lock here because this can
-            #        deadlock due to an ordering problem with the socket lock
-            #with callback.lock:
-            if True:
-                if kind == IPConnection.QUEUE_EXIT:
-                    break
-                elif kind == IPConnection.QUEUE_META:
-                    self.dispatch_meta(*data)
-                elif kind == IPConnection.QUEUE_PACKET:
-                    # don't dispatch callbacks when the receive thread isn't running
-                    if callback.packet_dispatch_allowed:
-                        self.dispatch_packet(data)
+            if not self.dispatch_queue_item(callback, callback.queue, kind, data):
+                break
+
+        callback.end_lanes()
+
+    def callback_lane_loop(self, callback, lane_queue):
+        while True:
+            kind, data = lane_queue.get()
+
+            if not self.dispatch_queue_item(callback, lane_queue, kind, data):
+                break
+
+    def dispatch_queue_item(self, callback, callback_queue, kind, data):
+        # returns False if the callback queue was told to exit. callback_queue
+        # is the queue the item was taken from, callback.queue or a lane
+
+        # FIXME: cannot hold callback lock here because this can
+        #        deadlock due to an ordering problem with the socket lock
+        #with callback.lock:
+        if True:
+            if kind == IPConnection.QUEUE_EXIT:
+                if self.stats is not None:
+                    self.stats.callback_queue_closed(callback_queue)
+
+                return False
+            elif kind == IPConnection.QUEUE_META:
+                self.dispatch_meta(*data)
+            elif kind == IPConnection.QUEUE_PACKET:
+                if self.stats is not None:
+                    self.stats.callback_dispatched(callback_queue)
+
+                # don't dispatch callbacks when the receive thread isn't running
+                if callback.packet_dispatch_allowed:
+                    self.dispatch_packet(data)
+            elif kind == IPConnection.QUEUE_COALESCED:
+                if self.stats is not None:
+                    self.stats.callback_dispatched(callback_queue)
+
+                with self.coalesce_lock:
+                    packet = self.coalesced_packets.pop(data)
+
+                if callback.packet_dispatch_allowed:
+                    self.dispatch_packet(packet)
+
+        return True
 
     # NOTE: the disconnect probe thread is not allowed to hold the socket_lock at any
     #       time because it is created and joined while the socket_lock is locked
@@ -1107,6 +1569,12 @@ class IPConnection(object):
                                 break
                             except socket.timeout:
                                 continue
+
+                    if self.trace is not None:
+                        self.trace.sent(request)
+
+                    if self.stats is not None:
+                        self.stats.sent(len(request))
                 except socket.error:
                     self.handle_disconnect_by_peer(IPConnection.DISCONNECT_REASON_ERROR,
                                                    self.socket_id, False)
@@ -1131,33 +1599,40 @@ class IPConnection(object):
                 self.handle_disconnect_by_peer(IPConnection.DISCONNECT_REASON_ERROR, None, True)
                 raise Error(Error.NOT_CONNECTED, 'Not connected')
 
+            if self.trace is not None:
+                self.trace.sent(packet)
+
+            if self.stats is not None:
+                self.stats.sent(len(packet))
+
             self.disconnect_probe_flag = False
 
     def send_request(self, device, function_id, data, form, form_ret):
-        patched_from = []
+        if self.is_pipelining(device):
+            future = self.send_request_pipelined(device, function_id, data, form, form_ret)
 
-        for f in form.split(' '):
-            if '!' in f:
-                if len(f) > 1:
-                    patched_from.append('{0}B'.format(int(math.ceil(int(f.replace('!', '')) / 8.0))))
-                else:
-                    patched_from.append('?')
-            else:
-                patched_from.append(f)
+            if len(form_ret) > 0:
+                return future.result()
+
+            return
 
-        patched_from = '<' + ' '.join(patched_from)
-        length = 8 + struct.calcsize(patched_from)
+        codec = get_payload_codec(form)
         request, response_expected, sequence_number = \
-            self.create_packet_header(device, length, function_id)
+            self.create_packet_header(device, 8 + codec.size, function_id)
 
-        request += pack_payload(data, form)
+        request += codec.pack(data)
 
         if response_expected:
+            stats = self.stats
+
             with device.request_lock:
                 device.expected_response_function_id = function_id
                 device.expected_response_sequence_number = sequence_number
 
                 try:
+                    if stats is not None:
+                        sent_time = stats.clock()
+
                     self.send(request)
 
                     while True:
@@ -1168,33 +1643,228 @@ class IPConnection(object):
                             # ignore old responses that arrived after the timeout expired, but before setting
                             # expected_response_function_id and expected_response_sequence_number back to None
                             break
+
+                    if stats is not None:
+                        stats.request_done(device.uid, function_id, sent_time)
                 except queue.Empty:
+                    if stats is not None:
+                        stats.request_timed_out(device.uid, function_id)
+
                     msg = 'Did not receive response for function {0} in time'.format(function_id)
                     raise Error(Error.TIMEOUT, msg)
                 finally:
                     device.expected_response_function_id = None
                     device.expected_response_sequence_number = None
 
-            error_code = get_error_code_from_data(response)
-
-            if error_code == 0:
-                # no error
-                pass
-            elif error_code == 1:
-                msg = 'Got invalid parameter for function {0}'.format(function_id)
-                raise Error(Error.INVALID_PARAMETER, msg)
-            elif error_code == 2:
-                msg = 'Function {0} is not supported'.format(function_id)
-                raise Error(Error.NOT_SUPPORTED, msg)
-            else:
-                msg = 'Function {0} returned an unknown error'.format(function_id)
-                raise Error(Error.UNKNOWN_ERROR_CODE, msg)
+            check_response_error(response, function_id)
 
             if len(form_ret) > 0:
-                return unpack_payload(response[8:], form_ret)
+                return get_payload_codec(form_ret).unpack(response, 8)
         else:
             self.send(request)
 
+    def send_request_pipelined(self, device, function_id, data, form, form_ret, collected=False):
+        # Sends the request without waiting for its response and returns a
+        # RequestFuture. Up to PIPELINE_WINDOW requests per device can be in
+        # flight, if the window is full the oldest request is waited for
+        # first. Errors of requests that nobody waits for are raised by
+        # wait_for_pipeline, never by a later request. With collected=True
+        # the caller takes care of the result of the request itself.
+        #
+        # pipeline_lock is never held while waiting for a response, other
+        # threads using the pipeline of the device are not stalled by it.
+        codec = get_payload_codec(form)
+        payload = codec.pack(data)
+
+        while True:
+            oldest = None
+            other = None
+
+            with device.pipeline_lock:
+                if len(device.pipeline) >= IPConnection.PIPELINE_WINDOW:
+                    oldest = device.pipeline.popleft()
+                else:
+                    request, response_expected, sequence_number = \
+                        self.create_packet_header(device, 8 + codec.size, function_id)
+
+                    request += payload
+                    future = RequestFuture(device, function_id, sequence_number, form_ret, self.timeout)
+                    future.collected = collected
+
+                    if not response_expected:
+                        self.send(request)
+                        future.set_done()
+                        return future
+
+                    key = future.get_key()
+
+                    with device.pending_lock:
+                        other = device.pending_requests.get(key)
+
+                        if other == None:
+                            device.pending_requests[key] = future
+
+                    if other == None:
+                        if self.stats is not None:
+                            future.sent_time = self.stats.clock()
+
+                        try:
+                            self.send(request)
+                        except:
+                            with device.pending_lock:
+                                device.pending_requests.pop(key, None)
+
+                            raise
+
+                        device.pipeline.append(future)
+
+                        return future
+
+            if oldest != None:
+                error = oldest.get_error()
+
+                if not oldest.collected and error != None:
+                    with device.pipeline_lock:
+                        if device.pipeline_error == None:
+                            device.pipeline_error = error
+            else:
+                # the sequence number wrapped around while an older request
+                # with the same function ID is still in flight. wait for it,
+                # then try again with the next sequence number
+                other.wait()
+
+    def send_request_batch(self, device, requests):
+        # Sends a list of (function_id, data, form, form_ret) requests back to
+        # back through the pipeline and returns the list of their results.
+        # The first error is raised after all responses were collected.
+        futures = []
+
+        for function_id, data, form, form_ret in requests:
+            # the window can move past requests of the batch before the loop
+            # below collects them, their errors belong to the batch only
+            futures.append(self.send_request_pipelined(device, function_id, data, form, form_ret, True))
+
+        results = []
+        error = None
+
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Error as e:
+                results.append(None)
+
+                if error == None:
+                    error = e
+
+        if error != None:
+            raise error
+
+        return results
+
+    def send_request_stream(self, device, requests):
+        # Sends the chunk requests of a stream setter like send_request_batch.
+        # Inside a pipeline block of this thread the chunks are part of the
+        # block instead, they are not waited for and their errors are raised
+        # at the end of the block. Either way other pipelined requests of the
+        # device are not waited for.
+        if self.is_pipelining(device):
+            for function_id, data, form, form_ret in requests:
+                self.send_request_pipelined(device, function_id, data, form, form_ret)
+        else:
+            self.send_request_batch(device, requests)
+
+    def wait_for_pipeline(self, device):
+        # waits for all pipelined requests of the device, raises the first error
+        with device.pipeline_lock:
+            error = device.pipeline_error
+            device.pipeline_error = None
+
+        while True:
+            with device.pipeline_lock:
+                if len(device.pipeline) == 0:
+                    break
+
+                future = device.pipeline.popleft()
+
+            if future.collected:
+                continue
+
+            try:
+                future.result()
+            except Error as e:
+                if error == None:
+                    error = e
+
+        # errors of requests that left the window while waiting
+        with device.pipeline_lock:
+            if error == None:
+                error = device.pipeline_error
+
+            device.pipeline_error = None
+
+        if error != None:
+            raise error
+
+    def is_pipelining(self, device):
+        # True if the current thread is inside a pipeline block of the device
+        return device.pipeline_thread is not None and device.pipeline_thread is threading.current_thread()
+
+    @contextlib.contextmanager
+    def pipeline(self, device):
+        # Opt-in pipelining for a sequence of calls, e.g. the drawing calls of
+        # one frame:
+        #
+        #   with ipcon.pipeline(lcd):
+        #       lcd.clear_display()
+        #       lcd.draw_text(0, 0, lcd.FONT_6X8, lcd.COLOR_BLACK, 'Hello')
+        #
+        # Inside the block the setters of the device called by this thread
+        # don't wait for their response, getters still return their result.
+        # All errors of the setters are raised at the end of the block. Calls
+        # from other threads are not pipelined, a nested block joins the
+        # outer one.
+        thread = threading.current_thread()
+
+        with device.pipeline_lock:
+            owner = device.pipeline_thread is None
+
+            if owner:
+                device.pipeline_thread = thread
+
+        if not owner:
+            yield
+            return
+
+        try:
+            yield
+        except:
+            with device.pipeline_lock:
+                device.pipeline_thread = None
+
+            try:
+                self.wait_for_pipeline(device)
+            except Error:
+                pass # the error of the block is more relevant
+
+            raise
+
+        with device.pipeline_lock:
+            device.pipeline_thread = None
+
+        self.wait_for_pipeline(device)
+
+    def fail_pending_requests(self):
+        # pipelined requests in flight will not get a response anymore
+        error = Error(Error.NOT_CONNECTED, 'Not connected')
+
+        for device in list(self.devices.values()):
+            with device.pending_lock:
+                futures = list(device.pending_requests.values())
+                device.pending_requests.clear()
+
+            for future in futures:
+                future.set_error(error)
+
     def get_next_sequence_number(self):
         with self.sequence_number_lock:
             sequence_number = self.next_sequence_number + 1
@@ -1204,12 +1874,24 @@ class IPConnection(object):
     def handle_response(self, packet):
         self.disconnect_probe_flag = False
 
+        if self.trace is not None:
+            self.trace.received(packet)
+
+        if self.stats is not None:
+            self.stats.received(len(packet))
+
         function_id = get_function_id_from_data(packet)
         sequence_number = get_sequence_number_from_data(packet)
 
         if sequence_number == 0 and function_id == IPConnection.CALLBACK_ENUMERATE:
             if IPConnection.CALLBACK_ENUMERATE in self.registered_callbacks:
-                self.callback.queue.put((IPConnection.QUEUE_PACKET, packet))
+                callback_queue = self.callback.queue
+
+                # record before the put, the item can be dispatched right away
+                if self.stats is not None:
+                    self.stats.callback_queued(callback_queue)
+
+                callback_queue.put((IPConnection.QUEUE_PACKET, packet))
             return
 
         uid = get_uid_from_data(packet)
@@ -1223,9 +1905,49 @@ class IPConnection(object):
         if sequence_number == 0:
             if function_id in device.registered_callbacks or \
                -function_id in device.high_level_callbacks:
-                self.callback.queue.put((IPConnection.QUEUE_PACKET, packet))
+                key_length = device.coalesced_callbacks.get(function_id)
+
+                if key_length is None:
+                    item = (IPConnection.QUEUE_PACKET, packet)
+                else:
+                    key = (uid, function_id, packet[8:8 + key_length])
+
+                    with self.coalesce_lock:
+                        queued = key in self.coalesced_packets
+                        self.coalesced_packets[key] = packet
+
+                        if queued:
+                            # the queued item will dispatch this packet instead
+                            self.coalesce_count += 1
+                            return
+
+                    item = (IPConnection.QUEUE_COALESCED, key)
+
+                lane = device.callback_lanes.get(function_id)
+
+                if lane is None:
+                    callback_queue = self.callback.queue
+                else:
+                    callback_queue = self.callback.get_lane(self, lane)
+
+                # record before the put, the item can be dispatched right away
+                if self.stats is not None:
+                    self.stats.callback_queued(callback_queue)
+
+                callback_queue.put(item)
             return
 
+        if len(device.pending_requests) > 0:
+            with device.pending_lock:
+                future = device.pending_requests.pop((function_id, sequence_number), None)
+
+            if future != None:
+                if self.stats is not None and future.sent_time is not None:
+                    self.stats.request_done(uid, function_id, future.sent_time)
+
+                future.set_response(packet)
+                return
+
         if device.expected_response_function_id == function_id and \
            device.expected_response_sequence_number == sequence_number:
             device.response_queue.put(packet)
@@ -1240,6 +1962,8 @@ class IPConnection(object):
 
         if disconnect_immediately:
             self.disconnect_unlocked()
+        else:
+            self.fail_pending_requests()
 
         self.callback.queue.put((IPConnection.QUEUE_META,
                                  (IPConnection.CALLBACK_DISCONNECTED,
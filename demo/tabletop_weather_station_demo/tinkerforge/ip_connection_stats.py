@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2026 Tinkerforge GmbH
+#
+# Redistribution and use in source and binary forms of this file,
+# with or without modification, are permitted. See the Creative
+# Commons Zero (CC0 1.0) License for more details.
+
+# Request and callback statistics of an IPConnection:
+#
+#   stats = ConnectionStats()
+#   ipcon.set_stats(stats)
+#   ...
+#   for line in stats.format_summary():
+#       print(line)
+#
+# Recorded are the round trip time of every request that expects a response
+# (from sending the request until its response arrived, per device and
+# function), timeouts, bytes sent and received, the number of callbacks
+# waiting in the callback queues and the time a callback waited there before
+# it was dispatched (dispatch lag).
+#
+# The statistics are meant to stay enabled: latencies are counted into
+# histograms with fixed buckets and the per-function slots are created once
+# per device, so recording a request allocates nothing but its timestamps.
+
+import bisect
+import collections
+import threading
+import time
+
+monotonic = getattr(time, 'monotonic', time.time)
+
+# upper bounds of the histogram buckets in seconds, values above the last
+# bound are counted in an additional overflow bucket
+LATENCY_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.5)
+
+class Histogram(object):
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def get_mean(self):
+        if self.count == 0:
+            return None
+
+        return self.sum / self.count
+
+    def get_percentile(self, p):
+        # returns the upper bound of the bucket that contains the p-th
+        # percentile (0.0 to 1.0), inf for the overflow bucket
+        if self.count == 0:
+            return None
+
+        rank = p * self.count
+        total = 0
+
+        for i, count in enumerate(self.counts):
+            total += count
+
+            if total >= rank and count > 0:
+                break
+
+        if i < len(self.bounds):
+            return self.bounds[i]
+
+        return float('inf')
+
+    def copy(self):
+        other = Histogram(self.bounds)
+        other.counts = list(self.counts)
+        other.count = self.count
+        other.sum = self.sum
+
+        return other
+
+class RequestStats(object):
+    def __init__(self):
+        self.latency = Histogram()
+        self.timeout_count = 0
+
+class ConnectionStats(object):
+    clock = staticmethod(monotonic)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.start_time = monotonic()
+        self.requests = {} # uid -> list of 256 RequestStats or None, indexed by function ID
+        self.request_count = 0
+        self.timeout_count = 0
+        self.packets_sent = 0
+        self.bytes_sent = 0
+        self.packets_received = 0
+        self.bytes_received = 0
+        self.callback_queues = {} # callback queue -> deque of enqueue times
+        self.callback_queue_depth = 0
+        self.callback_queue_depth_max = 0
+        self.callback_lag = Histogram()
+
+    def get_request_stats(self, uid, function_id):
+        # NOTE: assumes that lock is locked
+        functions = self.requests.get(uid)
+
+        if functions is None:
+            functions = [None] * 256
+            self.requests[uid] = functions
+
+        request_stats = functions[function_id]
+
+        if request_stats is None:
+            request_stats = RequestStats()
+            functions[function_id] = request_stats
+
+        return request_stats
+
+    def request_done(self, uid, function_id, sent_time):
+        latency = monotonic() - sent_time
+
+        with self.lock:
+            self.get_request_stats(uid, function_id).latency.observe(latency)
+            self.request_count += 1
+
+    def request_timed_out(self, uid, function_id):
+        with self.lock:
+            self.get_request_stats(uid, function_id).timeout_count += 1
+            self.request_count += 1
+            self.timeout_count += 1
+
+    def sent(self, length):
+        with self.lock:
+            self.packets_sent += 1
+            self.bytes_sent += length
+
+    def received(self, length):
+        with self.lock:
+            self.packets_received += 1
+            self.bytes_received += length
+
+    def callback_queued(self, callback_queue):
+        now = monotonic()
+
+        with self.lock:
+            times = self.callback_queues.get(callback_queue)
+
+            if times is None:
+                times = collections.deque()
+                self.callback_queues[callback_queue] = times
+
+            times.append(now)
+            self.callback_queue_depth += 1
+
+            if self.callback_queue_depth > self.callback_queue_depth_max:
+                self.callback_queue_depth_max = self.callback_queue_depth
+
+    def callback_dispatched(self, callback_queue):
+        now = monotonic()
+
+        with self.lock:
+            times = self.callback_queues.get(callback_queue)
+
+            if not times:
+                return # queued before the statistics were enabled
+
+            self.callback_lag.observe(now - times.popleft())
+            self.callback_queue_depth -= 1
+
+    def callback_queue_closed(self, callback_queue):
+        with self.lock:
+            times = self.callback_queues.pop(callback_queue, None)
+
+            if times is not None:
+                self.callback_queue_depth -= len(times)
+
+    def get_summary(self):
+        """
+        Returns a consistent copy of all statistics as dict. Request
+        statistics are keyed by (uid, function_id) and contain a copy of the
+        latency histogram and the number of timeouts.
+        """
+
+        with self.lock:
+            requests = {}
+
+            for uid, functions in self.requests.items():
+                for function_id, request_stats in enumerate(functions):
+                    if request_stats is not None:
+                        requests[(uid, function_id)] = {'latency': request_stats.latency.copy(),
+                                                        'timeout_count': request_stats.timeout_count}
+
+            return {'uptime': monotonic() - self.start_time,
+                    'requests': requests,
+                    'request_count': self.request_count,
+                    'timeout_count': self.timeout_count,
+                    'packets_sent': self.packets_sent,
+                    'bytes_sent': self.bytes_sent,
+                    'packets_received': self.packets_received,
+                    'bytes_received': self.bytes_received,
+                    'callback_queue_depth': self.callback_queue_depth,
+                    'callback_queue_depth_max': self.callback_queue_depth_max,
+                    'callback_lag': self.callback_lag.copy()}
+
+    def format_summary(self, uid_names=None):
+        # returns the summary as list of lines, uid_names optionally maps
+        # numeric UIDs to names used instead of the UIDs
+        summary = self.get_summary()
+        lines = []
+
+        def format_ms(value):
+            if value is None:
+                return '-'
+
+            return '{0:.1f}ms'.format(value * 1000)
+
+        lines.append('{0} requests, {1} timeouts, {2} bytes sent, {3} bytes received in {4:.0f}s'
+                     .format(summary['request_count'], summary['timeout_count'],
+                             summary['bytes_sent'], summary['bytes_received'], summary['uptime']))
+
+        callback_lag = summary['callback_lag']
+        lines.append('callbacks: {0} dispatched, queue depth {1} (max {2}), lag mean {3} p99 <= {4}'
+                     .format(callback_lag.count, summary['callback_queue_depth'],
+                             summary['callback_queue_depth_max'], format_ms(callback_lag.get_mean()),
+                             format_ms(callback_lag.get_percentile(0.99))))
+
+        for (uid, function_id), request in sorted(summary['requests'].items()):
+            latency = request['latency']
+
+            if uid_names is not None and uid in uid_names:
+                name = uid_names[uid]
+            else:
+                name = str(uid)
+
+            lines.append('{0} function {1}: {2} requests, {3} timeouts, mean {4}, p50 <= {5}, p99 <= {6}'
+                         .format(name, function_id, latency.count, request['timeout_count'],
+                                 format_ms(latency.get_mean()), format_ms(latency.get_percentile(0.5)),
+                                 format_ms(latency.get_percentile(0.99))))
+
+        return lines
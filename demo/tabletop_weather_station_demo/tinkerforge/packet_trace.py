@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2026 Tinkerforge GmbH
+#
+# Redistribution and use in source and binary forms of this file,
+# with or without modification, are permitted. See the Creative
+# Commons Zero (CC0 1.0) License for more details.
+
+# Records the packets of an IPConnection into a trace file and plays a trace
+# file back without any hardware attached:
+#
+#   ipcon.set_trace(TraceWriter('station.trace'))
+#
+#   replay = ReplayServer('station.trace', speed=10.0)
+#   host, port = replay.start()
+#   ipcon.connect(host, port)
+#
+# A trace file starts with TRACE_MAGIC followed by one record per packet: the
+# time since the start of the trace in microseconds (monotonic clock) as
+# unsigned 64 bit integer, the direction as one byte and the packet itself.
+# The packet length is part of the packet header. All values little endian.
+#
+# The ReplayServer is a stand-in for brickd. The recorded callbacks are sent
+# with their recorded timing (divided by speed, speed 0 sends them as fast as
+# possible). Requests are answered with the next recorded response of the
+# same device and function, enumerate requests with the recorded enumerate
+# callbacks. Because the replay goes through a real socket, the complete
+# receive and callback path of the IPConnection is part of a benchmark.
+
+import collections
+import socket
+import struct
+import threading
+import time
+
+try:
+    from .ip_connection import IPConnection, get_uid_from_data, get_function_id_from_data, \
+        get_sequence_number_from_data
+except ValueError:
+    from ip_connection import IPConnection, get_uid_from_data, get_function_id_from_data, \
+        get_sequence_number_from_data
+
+TRACE_MAGIC = b'TFPTRACE\x01'
+TRACE_RECORD = struct.Struct('<QB')
+
+DIRECTION_SENT = 0
+DIRECTION_RECEIVED = 1
+
+monotonic = getattr(time, 'monotonic', time.time)
+
+class TraceWriter(object):
+    def __init__(self, path):
+        self.file = open(path, 'wb')
+        self.file.write(TRACE_MAGIC)
+        self.start = monotonic()
+        self.lock = threading.Lock()
+
+    def write(self, direction, packet):
+        timestamp = int((monotonic() - self.start) * 1000000)
+
+        with self.lock:
+            if self.file != None:
+                self.file.write(TRACE_RECORD.pack(timestamp, direction) + packet)
+
+    def sent(self, packet):
+        self.write(DIRECTION_SENT, packet)
+
+    def received(self, packet):
+        self.write(DIRECTION_RECEIVED, packet)
+
+    def close(self):
+        with self.lock:
+            if self.file != None:
+                self.file.close()
+                self.file = None
+
+def read_trace(path):
+    # returns a list of (timestamp in microseconds, direction, packet)
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    if not data.startswith(TRACE_MAGIC):
+        raise ValueError('{0} is not a packet trace'.format(path))
+
+    records = []
+    offset = len(TRACE_MAGIC)
+
+    while offset + TRACE_RECORD.size + 8 <= len(data):
+        timestamp, direction = TRACE_RECORD.unpack_from(data, offset)
+        offset += TRACE_RECORD.size
+        length = data[offset + 4]
+
+        if offset + length > len(data):
+            break # truncated by a crash while recording
+
+        records.append((timestamp, direction, data[offset:offset + length]))
+        offset += length
+
+    return records
+
+def set_sequence_number(packet, sequence_number):
+    options = packet[6] & 0x0F
+
+    return packet[:6] + struct.pack('<B', (sequence_number << 4) | options) + packet[7:]
+
+class ReplayServer(object):
+    def __init__(self, path, speed=1.0):
+        self.speed = speed
+        self.enumerations = [] # enumerate callbacks, first one per device
+        self.responses = {} # (uid, function_id) -> deque of responses
+        self.callbacks = [] # (time in seconds, packet)
+        self.server = None
+        self.thread = None
+        self.done = threading.Event() # all callbacks of a connection were sent
+
+        self.load(read_trace(path))
+
+    def load(self, records):
+        start = None
+        enumerated_uids = set()
+
+        for timestamp, direction, packet in records:
+            if start == None:
+                start = timestamp
+
+            if direction != DIRECTION_RECEIVED:
+                continue
+
+            uid = get_uid_from_data(packet)
+            function_id = get_function_id_from_data(packet)
+
+            if get_sequence_number_from_data(packet) != 0:
+                self.responses.setdefault((uid, function_id), collections.deque()).append(packet)
+            elif function_id == IPConnection.CALLBACK_ENUMERATE:
+                if uid not in enumerated_uids:
+                    enumerated_uids.add(uid)
+                    self.enumerations.append(packet)
+            else:
+                self.callbacks.append(((timestamp - start) / 1000000.0, packet))
+
+    def start(self, host='127.0.0.1', port=0):
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind((host, port))
+        self.server.listen(1)
+
+        self.thread = threading.Thread(name='Replay-Server', target=self.accept_loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+        return self.server.getsockname()
+
+    def stop(self):
+        if self.server != None:
+            self.server.close()
+            self.server = None
+
+    def accept_loop(self):
+        while True:
+            try:
+                connection, _ = self.server.accept()
+            except (socket.error, AttributeError):
+                break
+
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            send_lock = threading.Lock()
+            stop = threading.Event()
+            thread = threading.Thread(name='Replay-Callbacks', target=self.callback_loop,
+                                      args=(connection, send_lock, stop))
+            thread.daemon = True
+            thread.start()
+
+            # every connection replays the responses from the start, like
+            # the callbacks
+            responses = dict((key, collections.deque(value)) for key, value in self.responses.items())
+
+            self.request_loop(connection, send_lock, responses)
+
+            stop.set()
+            thread.join()
+            connection.close()
+
+    def send(self, connection, send_lock, packet):
+        with send_lock:
+            connection.sendall(packet)
+
+    def callback_loop(self, connection, send_lock, stop):
+        start = monotonic()
+
+        try:
+            for offset, packet in self.callbacks:
+                if self.speed > 0:
+                    delay = start + offset / self.speed - monotonic()
+
+                    if delay > 0 and stop.wait(delay):
+                        return
+
+                if stop.is_set():
+                    return
+
+                self.send(connection, send_lock, packet)
+        except socket.error:
+            return
+
+        self.done.set()
+
+    def request_loop(self, connection, send_lock, responses):
+        pending = b''
+
+        while True:
+            try:
+                data = connection.recv(8192)
+            except socket.error:
+                break
+
+            if len(data) == 0:
+                break
+
+            pending += data
+
+            while len(pending) >= 8 and len(pending) >= pending[4]:
+                length = pending[4]
+                request = pending[:length]
+                pending = pending[length:]
+
+                try:
+                    self.handle_request(connection, send_lock, responses, request)
+                except socket.error:
+                    return
+
+    def handle_request(self, connection, send_lock, responses, request):
+        uid = get_uid_from_data(request)
+        function_id = get_function_id_from_data(request)
+
+        if function_id == IPConnection.FUNCTION_ENUMERATE:
+            for packet in self.enumerations:
+                self.send(connection, send_lock, packet)
+
+            return
+
+        if (request[6] & 0x08) == 0:
+            return # no response expected
+
+        queue = responses.get((uid, function_id))
+
+        if queue:
+            if len(queue) > 1:
+                response = queue.popleft()
+            else:
+                response = queue[0] # keep answering with the last one
+        else:
+            # not recorded, answer with "function not supported" instead of
+            # letting the request time out
+            response = request[:4] + struct.pack('<B', 8) + request[5:7] + struct.pack('<B', 2 << 6)
+
+        self.send(connection, send_lock, set_sequence_number(response, get_sequence_number_from_data(request)))
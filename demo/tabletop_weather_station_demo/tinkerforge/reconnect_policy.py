@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2026 Tinkerforge GmbH
+#
+# Redistribution and use in source and binary forms of this file,
+# with or without modification, are permitted. See the Creative
+# Commons Zero (CC0 1.0) License for more details.
+
+# Exponential backoff with jitter for connection attempts:
+#
+#   policy = ReconnectPolicy(initial_interval=0.5, max_interval=30.0)
+#   ipcon.set_reconnect_policy(policy) # used by the auto-reconnect
+#
+#   while True:
+#       try:
+#           ipcon.connect(host, port)
+#           policy.reset()
+#           break
+#       except Error as e:
+#           policy.report(log.error, 'Connection Error: ' + str(e.description))
+#           time.sleep(policy.next_delay())
+#
+# The interval between attempts starts at initial_interval and is multiplied
+# by multiplier after every failed attempt, up to max_interval. Every delay is
+# randomly shortened by up to the jitter fraction of the interval, so that
+# many clients that lost the same brickd don't retry in lockstep.
+#
+# reset() marks a successful attempt. The backoff only starts over if the
+# next failure comes at least stable_interval seconds later, a connection
+# that breaks right after it was established keeps backing off.
+#
+# report() rate-limits the log messages of the failed attempts: the first
+# failure after a success is logged, then at most one message per
+# log_interval that tells how many were left out in between.
+#
+# One policy can be shared by several threads, for example by the connect
+# loop of an application and the auto-reconnect of its IPConnection.
+
+import random
+import threading
+import time
+
+monotonic = getattr(time, 'monotonic', time.time)
+
+class ReconnectPolicy(object):
+    clock = staticmethod(monotonic)
+
+    def __init__(self, initial_interval=0.1, max_interval=30.0, multiplier=2.0,
+                 jitter=0.5, stable_interval=10.0, log_interval=60.0):
+        self.initial_interval = float(initial_interval)
+        self.max_interval = float(max_interval)
+        self.multiplier = float(multiplier)
+        self.jitter = float(jitter)
+        self.stable_interval = float(stable_interval)
+        self.log_interval = float(log_interval)
+        self.lock = threading.Lock()
+        self.random = random.Random()
+        self.attempt = 0 # failed attempts since the last stable success
+        self.success_time = None
+        self.last_log_time = None
+        self.suppressed_count = 0
+
+    def check_success(self):
+        # NOTE: assumes that lock is locked
+        if self.success_time is None:
+            return
+
+        if self.clock() - self.success_time >= self.stable_interval:
+            self.attempt = 0
+            self.last_log_time = None
+            self.suppressed_count = 0
+
+        self.success_time = None
+
+    def reset(self):
+        with self.lock:
+            self.success_time = self.clock()
+
+    def get_interval(self):
+        # Returns the interval before the next attempt without jitter
+        with self.lock:
+            self.check_success()
+
+            return min(self.max_interval, self.initial_interval * self.multiplier ** self.attempt)
+
+    def next_delay(self):
+        """
+        Records a failed attempt and returns the time in seconds to wait
+        before the next one.
+        """
+
+        with self.lock:
+            self.check_success()
+
+            interval = min(self.max_interval, self.initial_interval * self.multiplier ** self.attempt)
+
+            if interval < self.max_interval:
+                self.attempt += 1
+
+            return interval * (1.0 - self.jitter * self.random.random())
+
+    def report(self, log_function, message):
+        """
+        Calls *log_function* with *message*, unless a message of a failed
+        attempt was logged less than log_interval seconds ago.
+        """
+
+        with self.lock:
+            self.check_success()
+
+            now = self.clock()
+
+            if self.last_log_time is not None and now - self.last_log_time < self.log_interval:
+                self.suppressed_count += 1
+                return
+
+            suppressed_count = self.suppressed_count
+            self.suppressed_count = 0
+            self.last_log_time = now
+
+        if suppressed_count > 0:
+            message += ' ({0} similar messages suppressed)'.format(suppressed_count)
+
+        log_function(message)
@@ -28,12 +28,232 @@ import threading
 import time
 import logging as log
 import sys
+import contextlib
+
+from urllib.request import pathname2url
 
 try:
     import Queue as queue
 except:
     import queue
 
+# Version of the tables, stored as user_version in the database, see
+# ValueDB.migrate
+SCHEMA_VERSION = 1
+
+RAW_TABLES = ['air_quality', 'station', 'sensor']
+ROLLUP_TABLES = [table + suffix for table in RAW_TABLES for suffix in ['_minute', '_hour', '_day']]
+
+def get_table_for_resolution(table, time_resolution):
+    # Returns the table to read for the given resolution, the column to
+    # divide the summed up values by and the time span of one row
+    if time_resolution < 60:
+        return table, '1', 1
+    elif time_resolution < 60*60:
+        return table + '_minute', 'count', 60
+    elif time_resolution < 60*60*24:
+        return table + '_hour', 'count', 60*60
+    else:
+        return table + '_day', 'count', 60*60*24
+
+def get_where(identifier, source):
+    # Returns the WHERE clause and its arguments for the given station or
+    # sensor identifier and source id, None matches all
+    conditions = []
+    args = []
+
+    if identifier != None:
+        conditions.append('identifier = ?')
+        args.append(identifier)
+
+    if source != None:
+        conditions.append('source = ?')
+        args.append(source)
+
+    if len(conditions) == 0:
+        return '', args
+
+    return ' WHERE ' + ' AND '.join(conditions), args
+
+def query_data(dbc, num, time_resolution, field, table, identifier = None, is_rain = False, source = None):
+    # Returns the last num values averaged over time_resolution seconds, oldest first.
+    # Values are taken by row count, not by time, so source has to be given
+    # if the table has rows of more than one source (see query_sources)
+    table, count_str, table_resolution = get_table_for_resolution(table, time_resolution)
+    limit = num*(time_resolution//table_resolution)
+    where, args = get_where(identifier, source)
+
+    dbc.execute('SELECT {0}, {1} FROM {2}{3} ORDER BY id DESC LIMIT ?'.format(field, count_str, table, where), args + [limit])
+
+    values = dbc.fetchall()
+
+    data_per_num = limit//num
+    averaged_values = []
+
+    try:
+        for i in range(num):
+            v = 0.0
+            for j in range(data_per_num):
+                index = i*data_per_num + j
+                if is_rain:
+                    v = max(v, values[index][0])
+                else:
+                    v += float(values[index][0]) / values[index][1]
+
+            if is_rain:
+                averaged_values.append(v)
+            else:
+                averaged_values.append(v/data_per_num)
+    except:
+        if j != 0:
+            if is_rain:
+                averaged_values.append(v)
+            else:
+                averaged_values.append(v/j)
+
+    if len(averaged_values) == 0:
+        averaged_values.append(0)
+
+    ret = [averaged_values[-1]]*(num-len(averaged_values))
+    for value in reversed(averaged_values):
+        ret.append(value)
+
+    return ret
+
+def query_data_range(dbc, start, end, time_resolution, field, table, identifier = None, is_rain = False, source = None):
+    # Returns a dict of bucket start time -> value for all buckets of
+    # time_resolution seconds between start and end that contain data. The
+    # value is the average of the bucket, or the maximum for rain as rain is
+    # a counter. start has to be aligned to time_resolution.
+    table, count_str, _ = get_table_for_resolution(table, time_resolution)
+
+    if is_rain:
+        value_str = 'MAX({0}), 1'.format(field)
+    else:
+        value_str = 'SUM({0}), SUM({1})'.format(field, count_str)
+
+    query = 'SELECT (time - ?) / ? AS bucket, {0} FROM {1} WHERE time >= ? AND time < ?'.format(value_str, table)
+    args = [start, time_resolution, start, end]
+
+    if identifier != None:
+        query += ' AND identifier = ?'
+        args.append(identifier)
+
+    if source != None:
+        query += ' AND source = ?'
+        args.append(source)
+
+    dbc.execute(query + ' GROUP BY bucket', args)
+
+    values = {}
+
+    for bucket, value, count in dbc.fetchall():
+        if value != None and count:
+            values[start + bucket*time_resolution] = float(value) / count
+
+    return values
+
+def query_sources(dbc, table, identifier = None):
+    # Returns the ids of the sources that have rows in table. Every row is
+    # also added to the day rollup, that is much smaller than the raw table
+    where, args = get_where(identifier, None)
+
+    dbc.execute('SELECT DISTINCT source FROM {0}_day{1} ORDER BY source'.format(table, where), args)
+
+    return [row[0] for row in dbc.fetchall()]
+
+def query_data_rain_period(dbc, identifier, rain_period):
+    # Returns the rain of the last rain_period seconds or None if unknown
+    try:
+        dbc.execute('SELECT rain FROM station WHERE identifier = ? ORDER BY id DESC LIMIT 1', (identifier, ))
+        period_end_rain = dbc.fetchone()[0]
+
+        t = time.time() - rain_period
+        dbc.execute('SELECT rain, time FROM station WHERE identifier = ? AND time > ? ORDER BY time ASC LIMIT 1', (identifier, t))
+        period_start_rain = dbc.fetchone()[0]
+
+        return max(0, period_end_rain - period_start_rain)
+    except:
+        return None
+
+def query_setting(dbc, key):
+    try:
+        dbc.execute('SELECT value FROM settings WHERE key = ?', (key,))
+        return dbc.fetchone()[0]
+    except:
+        return None
+
+def is_packaged(packaged):
+    if packaged:
+        return True
+    try:
+        # PyInstaller stores data files in a tmp folder refered to as _MEIPASS
+        #pylint: disable=protected-access
+        base_path = sys._MEIPASS
+        return True
+    except:
+        pass
+
+    return False
+
+def get_db_path(gui, packaged):
+    db_name = '.tabletop_weather_station_demo.db'
+
+    if gui or is_packaged(packaged):
+        return os.path.join(os.path.expanduser('~'), db_name)
+    else:
+        return os.path.join(os.path.dirname(os.path.abspath(__file__)), db_name)
+
+def get_schema_version(db_path):
+    # Returns the user_version of the database, None if it doesn't exist yet
+    # or can't be read. ValueDB.migrate sets it in the same transaction that
+    # creates the tables, so all tables exist once it is SCHEMA_VERSION
+    if not os.path.exists(db_path):
+        return None
+
+    try:
+        db = sqlite3.connect('file:{0}?mode=ro'.format(pathname2url(db_path)), uri=True)
+
+        try:
+            return db.execute('PRAGMA user_version').fetchone()[0]
+        finally:
+            db.close()
+    except sqlite3.Error:
+        return None
+
+class ReadOnlyConnectionPool:
+    # Read-only connections to the database for readers that should neither
+    # wait for the database thread nor block it. The database is in WAL mode,
+    # so readers see the last commit while the database thread keeps writing.
+    def __init__(self, db_path, size=4):
+        self.db_path = db_path
+        self.size = size
+        self.idle = queue.LifoQueue()
+        self.created = 0
+        self.lock = threading.Lock()
+
+    def create_connection(self):
+        uri = 'file:{0}?mode=ro'.format(pathname2url(self.db_path))
+        return sqlite3.connect(uri, uri=True, check_same_thread=False)
+
+    @contextlib.contextmanager
+    def cursor(self):
+        db = None
+
+        with self.lock:
+            if self.idle.empty() and self.created < self.size:
+                self.created += 1
+                db = self.create_connection()
+
+        if db == None:
+            db = self.idle.get()
+
+        try:
+            yield db.cursor()
+        finally:
+            db.rollback() # end the read transaction, so the WAL can be checkpointed
+            self.idle.put(db)
+
 class ValueDB:
     air_quality_first_data = None
 
@@ -42,32 +262,20 @@ class ValueDB:
         self.func_queue.put(None)
         self.thread.join(2)
 
-    def is_packaged(self):
-        if self.packaged:
-            return True
-        try:
-            # PyInstaller stores data files in a tmp folder refered to as _MEIPASS
-            #pylint: disable=protected-access
-            base_path = sys._MEIPASS
-            return True
-        except:
-            pass
-
-        return False
-
     def loop(self):
-        db_name = '.tabletop_weather_station_demo.db'
+        db_path = self.db_path
 
-        if self.gui or self.is_packaged():
-            db_path = os.path.join(os.path.expanduser('~'), db_name)
-        else:
-            db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), db_name)
+        if db_path == None:
+            db_path = get_db_path(self.gui, self.packaged)
 
         log.info('Using database: {0}'.format(db_path))
 
+        self.db_path = db_path
         self.db = sqlite3.connect(db_path)
         self.dbc = self.db.cursor()
-        self.create()
+        # readers of the ReadOnlyConnectionPool don't block commits in WAL mode
+        self.dbc.execute('PRAGMA journal_mode=WAL')
+        self.migrate()
 
         self.init_handshake.release()
 
@@ -88,84 +296,66 @@ class ValueDB:
             except queue.Empty:
                 break
 
+    def commit(self):
+        # Commits the current transaction and keeps track of the time it took
+        start = time.time()
+        self.db.commit()
+        duration = time.time() - start
+
+        self.commit_duration_last = duration
+        self.commit_duration_sum += duration
+        self.commit_count += 1
+
+    def get_commit_statistics(self):
+        # Returns the number of commits, their total and their last duration
+        return self.commit_count, self.commit_duration_sum, self.commit_duration_last
+
+    def get_queue_depth(self):
+        # Returns the number of calls waiting for the database thread
+        return self.func_queue.qsize()
+
     def set_setting(self, key, value):
         if threading.current_thread() != self.thread:
             self.func_queue.put((self.set_setting, (key, value)))
             return
 
         self.dbc.execute('REPLACE INTO settings (key, value) VALUES (?, ?)', (key, value))
-        self.db.commit()
+        self.commit()
 
     def get_setting(self, key):
         if threading.current_thread() != self.thread:
             self.func_queue.put((self.get_setting, (key,)))
             return self.func_queue_ret.get()
 
-        try:
-            self.dbc.execute('SELECT value FROM settings WHERE key = ?', (key,))
-            value = self.dbc.fetchone()[0]
-            self.func_queue_ret.put(value)
-        except:
-            self.func_queue_ret.put(None)
+        self.func_queue_ret.put(query_setting(self.dbc, key))
 
-    def get_data(self, num, time_resolution, field, table, identifier = None, is_rain = False):
+    def get_source_id(self, name):
+        # Returns the id of the source with the given name, a new source gets
+        # the next free id. Rows stored without source have source id 0.
         if threading.current_thread() != self.thread:
-            self.func_queue.put((self.get_data, (num, time_resolution, field, table, identifier, is_rain)))
+            self.func_queue.put((self.get_source_id, (name,)))
             return self.func_queue_ret.get()
 
-        count_str = 'count'
-        if time_resolution < 60:
-            count_str = '1'
-            limit = num*time_resolution
-        elif time_resolution < 60*60:
-            limit = num*(time_resolution//60)
-            table += '_minute'
-        elif time_resolution < 60*60*24:
-            limit = num*(time_resolution//(60*60))
-            table += '_hour'
-        else:
-            limit = num*(time_resolution//(60*60*24))
-            table += '_day'
-
-        if identifier == None:
-            self.dbc.execute('SELECT {0}, {1} FROM {2} ORDER BY id DESC LIMIT ?'.format(field, count_str, table), (limit,))
-        else:
-            self.dbc.execute('SELECT {0}, {1} FROM {2} WHERE identifier = ? ORDER BY id DESC LIMIT ?'.format(field, count_str, table), (identifier, limit))
-
-        values = self.dbc.fetchall()
-
-        data_per_num = limit//num
-        averaged_values = []
+        self.dbc.execute('INSERT OR IGNORE INTO sources (name) VALUES (?)', (name,))
+        self.dbc.execute('SELECT id FROM sources WHERE name = ?', (name,))
+        source_id = self.dbc.fetchone()[0]
+        self.commit()
 
-        try:
-            for i in range(num):
-                v = 0.0
-                for j in range(data_per_num):
-                    index = i*data_per_num + j
-                    if is_rain:
-                        v = max(v, values[index][0])
-                    else:
-                        v += float(values[index][0]) / values[index][1]
+        self.func_queue_ret.put(source_id)
 
-                if is_rain:
-                    averaged_values.append(v)
-                else:
-                    averaged_values.append(v/data_per_num)
-        except:
-            if j != 0:
-                if is_rain:
-                    averaged_values.append(v)
-                else:
-                    averaged_values.append(v/j)
+    def get_data(self, num, time_resolution, field, table, identifier = None, is_rain = False, source = None):
+        if threading.current_thread() != self.thread:
+            self.func_queue.put((self.get_data, (num, time_resolution, field, table, identifier, is_rain, source)))
+            return self.func_queue_ret.get()
 
-        if len(averaged_values) == 0:
-            averaged_values.append(0)
+        self.func_queue_ret.put(query_data(self.dbc, num, time_resolution, field, table, identifier, is_rain, source))
 
-        ret = [averaged_values[-1]]*(num-len(averaged_values))
-        for value in reversed(averaged_values):
-            ret.append(value)
+    def get_data_range(self, start, end, time_resolution, field, table, identifier = None, is_rain = False, source = None):
+        if threading.current_thread() != self.thread:
+            self.func_queue.put((self.get_data_range, (start, end, time_resolution, field, table, identifier, is_rain, source)))
+            return self.func_queue_ret.get()
 
-        self.func_queue_ret.put(ret)
+        self.func_queue_ret.put(query_data_range(self.dbc, start, end, time_resolution, field, table, identifier, is_rain, source))
 
     def get_data_air_quality(self, num, time_resolution, field):
         return self.get_data(num, time_resolution, field, 'air_quality')
@@ -189,28 +379,17 @@ class ValueDB:
             self.func_queue.put((self.get_data_rain_period, (identifier, rain_period)))
             return self.func_queue_ret.get()
 
-        try:
-            self.dbc.execute('SELECT rain FROM station WHERE identifier = ? ORDER BY id DESC LIMIT 1', (identifier, ))
-            period_end_rain = self.dbc.fetchone()[0]
-
-            t = time.time() - rain_period
-            self.dbc.execute('SELECT rain, time FROM station WHERE identifier = ? AND time > ? ORDER BY time ASC LIMIT 1', (identifier, t))
-            period_start_rain = self.dbc.fetchone()[0]
-
-            period_rain = max(0, period_end_rain - period_start_rain)
-            self.func_queue_ret.put(period_rain)
-        except:
-            self.func_queue_ret.put(None)
+        self.func_queue_ret.put(query_data_rain_period(self.dbc, identifier, rain_period))
 
-    def add_data_air_quality(self, iaq_index, iaq_index_accuracy, temperature, humidity, air_pressure):
+    def add_data_air_quality(self, iaq_index, iaq_index_accuracy, temperature, humidity, air_pressure, source = 0):
         if threading.current_thread() != self.thread:
-            self.func_queue.put((self.add_data_air_quality, (iaq_index, iaq_index_accuracy, temperature, humidity, air_pressure)))
+            self.func_queue.put((self.add_data_air_quality, (iaq_index, iaq_index_accuracy, temperature, humidity, air_pressure, source)))
             return
 
         self.dbc.execute("""
-            INSERT INTO air_quality (iaq_index, iaq_index_accuracy, temperature, humidity, air_pressure)
-            VALUES (?, ?, ?, ?, ?)""",
-            (iaq_index, iaq_index_accuracy, temperature, humidity, air_pressure)
+            INSERT INTO air_quality (iaq_index, iaq_index_accuracy, temperature, humidity, air_pressure, source)
+            VALUES (?, ?, ?, ?, ?, ?)""",
+            (iaq_index, iaq_index_accuracy, temperature, humidity, air_pressure, source)
         )
 
         self.dbc.execute("""
@@ -221,14 +400,14 @@ class ValueDB:
                 humidity           = humidity + ?,
                 air_pressure       = air_pressure + ?,
                 count              = count + 1
-            WHERE time = (strftime('%s', 'now') - (strftime('%s', 'now') % 60))""",
-            (iaq_index, iaq_index_accuracy, temperature, humidity, air_pressure)
+            WHERE (time = (strftime('%s', 'now') - (strftime('%s', 'now') % 60))) AND (source = ?)""",
+            (iaq_index, iaq_index_accuracy, temperature, humidity, air_pressure, source)
         )
 
         self.dbc.execute("""
-            INSERT OR IGNORE INTO air_quality_minute (iaq_index, iaq_index_accuracy, temperature, humidity, air_pressure)
-            VALUES (?, ?, ?, ?, ?)""",
-            (iaq_index, iaq_index_accuracy, temperature, humidity, air_pressure)
+            INSERT OR IGNORE INTO air_quality_minute (iaq_index, iaq_index_accuracy, temperature, humidity, air_pressure, source)
+            VALUES (?, ?, ?, ?, ?, ?)""",
+            (iaq_index, iaq_index_accuracy, temperature, humidity, air_pressure, source)
         )
 
         self.dbc.execute("""
@@ -239,14 +418,14 @@ class ValueDB:
                 humidity           = humidity + ?,
                 air_pressure       = air_pressure + ?,
                 count              = count + 1
-            WHERE time = (strftime('%s', 'now') - (strftime('%s', 'now') % 3600))""",
-            (iaq_index, iaq_index_accuracy, temperature, humidity, air_pressure)
+            WHERE (time = (strftime('%s', 'now') - (strftime('%s', 'now') % 3600))) AND (source = ?)""",
+            (iaq_index, iaq_index_accuracy, temperature, humidity, air_pressure, source)
         )
 
         self.dbc.execute("""
-            INSERT OR IGNORE INTO air_quality_hour (iaq_index, iaq_index_accuracy, temperature, humidity, air_pressure)
-            VALUES (?, ?, ?, ?, ?)""",
-            (iaq_index, iaq_index_accuracy, temperature, humidity, air_pressure)
+            INSERT OR IGNORE INTO air_quality_hour (iaq_index, iaq_index_accuracy, temperature, humidity, air_pressure, source)
+            VALUES (?, ?, ?, ?, ?, ?)""",
+            (iaq_index, iaq_index_accuracy, temperature, humidity, air_pressure, source)
         )
 
         self.dbc.execute("""
@@ -257,27 +436,27 @@ class ValueDB:
                 humidity           = humidity + ?,
                 air_pressure       = air_pressure + ?,
                 count              = count + 1
-            WHERE time = (strftime('%s', 'now') - (strftime('%s', 'now') % 86400))""",
-            (iaq_index, iaq_index_accuracy, temperature, humidity, air_pressure)
+            WHERE (time = (strftime('%s', 'now') - (strftime('%s', 'now') % 86400))) AND (source = ?)""",
+            (iaq_index, iaq_index_accuracy, temperature, humidity, air_pressure, source)
         )
 
         self.dbc.execute("""
-            INSERT OR IGNORE INTO air_quality_day (iaq_index, iaq_index_accuracy, temperature, humidity, air_pressure)
-            VALUES (?, ?, ?, ?, ?)""",
-            (iaq_index, iaq_index_accuracy, temperature, humidity, air_pressure)
+            INSERT OR IGNORE INTO air_quality_day (iaq_index, iaq_index_accuracy, temperature, humidity, air_pressure, source)
+            VALUES (?, ?, ?, ?, ?, ?)""",
+            (iaq_index, iaq_index_accuracy, temperature, humidity, air_pressure, source)
         )
 
-        self.db.commit()
+        self.commit()
 
-    def add_data_station(self, identifier, temperature, humidity, wind_speed, gust_speed, rain, wind_direction, battery_low):
+    def add_data_station(self, identifier, temperature, humidity, wind_speed, gust_speed, rain, wind_direction, battery_low, source = 0):
         if threading.current_thread() != self.thread:
-            self.func_queue.put((self.add_data_station, (identifier, temperature, humidity, wind_speed, gust_speed, rain, wind_direction, battery_low)))
+            self.func_queue.put((self.add_data_station, (identifier, temperature, humidity, wind_speed, gust_speed, rain, wind_direction, battery_low, source)))
             return
 
         self.dbc.execute("""
-            INSERT INTO station (identifier, temperature, humidity, wind_speed, gust_speed, rain, wind_direction, battery_low)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-            (identifier, temperature, humidity, wind_speed, gust_speed, rain, wind_direction, battery_low)
+            INSERT INTO station (identifier, temperature, humidity, wind_speed, gust_speed, rain, wind_direction, battery_low, source)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (identifier, temperature, humidity, wind_speed, gust_speed, rain, wind_direction, battery_low, source)
         )
 
         self.dbc.execute("""
@@ -288,14 +467,14 @@ class ValueDB:
                 gust_speed  = MAX(gust_speed, ?),
                 rain        = ?,
                 count       = count + 1
-            WHERE (time = (strftime('%s', 'now') - (strftime('%s', 'now') % 60))) AND (identifier = ?)""",
-            (temperature, humidity, wind_speed, gust_speed, rain, identifier)
+            WHERE (time = (strftime('%s', 'now') - (strftime('%s', 'now') % 60))) AND (identifier = ?) AND (source = ?)""",
+            (temperature, humidity, wind_speed, gust_speed, rain, identifier, source)
         )
 
         self.dbc.execute("""
-            INSERT OR IGNORE INTO station_minute (identifier, temperature, humidity, wind_speed, gust_speed, rain)
-            VALUES (?, ?, ?, ?, ?, ?)""",
-            (identifier, temperature, humidity, wind_speed, gust_speed, rain)
+            INSERT OR IGNORE INTO station_minute (identifier, temperature, humidity, wind_speed, gust_speed, rain, source)
+            VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            (identifier, temperature, humidity, wind_speed, gust_speed, rain, source)
         )
 
         self.dbc.execute("""
@@ -306,14 +485,14 @@ class ValueDB:
                 gust_speed  = MAX(gust_speed, ?),
                 rain        = ?,
                 count       = count + 1
-            WHERE (time = (strftime('%s', 'now') - (strftime('%s', 'now') % 3600))) AND (identifier = ?)""",
-            (temperature, humidity, wind_speed, gust_speed, rain, identifier)
+            WHERE (time = (strftime('%s', 'now') - (strftime('%s', 'now') % 3600))) AND (identifier = ?) AND (source = ?)""",
+            (temperature, humidity, wind_speed, gust_speed, rain, identifier, source)
         )
 
         self.dbc.execute("""
-            INSERT OR IGNORE INTO station_hour (identifier, temperature, humidity, wind_speed, gust_speed, rain)
-            VALUES (?, ?, ?, ?, ?, ?)""",
-            (identifier, temperature, humidity, wind_speed, gust_speed, rain)
+            INSERT OR IGNORE INTO station_hour (identifier, temperature, humidity, wind_speed, gust_speed, rain, source)
+            VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            (identifier, temperature, humidity, wind_speed, gust_speed, rain, source)
         )
 
         self.dbc.execute("""
@@ -324,27 +503,27 @@ class ValueDB:
                 gust_speed  = MAX(gust_speed, ?),
                 rain        = ?,
                 count       = count + 1
-            WHERE (time = (strftime('%s', 'now') - (strftime('%s', 'now') % 86400))) AND (identifier = ?)""",
-            (temperature, humidity, wind_speed, gust_speed, rain, identifier)
+            WHERE (time = (strftime('%s', 'now') - (strftime('%s', 'now') % 86400))) AND (identifier = ?) AND (source = ?)""",
+            (temperature, humidity, wind_speed, gust_speed, rain, identifier, source)
         )
 
         self.dbc.execute("""
-            INSERT OR IGNORE INTO station_day (identifier, temperature, humidity, wind_speed, gust_speed, rain)
-            VALUES (?, ?, ?, ?, ?, ?)""",
-            (identifier, temperature, humidity, wind_speed, gust_speed, rain)
+            INSERT OR IGNORE INTO station_day (identifier, temperature, humidity, wind_speed, gust_speed, rain, source)
+            VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            (identifier, temperature, humidity, wind_speed, gust_speed, rain, source)
         )
 
-        self.db.commit()
+        self.commit()
 
-    def add_data_sensor(self, identifier, temperature, humidity):
+    def add_data_sensor(self, identifier, temperature, humidity, source = 0):
         if threading.current_thread() != self.thread:
-            self.func_queue.put((self.add_data_sensor, (identifier, temperature, humidity)))
+            self.func_queue.put((self.add_data_sensor, (identifier, temperature, humidity, source)))
             return
 
         self.dbc.execute("""
-            INSERT INTO sensor (identifier, temperature, humidity)
-            VALUES (?, ?, ?)""",
-            (identifier, temperature, humidity)
+            INSERT INTO sensor (identifier, temperature, humidity, source)
+            VALUES (?, ?, ?, ?)""",
+            (identifier, temperature, humidity, source)
         )
 
         self.dbc.execute("""
@@ -352,14 +531,14 @@ class ValueDB:
             SET temperature = temperature + ?,
                 humidity    = humidity + ?,
                 count       = count + 1
-            WHERE (time = (strftime('%s', 'now') - (strftime('%s', 'now') % 60))) AND (identifier = ?)""",
-            (temperature, humidity, identifier)
+            WHERE (time = (strftime('%s', 'now') - (strftime('%s', 'now') % 60))) AND (identifier = ?) AND (source = ?)""",
+            (temperature, humidity, identifier, source)
         )
 
         self.dbc.execute("""
-            INSERT OR IGNORE INTO sensor_minute (identifier, temperature, humidity)
-            VALUES (?, ?, ?)""",
-            (identifier, temperature, humidity)
+            INSERT OR IGNORE INTO sensor_minute (identifier, temperature, humidity, source)
+            VALUES (?, ?, ?, ?)""",
+            (identifier, temperature, humidity, source)
         )
 
         self.dbc.execute("""
@@ -367,14 +546,14 @@ class ValueDB:
             SET temperature = temperature + ?,
                 humidity    = humidity + ?,
                 count       = count + 1
-            WHERE (time = (strftime('%s', 'now') - (strftime('%s', 'now') % 3600))) AND (identifier = ?)""",
-            (temperature, humidity, identifier)
+            WHERE (time = (strftime('%s', 'now') - (strftime('%s', 'now') % 3600))) AND (identifier = ?) AND (source = ?)""",
+            (temperature, humidity, identifier, source)
         )
 
         self.dbc.execute("""
-            INSERT OR IGNORE INTO sensor_hour (identifier, temperature, humidity)
-            VALUES (?, ?, ?)""",
-            (identifier, temperature, humidity)
+            INSERT OR IGNORE INTO sensor_hour (identifier, temperature, humidity, source)
+            VALUES (?, ?, ?, ?)""",
+            (identifier, temperature, humidity, source)
         )
 
         self.dbc.execute("""
@@ -382,17 +561,17 @@ class ValueDB:
             SET temperature = temperature + ?,
                 humidity    = humidity + ?,
                 count       = count + 1
-            WHERE (time = (strftime('%s', 'now') - (strftime('%s', 'now') % 86400))) AND (identifier = ?)""",
-            (temperature, humidity, identifier)
+            WHERE (time = (strftime('%s', 'now') - (strftime('%s', 'now') % 86400))) AND (identifier = ?) AND (source = ?)""",
+            (temperature, humidity, identifier, source)
         )
 
         self.dbc.execute("""
-            INSERT OR IGNORE INTO sensor_day (identifier, temperature, humidity)
-            VALUES (?, ?, ?)""",
-            (identifier, temperature, humidity)
+            INSERT OR IGNORE INTO sensor_day (identifier, temperature, humidity, source)
+            VALUES (?, ?, ?, ?)""",
+            (identifier, temperature, humidity, source)
         )
 
-        self.db.commit()
+        self.commit()
 
     def create(self):
         self.dbc.execute("""
@@ -403,46 +582,53 @@ class ValueDB:
                 iaq_index_accuracy integer,
                 temperature integer,
                 humidity integer,
-                air_pressure integer
+                air_pressure integer,
+                source integer NOT NULL DEFAULT 0
             )"""
         )
 
         self.dbc.execute("""
             CREATE TABLE IF NOT EXISTS air_quality_minute (
                 id integer primary key,
-                time timestamp unique default (strftime('%s', 'now') - (strftime('%s', 'now')%60)),
+                time timestamp default (strftime('%s', 'now') - (strftime('%s', 'now')%60)),
                 iaq_index integer,
                 iaq_index_accuracy integer,
                 temperature integer,
                 humidity integer,
                 air_pressure integer,
-                count integer default 1
+                count integer default 1,
+                source integer NOT NULL DEFAULT 0,
+                UNIQUE(time, source)
             )"""
         )
 
         self.dbc.execute("""
             CREATE TABLE IF NOT EXISTS air_quality_hour (
                 id integer primary key,
-                time timestamp unique default (strftime('%s', 'now') - (strftime('%s', 'now')%3600)),
+                time timestamp default (strftime('%s', 'now') - (strftime('%s', 'now')%3600)),
                 iaq_index integer,
                 iaq_index_accuracy integer,
                 temperature integer,
                 humidity integer,
                 air_pressure integer,
-                count integer default 1
+                count integer default 1,
+                source integer NOT NULL DEFAULT 0,
+                UNIQUE(time, source)
             )"""
         )
 
         self.dbc.execute("""
             CREATE TABLE IF NOT EXISTS air_quality_day (
                 id integer primary key,
-                time timestamp unique default (strftime('%s', 'now') - (strftime('%s', 'now')%86400)),
+                time timestamp default (strftime('%s', 'now') - (strftime('%s', 'now')%86400)),
                 iaq_index integer,
                 iaq_index_accuracy integer,
                 temperature integer,
                 humidity integer,
                 air_pressure integer,
-                count integer default 1
+                count integer default 1,
+                source integer NOT NULL DEFAULT 0,
+                UNIQUE(time, source)
             )"""
         )
 
@@ -457,7 +643,8 @@ class ValueDB:
                 gust_speed integer,
                 rain integer,
                 wind_direction integer,
-                battery_low integer
+                battery_low integer,
+                source integer NOT NULL DEFAULT 0
             )"""
         )
 
@@ -472,7 +659,8 @@ class ValueDB:
                 gust_speed integer,
                 rain integer,
                 count integer default 1,
-                UNIQUE(time, identifier)
+                source integer NOT NULL DEFAULT 0,
+                UNIQUE(time, identifier, source)
             )"""
         )
 
@@ -487,7 +675,8 @@ class ValueDB:
                 gust_speed integer,
                 rain integer,
                 count integer default 1,
-                UNIQUE(time, identifier)
+                source integer NOT NULL DEFAULT 0,
+                UNIQUE(time, identifier, source)
             )"""
         )
 
@@ -502,7 +691,8 @@ class ValueDB:
                 gust_speed integer,
                 rain integer,
                 count integer default 1,
-                UNIQUE(time, identifier)
+                source integer NOT NULL DEFAULT 0,
+                UNIQUE(time, identifier, source)
             )"""
         )
 
@@ -512,7 +702,8 @@ class ValueDB:
                 time timestamp default (strftime('%s', 'now')),
                 identifier integer,
                 temperature integer,
-                humidity integer
+                humidity integer,
+                source integer NOT NULL DEFAULT 0
             )"""
         )
 
@@ -524,7 +715,8 @@ class ValueDB:
                 temperature integer,
                 humidity integer,
                 count integer default 1,
-                UNIQUE(time, identifier)
+                source integer NOT NULL DEFAULT 0,
+                UNIQUE(time, identifier, source)
             )"""
         )
 
@@ -536,7 +728,8 @@ class ValueDB:
                 temperature integer,
                 humidity integer,
                 count integer default 1,
-                UNIQUE(time, identifier)
+                source integer NOT NULL DEFAULT 0,
+                UNIQUE(time, identifier, source)
             )"""
         )
 
@@ -548,7 +741,8 @@ class ValueDB:
                 temperature integer,
                 humidity integer,
                 count integer default 1,
-                UNIQUE(time, identifier)
+                source integer NOT NULL DEFAULT 0,
+                UNIQUE(time, identifier, source)
             )"""
         )
 
@@ -560,16 +754,117 @@ class ValueDB:
             )"""
         )
 
-        self.db.commit()
+        self.dbc.execute("""
+            CREATE TABLE IF NOT EXISTS sources (
+                id integer primary key,
+                name text NOT NULL UNIQUE
+            )"""
+        )
+
+    def get_columns(self, table):
+        # Returns the column names of table, an empty list if it doesn't exist
+        self.dbc.execute('PRAGMA table_info({0})'.format(table))
+        return [row[1] for row in self.dbc.fetchall()]
+
+    def migrate(self):
+        # Creates the tables and brings the tables of databases written by
+        # older versions up to SCHEMA_VERSION, all in one transaction
+        self.dbc.execute('PRAGMA user_version')
+        version = self.dbc.fetchone()[0]
+        rebuilt_tables = []
+
+        self.dbc.execute('BEGIN')
 
-    def __init__(self, gui, packaged):
+        if version < 1:
+            # Version 1 tags every row with its source. The source is part of
+            # the unique key of the rollup tables, so these are rebuilt.
+            for table in RAW_TABLES:
+                columns = self.get_columns(table)
+
+                if len(columns) > 0 and 'source' not in columns:
+                    self.dbc.execute('ALTER TABLE {0} ADD COLUMN source integer NOT NULL DEFAULT 0'.format(table))
+
+            for table in ROLLUP_TABLES:
+                columns = self.get_columns(table)
+
+                if len(columns) > 0 and 'source' not in columns:
+                    self.dbc.execute('ALTER TABLE {0} RENAME TO {0}_old'.format(table))
+                    rebuilt_tables.append((table, columns))
+
+        self.create()
+
+        for table, columns in rebuilt_tables:
+            log.info('Migrating table {0}'.format(table))
+
+            self.dbc.execute('INSERT INTO {0} ({1}) SELECT {1} FROM {0}_old'.format(table, ', '.join(columns)))
+            self.dbc.execute('DROP TABLE {0}_old'.format(table))
+
+        self.dbc.execute('PRAGMA user_version = {0}'.format(SCHEMA_VERSION))
+        self.commit()
+
+    def __init__(self, gui, packaged, db_path=None):
         self.gui = gui
         self.packaged = packaged
+        self.db_path = db_path
         self.run = True
         self.func_queue = queue.Queue()
         self.func_queue_ret = queue.Queue()
+        self.commit_count = 0
+        self.commit_duration_sum = 0.0
+        self.commit_duration_last = 0.0
         self.init_handshake = threading.Semaphore(value=0)
         self.thread = threading.Thread(target=self.loop)
         self.thread.daemon = True
         self.thread.start()
         self.init_handshake.acquire()
+
+class ValueDBReader:
+    # Stands in for the ValueDB in a process that only reads, see
+    # process_link.py. Queries run on read-only connections of the database
+    # in WAL mode, settings are written by the process that owns the ValueDB.
+    def __init__(self, db_path, set_setting_function):
+        self.db_path = db_path
+        self.set_setting_function = set_setting_function
+        self.pool = ReadOnlyConnectionPool(db_path, 1)
+
+        log.info('Reading database: {0}'.format(db_path))
+
+    def stop(self):
+        pass
+
+    def set_setting(self, key, value):
+        self.set_setting_function(key, value)
+
+    def get_setting(self, key):
+        with self.pool.cursor() as dbc:
+            return query_setting(dbc, key)
+
+    def get_data(self, num, time_resolution, field, table, identifier = None, is_rain = False, source = None):
+        with self.pool.cursor() as dbc:
+            return query_data(dbc, num, time_resolution, field, table, identifier, is_rain, source)
+
+    def get_data_range(self, start, end, time_resolution, field, table, identifier = None, is_rain = False, source = None):
+        with self.pool.cursor() as dbc:
+            return query_data_range(dbc, start, end, time_resolution, field, table, identifier, is_rain, source)
+
+    def get_data_rain_period(self, identifier, rain_period):
+        with self.pool.cursor() as dbc:
+            return query_data_rain_period(dbc, identifier, rain_period)
+
+    def get_queue_depth(self):
+        return 0
+
+    def get_commit_statistics(self):
+        return 0, 0.0, 0.0
+
+    def get_data_air_quality(self, num, time_resolution, field):
+        return self.get_data(num, time_resolution, field, 'air_quality')
+
+    def get_data_station(self, num, time_resolution, field, identifier):
+        return self.get_data(num, time_resolution, field, 'station', identifier)
+
+    def get_data_sensor(self, num, time_resolution, field, identifier):
+        return self.get_data(num, time_resolution, field, 'sensor', identifier)
+
+    def get_data_rain_period_list(self, num, rain_period, identifier):
+        return ValueDB.get_data_rain_period_list(self, num, rain_period, identifier)
@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tabletop Weather Station Demo
+Copyright (C) 2026 Tinkerforge GmbH
+
+test_payload_codec.py: Compares PayloadCodec with the original per-field payload packing
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public
+License along with this program; if not, write to the
+Free Software Foundation, Inc., 59 Temple Place - Suite 330,
+Boston, MA 02111-1307, USA.
+"""
+
+# pack_payload and unpack_payload used to pack every field of a form string
+# with its own struct call. They are kept below unchanged as the reference
+# for PayloadCodec, that packs all fields with one precompiled struct.
+#
+# Usage: python3 -m pytest tests or python3 -m unittest discover tests
+
+import os
+import sys
+import math
+import array
+import struct
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from tabletop_weather_station_demo.tinkerforge.ip_connection import get_payload_codec, pack_payload, unpack_payload
+
+def reference_pack_payload(data, form):
+    packed = b''
+
+    for f, d in zip(form.split(' '), data):
+        if '!' in f:
+            if len(f) > 1 and isinstance(d, (bytes, bytearray)):
+                # already packed bool list
+                if int(math.ceil(int(f.replace('!', '')) / 8.0)) != len(d):
+                    raise ValueError('Incorrect packed bool list length')
+
+                packed += bytes(d)
+            elif len(f) > 1:
+                if int(f.replace('!', '')) != len(d):
+                    raise ValueError('Incorrect bool list length')
+
+                p = [0] * int(math.ceil(len(d) / 8.0))
+
+                for i, b in enumerate(d):
+                    if b:
+                        p[i // 8] |= 1 << (i % 8)
+
+                packed += struct.pack('<{0}B'.format(len(p)), *p)
+            else:
+                packed += struct.pack('<?', d)
+        elif 'c' in f:
+            if len(f) > 1:
+                packed += struct.pack('<' + f, *list(map(lambda char: bytes([ord(char)]), d)))
+            else:
+                packed += struct.pack('<' + f, bytes([ord(d)]))
+        elif 's' in f:
+            packed += struct.pack('<' + f, bytes(map(ord, d)))
+        elif len(f) > 1:
+            packed += struct.pack('<' + f, *d)
+        else:
+            packed += struct.pack('<' + f, d)
+
+    return packed
+
+def reference_unpack_payload(data, form):
+    ret = []
+
+    for f in form.split(' '):
+        o = f
+
+        if '!' in f:
+            if len(f) > 1:
+                f = '{0}B'.format(int(math.ceil(int(f.replace('!', '')) / 8.0)))
+            else:
+                f = 'B'
+
+        f = '<' + f
+        length = struct.calcsize(f)
+        x = struct.unpack(f, data[:length])
+
+        if '!' in o:
+            y = []
+
+            if len(o) > 1:
+                for i in range(int(o.replace('!', ''))):
+                    y.append(x[i // 8] & (1 << (i % 8)) != 0)
+            else:
+                y.append(x[0] != 0)
+
+            x = tuple(y)
+
+        if 'c' in f:
+            if len(x) > 1:
+                ret.append(tuple(map(lambda item: chr(ord(item)), x)))
+            else:
+                ret.append(chr(ord(x[0])))
+        elif 's' in f:
+            s = ''.join(map(chr, x[0]))
+            i = s.find('\x00')
+
+            if i >= 0:
+                s = s[:i]
+
+            ret.append(s)
+        elif len(x) > 1:
+            ret.append(x)
+        else:
+            ret.append(x[0])
+
+        data = data[length:]
+
+    if len(ret) == 1:
+        return ret[0]
+    else:
+        return ret
+
+# one value per format char, including the extremes of its range
+VALUES = {
+    'b': [-128, -1, 0, 127],
+    'B': [0, 1, 255],
+    'h': [-32768, -1, 0, 32767],
+    'H': [0, 1, 65535],
+    'i': [-2147483648, -1, 0, 2147483647],
+    'I': [0, 1, 4294967295],
+    'q': [-9223372036854775808, -1, 0, 9223372036854775807],
+    'Q': [0, 1, 18446744073709551615],
+    'f': [0.0, -1.5, 3.25, 1e30],
+    'd': [0.0, -1.5, 3.25, 1e300],
+    '?': [False, True],
+    '!': [False, True],
+    'c': ['a', '\x00', '\xff'],
+}
+
+# forms used by the bindings
+BINDING_FORMS = [
+    ('B B B B H H 448!', [1, 2, 127, 63, 8192, 448, [i % 3 == 0 for i in range(448)]]),
+    ('B B B ! 22s', [10, 20, 1, True, 'Hello World']),
+    ('B 168!', [3, [i % 5 == 0 for i in range(168)]]),
+    ('B H H 59B', [2, 118, 59, list(range(59))]),
+    ('B B B B B 16s', [0, 5, 10, 60, 20, 'Button']),
+    ('B 5s', [4, 'Tab']),
+    ('B B B B B B 4s 4s', [0, 1, 2, 3, 100, 40, 'X', 'Y']),
+    ('H h B B B ! 32s', [1, -2, 3, 4, 5, False, 'Station']),
+]
+
+class TestPayloadCodec(unittest.TestCase):
+    def check(self, form, data):
+        packed = reference_pack_payload(data, form)
+
+        self.assertEqual(get_payload_codec(form).pack(data), packed)
+        self.assertEqual(pack_payload(data, form), packed)
+
+        expected = reference_unpack_payload(packed, form)
+
+        self.assertEqual(get_payload_codec(form).unpack(packed), expected)
+        self.assertEqual(unpack_payload(packed, form), expected)
+
+        # responses are unpacked behind the 8 byte header
+        self.assertEqual(get_payload_codec(form).unpack(b'\xAA' * 8 + packed, 8), expected)
+
+    def test_format_chars(self):
+        for char, values in VALUES.items():
+            for value in values:
+                with self.subTest(form=char, value=value):
+                    self.check(char, [value])
+
+    def test_arrays(self):
+        for char, values in VALUES.items():
+            if char in '!c':
+                continue # see test_bool_arrays and test_char_arrays
+
+            for count in [1, 2, len(values), 7]:
+                form = '{0}{1}'.format(count, char)
+                data = [(values * 7)[:count]]
+
+                with self.subTest(form=form):
+                    self.check(form, data)
+
+    def test_char_arrays(self):
+        for count in [1, 2, 5]:
+            form = '{0}c'.format(count)
+            data = [['a', 'b', '\x00', '\xff', 'z'][:count]]
+
+            with self.subTest(form=form):
+                self.check(form, data)
+
+    def test_strings(self):
+        for form, text in [('1s', 'a'), ('4s', ''), ('4s', 'ab'), ('4s', 'abcd'),
+                           ('22s', 'Temperature'), ('8s', 'a\x00b'), ('8s', '\xe4\xf6\xfc')]:
+            with self.subTest(form=form, text=text):
+                self.check(form, [text])
+
+    def test_bool_arrays(self):
+        for count in [1, 2, 7, 8, 9, 16, 17, 448]:
+            form = '{0}!'.format(count)
+
+            for pattern in ['none', 'all', 'mixed']:
+                if pattern == 'none':
+                    bools = [False] * count
+                elif pattern == 'all':
+                    bools = [True] * count
+                else:
+                    bools = [i % 3 == 1 for i in range(count)]
+
+                with self.subTest(form=form, pattern=pattern):
+                    self.check(form, [bools])
+
+    def test_packed_bool_arrays(self):
+        for count, packed in [(8, b'\x81'), (9, b'\xff\x01'), (448, bytes(range(56)))]:
+            form = '{0}!'.format(count)
+
+            with self.subTest(form=form):
+                self.check(form, [packed])
+                self.check(form, [bytearray(packed)])
+
+    def test_bool_array_sequences(self):
+        # bool lists can be any sequence, not only lists of bools
+        ints = [1, 0, 1, 1, 0, 0, 0, 0, 1]
+        bools = [bool(i) for i in ints]
+        expected = reference_pack_payload([bools], '9!')
+
+        for data in [ints, tuple(ints), [2, 0, 300, -1, 0, 0, 0, 0, 0.5], array.array('i', ints),
+                     array.array('B', ints), array.array('b', [-1 if i else 0 for i in ints]),
+                     array.array('d', ints)]:
+            with self.subTest(data=data):
+                self.assertEqual(get_payload_codec('9!').pack([data]), expected)
+
+    @unittest.skipUnless(numpy, 'numpy is not installed')
+    def test_bool_array_ndarrays(self):
+        ints = [1, 0, 1, 1, 0, 0, 0, 0, 1]
+        expected = reference_pack_payload([[bool(i) for i in ints]], '9!')
+
+        for dtype in [bool, 'uint8', 'int32', 'float64']:
+            with self.subTest(dtype=dtype):
+                self.assertEqual(get_payload_codec('9!').pack([numpy.array(ints, dtype=dtype)]), expected)
+
+    def test_bool_array_length_errors(self):
+        for form, data in [('8!', [[True] * 7]), ('8!', [[True] * 9]), ('16!', [b'\x00']), ('16!', [b'\x00' * 3])]:
+            with self.subTest(form=form, length=len(data[0])):
+                self.assertRaises(ValueError, reference_pack_payload, data, form)
+                self.assertRaises(ValueError, get_payload_codec(form).pack, data)
+
+    def test_binding_forms(self):
+        for form, data in BINDING_FORMS:
+            with self.subTest(form=form):
+                self.check(form, data)
+
+    def test_empty_form(self):
+        self.assertEqual(get_payload_codec('').pack(()), reference_pack_payload((), ''))
+        self.assertEqual(get_payload_codec('').size, 0)
+
+    def test_codec_is_cached(self):
+        self.assertIs(get_payload_codec('B H 22s'), get_payload_codec('B H 22s'))
+
+if __name__ == '__main__':
+    unittest.main()